@@ -0,0 +1,305 @@
+"""Materialized views behind the /analytics router (sql/migrations/002_analytics_views.sql)
+and the instructor performance report (007_instructor_performance.sql).
+
+Analytics endpoints read precomputed rows, so their cost does not grow with
+the number of enrollments. Each view is mirrored here twice: as a Table (the
+materialized rows) and as the live query that defines it, so ``?fresh=true``
+can run the same endpoint code against current data.
+
+A background task refreshes every view each ANALYTICS_REFRESH_SECONDS
+(0 disables it); POST /admin/analytics/refresh does it on demand. Writers can
+call mark_views_stale() to have specific views refreshed within
+ANALYTICS_STALE_DELAY_SECONDS instead. A
+transaction-level advisory lock keeps workers from refreshing concurrently.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import Response
+from sqlalchemy import (
+    Column, Float, Integer, MetaData, Numeric, String, Table, case, cast, func, literal, select, text,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import FromClause
+
+from cache import TTLCache
+from models import Course, CourseTopic, Enrollment, Instructor, Student, TeachingAssignment, Topic, University
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_REFRESH_SECONDS = int(os.getenv("ANALYTICS_REFRESH_SECONDS", 300))
+ANALYTICS_STALE_DELAY_SECONDS = float(os.getenv("ANALYTICS_STALE_DELAY_SECONDS", 5))
+
+# Any constant; pg_try_advisory_xact_lock key shared by all workers
+_REFRESH_LOCK_KEY = 7_340_001
+
+# Not Base.metadata: these are created by the migration, not create_all()
+_metadata = MetaData()
+
+mv_analytics_overview = Table(
+    "mv_analytics_overview", _metadata,
+    Column("id", Integer),
+    Column("total_courses", Integer),
+    Column("total_students", Integer),
+    Column("total_enrollments", Integer),
+    Column("average_score", Numeric),
+)
+
+mv_course_enrollment = Table(
+    "mv_course_enrollment", _metadata,
+    Column("course_id", Integer),
+    Column("course_name", String),
+    Column("university_id", Integer),
+    Column("enrollments", Integer),
+    Column("graded", Integer),
+    Column("avg_score", Numeric),
+)
+
+mv_courses_by_university = Table(
+    "mv_courses_by_university", _metadata,
+    Column("university_id", Integer),
+    Column("university", String),
+    Column("course_count", Integer),
+)
+
+mv_students_by_country = Table(
+    "mv_students_by_country", _metadata,
+    Column("country", String),
+    Column("student_count", Integer),
+)
+
+mv_skill_level_distribution = Table(
+    "mv_skill_level_distribution", _metadata,
+    Column("skill_level", String),
+    Column("student_count", Integer),
+)
+
+mv_instructor_performance = Table(
+    "mv_instructor_performance", _metadata,
+    Column("instructor_id", Integer),
+    Column("instructor", String),
+    Column("topic_id", Integer),
+    Column("topic", String),
+    Column("instructor_avg", Float),
+    Column("global_topic_avg", Float),
+    Column("ipi", Float),
+    Column("graded", Integer),
+)
+
+
+def _live_overview():
+    return select(
+        literal(1).label("id"),
+        select(func.count()).select_from(Course).scalar_subquery().label("total_courses"),
+        select(func.count()).select_from(Student).scalar_subquery().label("total_students"),
+        select(func.count()).select_from(Enrollment).scalar_subquery().label("total_enrollments"),
+        select(func.avg(Enrollment.evaluation_score))
+        .where(Enrollment.evaluation_score.isnot(None))
+        .scalar_subquery().label("average_score"),
+    )
+
+
+def _live_course_enrollment():
+    return (
+        select(
+            Course.course_id,
+            Course.course_name,
+            Course.university_id,
+            func.count(Enrollment.student_id).label("enrollments"),
+            func.count(Enrollment.evaluation_score).label("graded"),
+            func.avg(Enrollment.evaluation_score).label("avg_score"),
+        )
+        .outerjoin(Enrollment, Enrollment.course_id == Course.course_id)
+        .group_by(Course.course_id)
+    )
+
+
+def _live_courses_by_university():
+    return (
+        select(
+            University.university_id,
+            University.name.label("university"),
+            func.count(Course.course_id).label("course_count"),
+        )
+        .join(Course, Course.university_id == University.university_id)
+        .group_by(University.university_id)
+    )
+
+
+def _live_students_by_country():
+    return select(Student.country, func.count().label("student_count")).group_by(Student.country)
+
+
+def _live_skill_level_distribution():
+    return (
+        select(Student.skill_level, func.count().label("student_count"))
+        .where(Student.skill_level.isnot(None))
+        .group_by(Student.skill_level)
+    )
+
+
+def _live_instructor_performance():
+    # The topic average is a window over enrollment x course_topic, so one
+    # scan feeds both averages (see 007_instructor_performance.sql)
+    scored = (
+        select(
+            CourseTopic.topic_id,
+            Enrollment.course_id,
+            Enrollment.evaluation_score,
+            func.avg(Enrollment.evaluation_score).over(partition_by=CourseTopic.topic_id).label("global_avg"),
+        )
+        .join(CourseTopic, CourseTopic.course_id == Enrollment.course_id)
+        .subquery("scored")
+    )
+    per = (
+        select(
+            TeachingAssignment.instructor_id,
+            scored.c.topic_id,
+            func.avg(scored.c.evaluation_score).label("instructor_avg"),
+            func.count(scored.c.evaluation_score).label("graded"),
+            func.min(scored.c.global_avg).label("global_avg"),
+        )
+        .join(TeachingAssignment, TeachingAssignment.course_id == scored.c.course_id)
+        .group_by(TeachingAssignment.instructor_id, scored.c.topic_id)
+        .subquery("per")
+    )
+    instructor_avg = func.coalesce(per.c.instructor_avg, 0)
+    ipi = case((per.c.global_avg > 0, instructor_avg / per.c.global_avg), else_=0)
+    return (
+        select(
+            per.c.instructor_id,
+            Instructor.full_name.label("instructor"),
+            per.c.topic_id,
+            Topic.topic_name.label("topic"),
+            cast(func.round(instructor_avg, 2), Float).label("instructor_avg"),
+            cast(func.round(func.coalesce(per.c.global_avg, 0), 2), Float).label("global_topic_avg"),
+            cast(func.round(ipi, 2), Float).label("ipi"),
+            per.c.graded,
+        )
+        .join(Instructor, Instructor.instructor_id == per.c.instructor_id)
+        .join(Topic, Topic.topic_id == per.c.topic_id)
+    )
+
+
+# view name -> (materialized table, live definition)
+ANALYTICS_VIEWS = {
+    "mv_analytics_overview": (mv_analytics_overview, _live_overview),
+    "mv_course_enrollment": (mv_course_enrollment, _live_course_enrollment),
+    "mv_courses_by_university": (mv_courses_by_university, _live_courses_by_university),
+    "mv_students_by_country": (mv_students_by_country, _live_students_by_country),
+    "mv_skill_level_distribution": (mv_skill_level_distribution, _live_skill_level_distribution),
+    "mv_instructor_performance": (mv_instructor_performance, _live_instructor_performance),
+}
+
+# Views built from evaluation_score; grade changes mark them stale
+SCORE_VIEWS = ("mv_analytics_overview", "mv_course_enrollment", "mv_instructor_performance")
+
+
+def analytics_source(view: str, live: bool = False) -> FromClause:
+    """The view's rows: materialized, or computed now when ``live``."""
+    table, definition = ANALYTICS_VIEWS[view]
+    return definition().subquery(view) if live else table
+
+
+# ── staleness ────────────────────────────────────────────────────────
+
+# refreshed_at per view; short TTL so a refresh on another worker shows up quickly
+_refreshed_at = TTLCache("analytics_refresh", maxsize=len(ANALYTICS_VIEWS), ttl=10)
+
+
+async def view_refreshed_at(db: AsyncSession, view: str) -> Optional[datetime]:
+    refreshed_at = _refreshed_at.get(view)
+    if refreshed_at is None:
+        refreshed_at = (await db.execute(
+            text("SELECT refreshed_at FROM analytics_refresh WHERE view_name = :view"),
+            {"view": view},
+        )).scalar_one_or_none()
+        if refreshed_at is not None:
+            _refreshed_at.set(view, refreshed_at)
+    return refreshed_at
+
+
+async def set_staleness_headers(response: Response, db: AsyncSession, view: str, live: bool):
+    """X-Data-Source, and for materialized data its refresh time and age."""
+    if live:
+        response.headers["X-Data-Source"] = "live"
+        return
+    response.headers["X-Data-Source"] = "materialized"
+    refreshed_at = await view_refreshed_at(db, view)
+    if refreshed_at is not None:
+        age = (datetime.now(timezone.utc) - refreshed_at).total_seconds()
+        response.headers["X-Data-Refreshed-At"] = refreshed_at.isoformat()
+        response.headers["X-Data-Age-Seconds"] = str(max(0, int(age)))
+
+
+# ── refresh ──────────────────────────────────────────────────────────
+
+async def refresh_analytics_views(db_engine, views: Optional[list[str]] = None) -> dict:
+    """REFRESH ... CONCURRENTLY each view, one transaction per view.
+
+    Returns ``{view: duration_ms}``; a view another worker is refreshing
+    right now is reported as None and skipped.
+    """
+    timings = {}
+    for view in views or ANALYTICS_VIEWS:
+        async with db_engine.begin() as conn:
+            locked = (await conn.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key, hashtext(:view))"),
+                {"key": _REFRESH_LOCK_KEY, "view": view},
+            )).scalar()
+            if not locked:
+                timings[view] = None
+                continue
+            start = time.perf_counter()
+            # Concurrent refresh keeps the view readable while it rebuilds
+            await conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+            duration_ms = int((time.perf_counter() - start) * 1000)
+            await conn.execute(
+                text(
+                    "INSERT INTO analytics_refresh (view_name, refreshed_at, duration_ms) "
+                    "VALUES (:view, now(), :ms) "
+                    "ON CONFLICT (view_name) DO UPDATE "
+                    "SET refreshed_at = excluded.refreshed_at, duration_ms = excluded.duration_ms"
+                ),
+                {"view": view, "ms": duration_ms},
+            )
+        _refreshed_at.invalidate(view)
+        timings[view] = duration_ms
+    return timings
+
+
+_stale: set[str] = set()
+_stale_event = asyncio.Event()
+
+
+def mark_views_stale(*views: str):
+    """Refresh ``views`` within ANALYTICS_STALE_DELAY_SECONDS rather than at the
+    next scheduled refresh (call after committing). Only this worker's loop is
+    woken; the delay batches bursts of writes into one refresh."""
+    _stale.update(views)
+    _stale_event.set()
+
+
+async def analytics_refresh_loop(db_engine, interval: int = ANALYTICS_REFRESH_SECONDS):
+    """Background task started from the app lifespan."""
+    next_full = time.monotonic() + interval
+    while True:
+        try:
+            await asyncio.wait_for(_stale_event.wait(), max(next_full - time.monotonic(), 0))
+            await asyncio.sleep(ANALYTICS_STALE_DELAY_SECONDS)
+            views = sorted(_stale)
+        except asyncio.TimeoutError:
+            views = None
+            next_full = time.monotonic() + interval
+        _stale_event.clear()
+        _stale.clear()
+        try:
+            await refresh_analytics_views(db_engine, views)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Analytics view refresh failed")
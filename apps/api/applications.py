@@ -0,0 +1,116 @@
+"""Batch approve/reject of pending enrollment applications for one course.
+
+A pending application already holds a seat in course.current_enrollment, but
+approvals are still capped by max_capacity (which an admin may have lowered
+below the number of pending rows). approve_applications() locks the course
+row, so concurrent approvals of the same course queue up behind each other,
+and approves the oldest pending rows (by enroll_date) up to the free seats.
+Every requested student gets an outcome; the caller commits.
+"""
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+_LOCK_COURSE_SQL = text("""
+    SELECT c.max_capacity,
+           (SELECT count(*) FROM enrollment e
+             WHERE e.course_id = c.course_id AND e.status = 'approved') AS approved
+      FROM course c
+     WHERE c.course_id = :course_id
+       FOR UPDATE OF c
+""")
+
+# Outer SELECTs see the pre-update snapshot: changed rows still read 'pending'.
+_RESULT_SQL = """
+    SELECT e.student_id, e.status, upd.student_id IS NOT NULL AS changed
+      FROM enrollment e
+      LEFT JOIN upd ON upd.student_id = e.student_id
+     WHERE e.course_id = :course_id
+       AND (upd.student_id IS NOT NULL
+            OR e.student_id = ANY(CAST(:student_ids AS int[]))
+            OR (CAST(:student_ids AS int[]) IS NULL AND e.status = 'pending'))
+     ORDER BY e.enroll_date, e.student_id
+"""
+
+_APPROVE_SQL = text("""
+    WITH cand AS (
+        SELECT student_id FROM enrollment
+         WHERE course_id = :course_id AND status = 'pending'
+           AND (CAST(:student_ids AS int[]) IS NULL OR student_id = ANY(CAST(:student_ids AS int[])))
+         ORDER BY enroll_date, student_id
+         LIMIT :slots
+           FOR UPDATE
+    ),
+    upd AS (
+        UPDATE enrollment e SET status = 'approved'
+          FROM cand
+         WHERE e.course_id = :course_id AND e.student_id = cand.student_id
+        RETURNING e.student_id
+    )
+""" + _RESULT_SQL)
+
+_REJECT_SQL = text("""
+    WITH upd AS (
+        UPDATE enrollment SET status = 'rejected'
+         WHERE course_id = :course_id AND status = 'pending'
+           AND (CAST(:student_ids AS int[]) IS NULL OR student_id = ANY(CAST(:student_ids AS int[])))
+        RETURNING student_id
+    ),
+    seats AS (
+        UPDATE course SET current_enrollment = current_enrollment - (SELECT count(*) FROM upd)
+         WHERE course_id = :course_id AND EXISTS (SELECT 1 FROM upd)
+    )
+""" + _RESULT_SQL)
+
+
+def _outcomes(rows, student_ids: Optional[list[int]], done: str, waiting_reason: Optional[str] = None) -> list[dict]:
+    outcomes, seen = [], set()
+    for r in rows:
+        seen.add(r.student_id)
+        if r.changed:
+            outcomes.append({"student_id": r.student_id, "status": done})
+        elif r.status == "pending":
+            outcomes.append({"student_id": r.student_id, "status": "waiting", "reason": waiting_reason})
+        else:
+            outcomes.append({"student_id": r.student_id, "status": "skipped", "reason": f"already {r.status}"})
+    for student_id in dict.fromkeys(student_ids or []):
+        if student_id not in seen:
+            outcomes.append({"student_id": student_id, "status": "skipped", "reason": "no application"})
+    return outcomes
+
+
+async def approve_applications(db, course_id: int, student_ids: Optional[list[int]] = None,
+                               limit: Optional[int] = None) -> dict:
+    """Approve the given pending applications (all pending when ``student_ids`` is None),
+    oldest first, up to the course's free seats and ``limit``."""
+    course = (await db.execute(_LOCK_COURSE_SQL, {"course_id": course_id})).one_or_none()
+    if course is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    free = max(course.max_capacity - course.approved, 0)
+    slots = free if limit is None else min(free, limit)
+
+    rows = (await db.execute(_APPROVE_SQL, {
+        "course_id": course_id, "student_ids": student_ids, "slots": slots,
+    })).all()
+    outcomes = _outcomes(rows, student_ids, "approved", "course full" if slots == free else "limit reached")
+    approved = sum(o["status"] == "approved" for o in outcomes)
+    return {
+        "course_id": course_id,
+        "max_capacity": course.max_capacity,
+        "approved_total": course.approved + approved,
+        "approved": approved,
+        "results": outcomes,
+    }
+
+
+async def reject_applications(db, course_id: int, student_ids: Optional[list[int]] = None) -> dict:
+    """Reject the given pending applications (all pending when ``student_ids`` is None),
+    releasing their reserved seats."""
+    rows = (await db.execute(_REJECT_SQL, {"course_id": course_id, "student_ids": student_ids})).all()
+    outcomes = _outcomes(rows, student_ids, "rejected")
+    return {
+        "course_id": course_id,
+        "rejected": sum(o["status"] == "rejected" for o in outcomes),
+        "results": outcomes,
+    }
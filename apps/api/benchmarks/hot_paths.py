@@ -0,0 +1,249 @@
+"""
+Microbenchmarks for the per-request costs on hot paths: token creation and
+decoding, the principal lookup in dependencies.get_current_user, RoleChecker,
+building the student course response models, the course detail statement
+(with and without its cache) and serializing 10k-row analytics lists.
+
+Each benchmark is calibrated to run for at least --min-time seconds per
+round, then timed for --rounds rounds; min/median/mean/stddev are per call.
+Benchmarks marked "db" run only when the database in .env is reachable.
+
+Baselines live in benchmarks/baseline.json, keyed by benchmark name.
+--save rewrites it from this run; --compare (the default when it exists)
+flags every benchmark whose median is more than --threshold percent slower
+than its baseline and exits with status 1. Baselines are only comparable on
+the machine that recorded them: re-record with --save after changing hosts.
+
+Run from: apps/api/
+Command:  python benchmarks/hot_paths.py [--only jwt] [--rounds 7] [--threshold 15] [--save]
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, text
+
+from database import engine, AsyncSessionLocal
+from dependencies import PRINCIPAL_CACHE, RoleChecker, get_current_user
+from fast_json import dumps
+from models import AppUser, Course
+from routers.auth import create_access_token
+from routers.student import CourseDetailResponse, CourseResponse
+from course_detail import invalidate_course_detail, load_course_detail
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+EMAIL = "bench.student@example.invalid"
+TOKEN = create_access_token({"sub": EMAIL, "role": "student"})
+PRINCIPAL = {"id": 1, "email": EMAIL, "role": "analyst",
+             "approved_at": datetime(2025, 1, 1, tzinfo=timezone.utc), "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc)}
+
+COURSE_ROW = {"course_id": 42, "course_name": "Database Systems", "duration_weeks": 12,
+              "university_name": "IIT Kharagpur", "program_name": "B.Tech", "topics": ["SQL", "Indexing", "Transactions"]}
+COURSE_DETAIL = {
+    **{k: v for k, v in COURSE_ROW.items() if k != "topics"},
+    "max_capacity": 120, "current_enrollment": 87, "textbook_title": "Database System Concepts",
+    "textbook_url": "https://example.com/dsc", "topics": ["SQL", "Indexing", "Transactions"],
+    "evaluation_score": 78, "enroll_date": date(2025, 1, 6),
+    "content_items": [{"content_id": i, "title": f"Week {i}", "content_type": "video", "url": None} for i in range(8)],
+    "instructors": [{"instructor_id": i, "full_name": f"Instructor {i}", "email": None, "role": "instructor"}
+                    for i in range(2)],
+}
+ANALYTICS_ROWS = [{"course_id": i, "course_name": f"Course {i}", "enrollments": 1000 - i % 1000,
+                   "avg_score": round(40 + (i % 600) / 10, 2)} for i in range(10_000)]
+
+BENCHMARKS: dict[str, tuple] = {}
+
+
+def benchmark(name: str, db: bool = False):
+    """Register ``fn`` (sync, or async taking the shared context) under ``name``."""
+    def register(fn):
+        BENCHMARKS[name] = (fn, db)
+        return fn
+    return register
+
+
+# ── Benchmarks ───────────────────────────────────────────────────
+
+@benchmark("jwt.create_access_token")
+def _create_token(ctx):
+    create_access_token({"sub": EMAIL, "role": "student"})
+
+
+@benchmark("auth.get_current_user.cached")
+async def _current_user_cached(ctx):
+    # Decode + principal cache hit + detached AppUser
+    PRINCIPAL_CACHE.set(EMAIL, PRINCIPAL)
+    await get_current_user(TOKEN, None)
+
+
+@benchmark("auth.get_current_user.db", db=True)
+async def _current_user_db(ctx):
+    PRINCIPAL_CACHE.invalidate(ctx["email"])
+    await get_current_user(ctx["token"], ctx["session"])
+
+
+_role_checker = RoleChecker(["analyst", "admin"])
+_analyst = AppUser(**PRINCIPAL)
+
+
+@benchmark("auth.role_checker")
+def _role_check(ctx):
+    _role_checker(_analyst)
+
+
+@benchmark("models.course_response")
+def _course_response(ctx):
+    CourseResponse(**COURSE_ROW)
+
+
+@benchmark("models.course_detail_response")
+def _course_detail_response(ctx):
+    CourseDetailResponse(**COURSE_DETAIL)
+
+
+@benchmark("student.course_detail.uncached", db=True)
+async def _course_detail_uncached(ctx):
+    invalidate_course_detail(ctx["course_id"])
+    await load_course_detail(ctx["session"], ctx["course_id"], ctx["email"])
+
+
+@benchmark("student.course_detail.cached", db=True)
+async def _course_detail_cached(ctx):
+    await load_course_detail(ctx["session"], ctx["course_id"], ctx["email"])
+
+
+@benchmark("json.analytics_10k.fast_json")
+def _fast_json(ctx):
+    dumps(ANALYTICS_ROWS)
+
+
+@benchmark("json.analytics_10k.jsonable_encoder")
+def _jsonable_encoder(ctx):
+    # FastAPI's default path for a returned list
+    json.dumps(jsonable_encoder(ANALYTICS_ROWS)).encode()
+
+
+# ── Runner ───────────────────────────────────────────────────────
+
+async def _call(fn, ctx, n: int) -> float:
+    start = time.perf_counter()
+    if inspect.iscoroutinefunction(fn):
+        for _ in range(n):
+            await fn(ctx)
+    else:
+        for _ in range(n):
+            fn(ctx)
+    return time.perf_counter() - start
+
+
+async def measure(fn, ctx, rounds: int, min_time: float) -> dict:
+    await _call(fn, ctx, 1)  # warm-up
+    n = 1
+    while (elapsed := await _call(fn, ctx, n)) < min_time:
+        n = max(n * 2, int(n * min_time / max(elapsed, 1e-9) * 1.1))
+    per_call = [await _call(fn, ctx, n) / n * 1e6 for _ in range(rounds)]
+    return {
+        "iterations": n,
+        "min_us": round(min(per_call), 3),
+        "median_us": round(statistics.median(per_call), 3),
+        "mean_us": round(statistics.mean(per_call), 3),
+        "stddev_us": round(statistics.stdev(per_call), 3) if len(per_call) > 1 else 0.0,
+        "ops": round(1e6 / statistics.median(per_call), 1),
+    }
+
+
+async def db_context() -> dict | None:
+    """Session plus a real user and course for the db benchmarks, or None when unreachable."""
+    try:
+        async with engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout=5)
+    except Exception as exc:
+        print(f"  database unavailable, skipping db benchmarks ({type(exc).__name__})")
+        return None
+    session = AsyncSessionLocal()
+    email = (await session.execute(select(AppUser.email).limit(1))).scalar_one_or_none()
+    course_id = (await session.execute(select(Course.course_id).limit(1))).scalar_one_or_none()
+    if email is None or course_id is None:
+        print("  no app_user or course rows, skipping db benchmarks")
+        await session.close()
+        return None
+    return {"session": session, "email": email, "course_id": course_id,
+            "token": create_access_token({"sub": email, "role": "student"})}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get("benchmarks", {}).get(name)
+        if before and result["median_us"] > before["median_us"] * (1 + threshold / 100):
+            change = (result["median_us"] / before["median_us"] - 1) * 100
+            regressions.append(f"{name}: {before['median_us']} -> {result['median_us']} us (+{change:.0f}%)")
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help="run benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per round")
+    parser.add_argument("--threshold", type=float, default=15.0, help="allowed slowdown, percent")
+    parser.add_argument("--save", action="store_true", help=f"write results to {BASELINE_PATH.name}")
+    parser.add_argument("--no-db", action="store_true", help="skip benchmarks that need the database")
+    args = parser.parse_args()
+
+    selected = {name: spec for name, spec in BENCHMARKS.items() if not args.only or args.only in name}
+    print("=" * 78)
+    print(f" Hot path microbenchmarks ({args.rounds} rounds, >= {args.min_time}s each)")
+    print("=" * 78)
+    ctx = None
+    if any(db for _, db in selected.values()) and not args.no_db:
+        ctx = await db_context()
+
+    results = {}
+    print(f"  {'benchmark':<40}{'median us':>12}{'min us':>10}{'stddev':>9}{'ops/s':>12}")
+    for name, (fn, db) in selected.items():
+        if db and ctx is None:
+            continue
+        r = results[name] = await measure(fn, ctx, args.rounds, args.min_time)
+        print(f"  {name:<40}{r['median_us']:>12.2f}{r['min_us']:>10.2f}{r['stddev_us']:>9.2f}{r['ops']:>12,.0f}")
+    if ctx is not None:
+        await ctx["session"].close()
+    await engine.dispose()
+
+    if args.save:
+        baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+        baseline.update({
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()}",
+            "recorded_at": datetime.now(timezone.utc).date().isoformat(),
+        })
+        # Keep baselines of benchmarks that did not run (e.g. db ones without a database)
+        baseline["benchmarks"] = {**baseline.get("benchmarks", {}), **results}
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\n  baseline written to {BASELINE_PATH}")
+        return
+
+    if BASELINE_PATH.exists():
+        regressions = compare(results, json.loads(BASELINE_PATH.read_text()), args.threshold)
+        print(f"\n  Compared with {BASELINE_PATH.name}, threshold {args.threshold:g}%:")
+        for line in regressions:
+            print(f"    REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("    no regressions")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
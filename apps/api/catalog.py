@@ -0,0 +1,80 @@
+"""Response cache for the course catalog (GET /student/courses).
+
+The catalog changes only when courses or their topic links are edited, so
+serialized pages are cached per query string under a catalog version. Writers
+call bump_catalog_version() after committing; a request already in flight
+stores its page under the version it started with, which is never read again.
+Other workers only see the bump when their entries expire
+(CATALOG_CACHE_TTL_SECONDS).
+
+Responses carry a strong ETag (a hash of the body), so it is the same in
+every worker, and ``If-None-Match`` is answered with 304.
+"""
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Request, Response
+
+from cache import TTLCache
+from metrics import CATALOG_CACHE_REQUESTS
+
+CATALOG_CACHE = TTLCache(
+    "catalog",
+    maxsize=int(os.getenv("CATALOG_CACHE_SIZE", 512)),
+    ttl=float(os.getenv("CATALOG_CACHE_TTL_SECONDS", 60)),
+)
+
+_version = 0
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    body: bytes
+    headers: dict
+    etag: str
+
+
+def catalog_version() -> int:
+    return _version
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog page of this worker (call after committing)."""
+    global _version
+    _version += 1
+    CATALOG_CACHE.clear()
+
+
+def catalog_key(request: Request, version: int) -> tuple:
+    # Host is part of the key because the Link header holds an absolute URL
+    return version, request.url.netloc, tuple(sorted(request.query_params.multi_items()))
+
+
+def get_cached_page(key: tuple) -> Optional[CachedPage]:
+    page = CATALOG_CACHE.get(key)
+    CATALOG_CACHE_REQUESTS.labels("hit" if page else "miss").inc()
+    return page
+
+
+def cache_page(key: tuple, body: bytes, headers: dict) -> CachedPage:
+    page = CachedPage(body, headers, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+    CATALOG_CACHE.set(key, page)
+    return page
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    # Weak comparison, as RFC 9110 prescribes for If-None-Match
+    return "*" in tags or etag in (t.removeprefix("W/") for t in tags)
+
+
+def page_or_not_modified(request: Request, page: CachedPage) -> Response:
+    headers = {"ETag": page.etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), page.etag):
+        CATALOG_CACHE_REQUESTS.labels("not_modified").inc()
+        return Response(status_code=304, headers=headers)
+    return Response(page.body, media_type="application/json", headers={**page.headers, **headers})
@@ -0,0 +1,27 @@
+"""Row-count expressions for dashboard totals.
+
+``table_count(Model)`` is an exact ``(SELECT count(*) FROM table)`` scalar
+subquery. With ``estimate=True`` it reads ``pg_class.reltuples`` instead,
+which is maintained by VACUUM/ANALYZE and costs nothing regardless of table
+size; tables that have never been analyzed (reltuples < 0) fall back to the
+exact count. Either way it composes into a single SELECT with other totals.
+"""
+from sqlalchemy import BigInteger, cast, column, func, select, table
+from sqlalchemy.sql import ColumnElement
+
+_pg_class = table("pg_class", column("oid"), column("reltuples"))
+
+
+def table_count(model, estimate: bool = False) -> ColumnElement:
+    exact = select(func.count()).select_from(model).scalar_subquery()
+    if not estimate:
+        return exact
+    reltuples = (
+        select(cast(_pg_class.c.reltuples, BigInteger))
+        .where(
+            _pg_class.c.oid == func.to_regclass(model.__tablename__),
+            _pg_class.c.reltuples >= 0,
+        )
+        .scalar_subquery()
+    )
+    return func.coalesce(reltuples, exact)
@@ -0,0 +1,104 @@
+"""Course detail page (GET /student/courses/{id}) in one statement.
+
+The static part of a course (names, textbook, topics, content items,
+instructors) is aggregated to JSON in SQL and cached per course. The live
+part (approved count and the caller's own enrollment, via a lateral join) is
+read on every request: with a cached course that is the only statement.
+
+Writers call invalidate_course_detail() after committing: instructor
+content and topic endpoints, admin course edits and teaching assignments.
+The TTL bounds how long another worker serves a stale course.
+"""
+import os
+from typing import Optional
+
+from sqlalchemy import JSON, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache import TTLCache
+
+COURSE_DETAIL_CACHE = TTLCache(
+    "course_detail",
+    maxsize=int(os.getenv("COURSE_DETAIL_CACHE_SIZE", 2048)),
+    ttl=float(os.getenv("COURSE_DETAIL_CACHE_TTL_SECONDS", 300)),
+)
+
+STATIC_FIELDS = (
+    "course_id", "course_name", "duration_weeks", "max_capacity", "university_name", "program_name",
+    "textbook_title", "textbook_url", "topics", "content_items", "instructors",
+)
+
+# Approved count plus the caller's student row and enrollment in this course
+# (any status; student_id is NULL when the caller has no student profile)
+_LIVE_SQL = """
+    cs.approved_count,
+    me.student_id,
+    me.enrolled,
+    me.evaluation_score,
+    me.enroll_date
+  FROM course c
+  LEFT JOIN course_stats cs ON cs.course_id = c.course_id
+  LEFT JOIN LATERAL (
+      SELECT s.student_id, e.student_id IS NOT NULL AS enrolled, e.evaluation_score, e.enroll_date
+        FROM student s
+        LEFT JOIN enrollment e ON e.student_id = s.student_id AND e.course_id = c.course_id
+       WHERE s.email = :email
+       LIMIT 1
+  ) me ON true
+"""
+
+_DETAIL_SQL = text("""
+SELECT c.course_id, c.course_name, c.duration_weeks, c.max_capacity,
+       u.name AS university_name,
+       p.program_name,
+       tb.title AS textbook_title,
+       tb.url AS textbook_url,
+       coalesce((SELECT json_agg(t.topic_name ORDER BY t.topic_name)
+                   FROM course_topic ct
+                   JOIN topic t ON t.topic_id = ct.topic_id
+                  WHERE ct.course_id = c.course_id), '[]') AS topics,
+       coalesce((SELECT json_agg(json_build_object(
+                            'content_id', ci.content_id, 'title', ci.title,
+                            'content_type', ci.content_type, 'url', ci.url) ORDER BY ci.content_id)
+                   FROM content_item ci
+                  WHERE ci.course_id = c.course_id), '[]') AS content_items,
+       coalesce((SELECT json_agg(json_build_object(
+                            'instructor_id', i.instructor_id, 'full_name', i.full_name,
+                            'email', i.email, 'role', ta.role) ORDER BY i.instructor_id)
+                   FROM teaching_assignment ta
+                   JOIN instructor i ON i.instructor_id = ta.instructor_id
+                  WHERE ta.course_id = c.course_id), '[]') AS instructors,
+""" + _LIVE_SQL + """
+  LEFT JOIN university u ON u.university_id = c.university_id
+  LEFT JOIN program p ON p.program_id = c.program_id
+  LEFT JOIN textbook tb ON tb.textbook_id = c.textbook_id
+ WHERE c.course_id = :course_id
+""").columns(topics=JSON, content_items=JSON, instructors=JSON)
+
+_LIVE_ONLY_SQL = text("SELECT" + _LIVE_SQL + " WHERE c.course_id = :course_id")
+
+
+def invalidate_course_detail(*course_ids: int):
+    """Drop cached courses (all of them when no id is given); call after committing."""
+    if not course_ids:
+        COURSE_DETAIL_CACHE.clear()
+    for course_id in course_ids:
+        COURSE_DETAIL_CACHE.invalidate(course_id)
+
+
+async def load_course_detail(db: AsyncSession, course_id: int, email: Optional[str]) -> Optional[dict]:
+    """Static course fields merged with the live ones, or None when the course does not exist.
+
+    ``email`` selects whose enrollment is joined (None: nobody's).
+    """
+    static = COURSE_DETAIL_CACHE.get(course_id)
+    params = {"course_id": course_id, "email": email}
+    row = (await db.execute(_LIVE_ONLY_SQL if static else _DETAIL_SQL, params)).mappings().first()
+    if row is None:
+        if static:
+            invalidate_course_detail(course_id)
+        return None
+    if static is None:
+        static = {field: row[field] for field in STATIC_FIELDS}
+        COURSE_DETAIL_CACHE.set(course_id, static)
+    return {**static, **{k: v for k, v in row.items() if k not in STATIC_FIELDS}}
@@ -0,0 +1,61 @@
+"""Consistency checks for the trigger-maintained course_stats table.
+
+v_course_stats_recomputed (sql/migrations/003_course_stats.sql) recomputes the
+aggregates from enrollment; any course where it disagrees with course_stats
+has drifted (e.g. rows written with triggers disabled, or a manual fix-up).
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+STAT_COLUMNS = (
+    "approved_count", "pending_count", "rejected_count",
+    "score_sum", "score_count", "pass_count",
+    "bucket_0_20", "bucket_21_40", "bucket_41_60", "bucket_61_80", "bucket_81_100",
+)
+
+_DRIFT_SQL = text(f"""
+    SELECT coalesce(r.course_id, cs.course_id) AS course_id,
+           {", ".join(f"cs.{c} AS stored_{c}, r.{c} AS expected_{c}" for c in STAT_COLUMNS)}
+      FROM v_course_stats_recomputed r
+      FULL JOIN course_stats cs ON cs.course_id = r.course_id
+     WHERE ({", ".join(f"cs.{c}" for c in STAT_COLUMNS)})
+           IS DISTINCT FROM ({", ".join(f"r.{c}" for c in STAT_COLUMNS)})
+     ORDER BY 1
+""")
+
+_REPAIR_SQL = text(f"""
+    INSERT INTO course_stats (course_id, {", ".join(STAT_COLUMNS)})
+    SELECT course_id, {", ".join(STAT_COLUMNS)}
+      FROM v_course_stats_recomputed
+     WHERE course_id = ANY(:course_ids)
+    ON CONFLICT (course_id) DO UPDATE SET
+        {", ".join(f"{c} = excluded.{c}" for c in STAT_COLUMNS)},
+        updated_at = now()
+""")
+
+
+async def check_course_stats(db: AsyncSession, repair: bool = False) -> list[dict]:
+    """Courses whose stored stats differ from a full recompute.
+
+    Each entry lists only the drifted columns as ``{column: {"stored", "expected"}}``.
+    With ``repair`` the drifted rows are overwritten with the recomputed values
+    (enrollment writes are blocked meanwhile) and the transaction is committed.
+    """
+    if repair:
+        await db.execute(text("LOCK TABLE enrollment IN SHARE MODE"))
+    rows = (await db.execute(_DRIFT_SQL)).mappings().all()
+
+    drift = []
+    for row in rows:
+        columns = {
+            c: {"stored": row[f"stored_{c}"], "expected": row[f"expected_{c}"]}
+            for c in STAT_COLUMNS
+            if row[f"stored_{c}"] != row[f"expected_{c}"]
+        }
+        drift.append({"course_id": row["course_id"], "columns": columns})
+
+    if repair:
+        if drift:
+            await db.execute(_REPAIR_SQL, {"course_ids": [d["course_id"] for d in drift]})
+        await db.commit()
+    return drift
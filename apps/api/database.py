@@ -1,7 +1,11 @@
 import os
+import time
+from dataclasses import dataclass, replace
 from pathlib import Path
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from dotenv import load_dotenv
 
 # Walk up from this file to find .env at project root
@@ -22,7 +26,217 @@ DB_NAME = os.getenv("DB_NAME")
 
 DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+# Optional read replica (postgresql+asyncpg://...). When unset, reads go to the primary.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL") or None
+
+
+# ── Engine settings & profiles ───────────────────────────────────
+#
+# DB_PROFILE selects a baseline (dev, prod, test, bench); any DB_* variable
+# below overrides a single field of that baseline.
+
+@dataclass(frozen=True)
+class EngineSettings:
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800          # seconds; -1 disables recycling
+    pre_ping: bool = True
+    echo: bool | str = False          # False | True | "debug"
+    echo_pool: bool | str = False
+    statement_cache_size: int = 100   # asyncpg prepared statement cache; 0 for pgbouncer
+    statement_timeout_ms: int = 0     # server-side statement_timeout; 0 = no limit
+    application_name: str = "dbmslab-api"
+    null_pool: bool = False           # one connection per checkout (tests, scripts)
+    read_only: bool = False           # sessions default to READ ONLY transactions
+
+
+def _worker_count() -> int:
+    return max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+
+def _prod_pool_size() -> int:
+    """Split the server-side connection budget evenly across uvicorn workers."""
+    budget = int(os.getenv("DB_MAX_CONNECTIONS", "80"))
+    return max(2, budget // _worker_count())
+
+
+PROFILES = {
+    "dev": lambda: EngineSettings(echo=True),
+    "prod": lambda: EngineSettings(
+        pool_size=_prod_pool_size(),
+        max_overflow=0,
+        pool_timeout=10.0,
+        pool_recycle=900,
+        statement_timeout_ms=15000,
+    ),
+    "test": lambda: EngineSettings(null_pool=True),
+    "bench": lambda: EngineSettings(
+        pool_size=_prod_pool_size(),
+        max_overflow=0,
+        pool_timeout=60.0,
+        pre_ping=False,
+        application_name="dbmslab-bench",
+    ),
+}
+
+
+def _parse_echo(value: str) -> bool | str:
+    value = value.strip().lower()
+    if value == "debug":
+        return "debug"
+    return value in ("1", "true", "yes", "on")
+
+
+def _parse_bool(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+_ENV_OVERRIDES = {
+    "DB_POOL_SIZE": ("pool_size", int),
+    "DB_MAX_OVERFLOW": ("max_overflow", int),
+    "DB_POOL_TIMEOUT": ("pool_timeout", float),
+    "DB_POOL_RECYCLE": ("pool_recycle", int),
+    "DB_POOL_PRE_PING": ("pre_ping", _parse_bool),
+    "DB_ECHO": ("echo", _parse_echo),
+    "DB_ECHO_POOL": ("echo_pool", _parse_echo),
+    "DB_STATEMENT_CACHE_SIZE": ("statement_cache_size", int),
+    "DB_STATEMENT_TIMEOUT_MS": ("statement_timeout_ms", int),
+    "DB_APPLICATION_NAME": ("application_name", str),
+}
+
+
+def load_engine_settings(profile: str | None = None) -> EngineSettings:
+    """Resolve the settings for a profile, then apply DB_* environment overrides."""
+    profile = (profile or os.getenv("DB_PROFILE", "dev")).lower()
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE '{profile}' (expected one of: {', '.join(PROFILES)})")
+    settings = PROFILES[profile]()
+    overrides = {}
+    for env_name, (field, parse) in _ENV_OVERRIDES.items():
+        raw = os.getenv(env_name)
+        if raw is not None and raw != "":
+            overrides[field] = parse(raw)
+    return replace(settings, **overrides)
+
+
+# ── Pool instrumentation ─────────────────────────────────────────
+
+# Upper bounds (ms) of the checkout wait-time histogram buckets.
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolWaitStats:
+    """Cumulative histogram of how long callers waited for a pooled connection."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.timeouts = 0
+
+    def observe(self, wait_ms: float):
+        self.count += 1
+        self.total_ms += wait_ms
+        if wait_ms > self.max_ms:
+            self.max_ms = wait_ms
+        for i, bound in enumerate(WAIT_BUCKETS_MS):
+            if wait_ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def snapshot(self) -> dict:
+        labels = [f"le_{b}ms" for b in WAIT_BUCKETS_MS] + ["inf"]
+        return {
+            "checkouts": self.count,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_wait_ms": round(self.max_ms, 3),
+            "histogram": dict(zip(labels, self.buckets)),
+        }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records checkout wait time, so pool starvation is visible."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        finally:
+            self.wait_stats.observe((time.perf_counter() - start) * 1000)
+
+    def recreate(self):
+        new_pool = super().recreate()
+        new_pool.wait_stats = self.wait_stats
+        return new_pool
+
+
+def build_engine(url: str = DATABASE_URL, settings: EngineSettings | None = None):
+    """Create an async engine from EngineSettings (defaults to the active DB_PROFILE)."""
+    settings = settings or load_engine_settings()
+    server_settings = {"application_name": settings.application_name}
+    if settings.statement_timeout_ms > 0:
+        server_settings["statement_timeout"] = str(settings.statement_timeout_ms)
+    if settings.read_only:
+        server_settings["default_transaction_read_only"] = "on"
+    kwargs = {
+        "echo": settings.echo,
+        "echo_pool": settings.echo_pool,
+        "connect_args": {
+            "statement_cache_size": settings.statement_cache_size,
+            "server_settings": server_settings,
+        },
+    }
+    if settings.null_pool:
+        kwargs["poolclass"] = NullPool
+    else:
+        kwargs.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.pool_size,
+            max_overflow=settings.max_overflow,
+            pool_timeout=settings.pool_timeout,
+            pool_recycle=settings.pool_recycle,
+            pool_pre_ping=settings.pre_ping,
+        )
+    return create_async_engine(url, **kwargs)
+
+
+def pool_stats(db_engine) -> dict:
+    """Live pool gauges plus the checkout wait-time histogram for one engine."""
+    pool = db_engine.pool
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return {"pool_class": type(pool).__name__}
+    stats = {
+        "pool_class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "timeout_s": pool.timeout(),
+    }
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        stats["wait"] = wait_stats.snapshot()
+    return stats
+
+
+ENGINE_SETTINGS = load_engine_settings()
+
+engine = build_engine(DATABASE_URL, ENGINE_SETTINGS)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -30,8 +244,58 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False,
 )
 
+if DATABASE_READ_URL:
+    read_engine = build_engine(
+        DATABASE_READ_URL,
+        replace(ENGINE_SETTINGS, read_only=True, application_name=f"{ENGINE_SETTINGS.application_name}-ro"),
+    )
+else:
+    read_engine = engine
+
+HAS_READ_REPLICA = read_engine is not engine
+
+ReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+
+# ── Replica lag guard ────────────────────────────────────────────
+#
+# After a user writes, their reads are pinned to the primary for a short
+# window so they never see a replica that has not caught up with their own
+# change. The map is per worker process; the window only needs to cover
+# typical replication lag.
+
+REPLICA_LAG_WINDOW_SECONDS = float(os.getenv("REPLICA_LAG_WINDOW_SECONDS", "5"))
+_MAX_TRACKED_WRITERS = 10000
+
+_recent_writes: dict[str, float] = {}
+
+
+def mark_recent_write(subject: str):
+    """Pin reads for this subject (JWT sub / email) to the primary for the lag window."""
+    if not HAS_READ_REPLICA:
+        return
+    now = time.monotonic()
+    if len(_recent_writes) >= _MAX_TRACKED_WRITERS:
+        for key in [k for k, until in _recent_writes.items() if until <= now]:
+            del _recent_writes[key]
+    _recent_writes[subject] = now + REPLICA_LAG_WINDOW_SECONDS
+
+
+def has_recent_write(subject: str) -> bool:
+    until = _recent_writes.get(subject)
+    if until is None:
+        return False
+    if until <= time.monotonic():
+        _recent_writes.pop(subject, None)
+        return False
+    return True
@@ -1,13 +1,15 @@
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import os
-from database import get_db
+from cache import TTLCache
+from database import get_db, ReadSessionLocal, HAS_READ_REPLICA, has_recent_write
 from models import AppUser
 from schemas import TokenData
-from sqlalchemy import select
+from sqlalchemy import select, text
 
 SECRET_KEY = os.getenv("SECRET_KEY", "dev_secret")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
@@ -15,6 +17,40 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# Decoded principals keyed by JWT subject (email). Admin endpoints that change
+# a user's existence, role or approval call invalidate_principal().
+PRINCIPAL_CACHE = TTLCache(
+    "principal",
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 30)),
+)
+
+_PRINCIPAL_FIELDS = ("id", "email", "role", "approved_at", "created_at")
+
+
+# Student/instructor ids and taught courses keyed by email; see get_profile().
+PROFILE_CACHE = TTLCache(
+    "profile",
+    maxsize=int(os.getenv("PROFILE_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("PROFILE_CACHE_TTL_SECONDS", 30)),
+)
+
+
+def invalidate_principal(*emails: Optional[str]):
+    """Drop cached principals (and their profiles) so the next request re-reads app_user."""
+    for email in emails:
+        if email:
+            PRINCIPAL_CACHE.invalidate(email)
+            PROFILE_CACHE.invalidate(email)
+
+
+def invalidate_profile(*emails: Optional[str]):
+    """Drop cached profiles, e.g. after teaching assignments change (call after committing)."""
+    for email in emails:
+        if email:
+            PROFILE_CACHE.invalidate(email)
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> AppUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -30,14 +66,32 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
         token_data = TokenData(email=email, role=role)
     except JWTError:
         raise credentials_exception
-    
+
+    cached = PRINCIPAL_CACHE.get(token_data.email)
+    if cached is not None:
+        # Detached snapshot; handlers only read id/email/role/approved_at.
+        return AppUser(**cached)
+
     result = await db.execute(select(AppUser).where(AppUser.email == token_data.email))
     user = result.scalar_one_or_none()
     
     if user is None:
         raise credentials_exception
+    PRINCIPAL_CACHE.set(token_data.email, {f: getattr(user, f) for f in _PRINCIPAL_FIELDS})
     return user
 
+async def get_read_db(
+    current_user: AppUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Session for read-only endpoints: the replica when configured, but the
+    primary while the caller is inside the lag window after their own write."""
+    if not HAS_READ_REPLICA or has_recent_write(current_user.email):
+        yield db
+        return
+    async with ReadSessionLocal() as session:
+        yield session
+
 async def get_current_active_user(current_user: AppUser = Depends(get_current_user)) -> AppUser:
     return current_user
 
@@ -63,3 +117,51 @@ class RoleChecker:
         if self.require_approved and user.role in ("instructor", "analyst") and getattr(user, "approved_at", None) is None:
             raise HTTPException(status_code=403, detail="Account pending admin approval")
         return user
+
+
+# ── Principal profile ────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class Profile:
+    """The caller's student and instructor rows, if any, and the courses they teach."""
+    student_id: Optional[int] = None
+    instructor_id: Optional[int] = None
+    course_ids: frozenset = frozenset()
+
+    def teaches(self, course_id: int) -> bool:
+        return course_id in self.course_ids
+
+
+# Instructor resolved like it always was: linked user_id, else matching email
+_PROFILE_SQL = text("""
+SELECT s.student_id,
+       i.instructor_id,
+       coalesce((SELECT array_agg(ta.course_id)
+                   FROM teaching_assignment ta
+                  WHERE ta.instructor_id = i.instructor_id), '{}') AS course_ids
+  FROM (SELECT 1) AS one
+  LEFT JOIN LATERAL (
+      SELECT student_id FROM student WHERE email = :email LIMIT 1
+  ) s ON true
+  LEFT JOIN LATERAL (
+      SELECT instructor_id FROM instructor
+       WHERE user_id = :user_id OR email = :email
+       ORDER BY user_id = :user_id DESC NULLS LAST
+       LIMIT 1
+  ) i ON true
+""")
+
+
+async def get_profile(current_user: AppUser = Depends(get_current_user), db: AsyncSession = Depends(get_db)) -> Profile:
+    """Resolve the caller's profile in one statement, cached across requests.
+
+    FastAPI resolves a dependency once per request, so handlers and helpers
+    that need it share the same Profile.
+    """
+    cached = PROFILE_CACHE.get(current_user.email)
+    if cached is not None:
+        return cached
+    row = (await db.execute(_PROFILE_SQL, {"email": current_user.email, "user_id": current_user.id})).one()
+    profile = Profile(row.student_id, row.instructor_id, frozenset(row.course_ids))
+    PROFILE_CACHE.set(current_user.email, profile)
+    return profile
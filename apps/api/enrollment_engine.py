@@ -0,0 +1,114 @@
+"""Enrollment with atomic seat reservation.
+
+enroll_student() reserves a seat and inserts the enrollment in one statement:
+a conditional ``UPDATE course SET current_enrollment = current_enrollment + 1
+WHERE ... current_enrollment < max_capacity`` feeding ``INSERT ... ON CONFLICT
+DO NOTHING``. The course row is locked only for that UPDATE (until commit),
+instead of for the whole duplicate-check / lookup / insert sequence, and a full
+course fails without writing anything. Deadlocks and serialization failures
+are retried with jittered backoff. Each attempt runs in a SAVEPOINT and the
+caller owns the transaction: commit after an ``enrolled`` outcome.
+
+Seat accounting (current_enrollment = pending + approved rows) is described in
+sql/migrations/005_enrollment_seats.sql; every enrollment INSERT must go through
+here or reserve its seat the same way (waitlist.promote_waitlists).
+"""
+import asyncio
+import os
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+ENROLL_MAX_RETRIES = int(os.getenv("ENROLL_MAX_RETRIES", 3))
+
+# serialization_failure, deadlock_detected
+_RETRYABLE = {"40001", "40P01"}
+
+_ENROLL_SQL = text("""
+    WITH seat AS (
+        UPDATE course
+           SET current_enrollment = current_enrollment + 1
+         WHERE course_id = :course_id
+           AND current_enrollment < max_capacity
+           AND NOT EXISTS (SELECT 1 FROM enrollment WHERE student_id = :student_id AND course_id = :course_id)
+           -- Freed seats belong to the waitlist (waitlist.py) until it is empty
+           AND NOT EXISTS (SELECT 1 FROM waitlist WHERE course_id = :course_id)
+        RETURNING course_id, auto_approve, current_enrollment
+    ),
+    ins AS (
+        INSERT INTO enrollment (student_id, course_id, enroll_date, status)
+        SELECT :student_id, course_id, CURRENT_DATE,
+               coalesce(CAST(:status AS varchar), CASE WHEN auto_approve THEN 'approved' ELSE 'pending' END)
+          FROM seat
+        ON CONFLICT DO NOTHING
+        RETURNING status
+    )
+    SELECT c.course_name, c.max_capacity,
+           coalesce(seat.current_enrollment, c.current_enrollment) AS seats_taken,
+           seat.course_id IS NOT NULL AS reserved,
+           ins.status,
+           EXISTS (SELECT 1 FROM enrollment WHERE student_id = :student_id AND course_id = :course_id) AS existing
+      FROM course c
+      LEFT JOIN seat ON true
+      LEFT JOIN ins ON true
+     WHERE c.course_id = :course_id
+""")
+
+
+@dataclass
+class EnrollResult:
+    outcome: str                       # enrolled | full | duplicate | no_course | no_student
+    status: Optional[str] = None       # enrollment status when enrolled
+    course_name: Optional[str] = None
+    seats_taken: Optional[int] = None
+    max_capacity: Optional[int] = None
+    attempts: int = 1
+
+
+async def _attempt(db: AsyncSession, student_id: int, course_id: int, status: Optional[str]) -> EnrollResult:
+    # In a SAVEPOINT: a failed attempt undoes only its own seat reservation,
+    # never other pending work in the caller's transaction.
+    try:
+        async with db.begin_nested() as savepoint:
+            row = (await db.execute(_ENROLL_SQL, {
+                "student_id": student_id, "course_id": course_id, "status": status,
+            })).one_or_none()
+            if row is None or row.status is None:
+                await savepoint.rollback()
+    except DBAPIError as e:
+        if getattr(e.orig, "sqlstate", None) == "23503":  # foreign_key_violation: no such student
+            return EnrollResult("no_student")
+        raise
+    if row is None:
+        return EnrollResult("no_course")
+
+    result = EnrollResult(
+        "enrolled", row.status, row.course_name, row.seats_taken, row.max_capacity,
+    )
+    if row.status is None:
+        # Course full or student already enrolled; any reserved seat was released above
+        result.outcome = "duplicate" if row.existing or row.reserved else "full"
+    return result
+
+
+async def enroll_student(db: AsyncSession, student_id: int, course_id: int,
+                         status: Optional[str] = None) -> EnrollResult:
+    """Reserve a seat and create the enrollment; the caller commits.
+
+    ``status`` defaults to ``approved`` for auto-approve courses and ``pending``
+    otherwise. Anything but ``enrolled`` leaves the session as it was.
+    """
+    for attempt in range(1, ENROLL_MAX_RETRIES + 2):
+        try:
+            result = await _attempt(db, student_id, course_id, status)
+        except DBAPIError as e:
+            if getattr(e.orig, "sqlstate", None) not in _RETRYABLE or attempt > ENROLL_MAX_RETRIES:
+                raise
+            await asyncio.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+            continue
+        result.attempts = attempt
+        return result
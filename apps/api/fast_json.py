@@ -0,0 +1,53 @@
+"""Fast JSON responses for large lists.
+
+For a returned list FastAPI validates every item against ``response_model``
+and then runs jsonable_encoder over the result; for 10k rows that costs more
+than the query. Handlers whose SQL already produces the response shape can
+return a FastJSONResponse (or pagination.page_response(..., raw=True)): a
+returned Response is sent as-is, while the route keeps its ``response_model``
+so the OpenAPI schema is unchanged. Keeping the two in step is then up to the
+SQL.
+
+orjson is used when installed (dates, datetimes and UUIDs natively); without
+it the stdlib json module is used, which is correct but slower.
+"""
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: requirements.txt installs it
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if orjson is None:
+        if isinstance(obj, (date, datetime, time)):
+            return obj.isoformat()
+        if isinstance(obj, UUID):
+            return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def rows_to_dicts(result) -> list[dict]:
+    """Rows of a SQLAlchemy result as plain dicts keyed by column label."""
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
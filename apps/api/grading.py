@@ -0,0 +1,121 @@
+"""Bulk grade updates for one course.
+
+validate_grades() checks the whole batch in one pass; apply_grades() then
+applies every valid row with a single statement: an UPDATE over the unnested (student_id,
+score) arrays that returns the previous scores, feeding a multi-row
+audit_log INSERT in the same statement. Each input row gets an outcome.
+"""
+import csv
+import io
+import os
+from typing import Iterable, Optional
+
+from sqlalchemy import text
+
+BULK_GRADE_MAX_ROWS = int(os.getenv("BULK_GRADE_MAX_ROWS", 5000))
+
+# Postgres int4, the type of the arrays bound into _APPLY_SQL
+INT4_MIN, INT4_MAX = -2**31, 2**31 - 1
+
+_APPLY_SQL = text("""
+    WITH v AS (
+        SELECT * FROM unnest(CAST(:student_ids AS int[]), CAST(:scores AS int[])) AS v(student_id, score)
+    ),
+    upd AS (
+        UPDATE enrollment e
+           SET evaluation_score = v.score
+          FROM v, enrollment old
+         WHERE e.course_id = :course_id
+           AND e.student_id = v.student_id
+           AND e.status = 'approved'
+           AND e.evaluation_score IS DISTINCT FROM v.score
+           AND old.course_id = e.course_id
+           AND old.student_id = e.student_id
+        RETURNING e.student_id, old.evaluation_score AS old_score, e.evaluation_score AS new_score
+    ),
+    audit AS (
+        INSERT INTO audit_log (student_id, course_id, old_score, new_score, changed_by)
+        SELECT student_id, :course_id, old_score, new_score, :changed_by FROM upd
+    )
+    SELECT v.student_id, cur.status, cur.evaluation_score AS current_score,
+           upd.student_id IS NOT NULL AS updated, upd.old_score
+      FROM v
+      LEFT JOIN enrollment cur ON cur.course_id = :course_id AND cur.student_id = v.student_id
+      LEFT JOIN upd ON upd.student_id = v.student_id
+""")
+
+
+def _as_int(value) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_grades(rows: Iterable[dict]) -> tuple[list[tuple[int, int, int]], list[dict]]:
+    """Split input rows into ``(row, student_id, score)`` triples and per-row errors."""
+    valid, errors, seen = [], [], {}
+    for i, row in enumerate(rows):
+        student_id = _as_int(row.get("student_id"))
+        score = _as_int(row.get("evaluation_score", row.get("score")))
+        error = None
+        if student_id is None:
+            error = "student_id must be an integer"
+        elif not INT4_MIN <= student_id <= INT4_MAX:
+            error = "student_id is out of range"
+        elif score is None:
+            error = "evaluation_score must be an integer"
+        elif not 0 <= score <= 100:
+            error = "evaluation_score must be between 0 and 100"
+        elif student_id in seen:
+            error = f"duplicate student_id (also in row {seen[student_id]})"
+        if error:
+            errors.append({"row": i, "student_id": row.get("student_id"), "status": "error", "error": error})
+            continue
+        seen[student_id] = i
+        valid.append((i, student_id, score))
+    return valid, errors
+
+
+def parse_grades_csv(content: bytes) -> list[dict]:
+    """Rows of a CSV with a header naming student_id and evaluation_score (or score)."""
+    reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+    if not reader.fieldnames or "student_id" not in reader.fieldnames:
+        raise ValueError("CSV header must include student_id and evaluation_score")
+    return list(reader)
+
+
+async def apply_grades(db, course_id: int, valid: list[tuple[int, int, int]], changed_by: str) -> list[dict]:
+    """Apply validated grades in one statement; returns an outcome per row.
+
+    Outcomes are ``updated`` (with ``old_score``), ``unchanged``, or an error
+    when the student has no approved enrollment in the course. The caller commits.
+    """
+    if not valid:
+        return []
+    result = await db.execute(_APPLY_SQL, {
+        "course_id": course_id,
+        "student_ids": [student_id for _, student_id, _ in valid],
+        "scores": [score for _, _, score in valid],
+        "changed_by": changed_by,
+    })
+    by_student = {r.student_id: r for r in result}
+
+    outcomes = []
+    for i, student_id, score in valid:
+        r = by_student[student_id]
+        outcome = {"row": i, "student_id": student_id, "evaluation_score": score}
+        if r.updated:
+            outcome.update(status="updated", old_score=r.old_score)
+        elif r.status is None:
+            outcome.update(status="error", error="Student is not enrolled in this course")
+        elif r.status != "approved":
+            outcome.update(status="error", error=f"Enrollment is {r.status}, not approved")
+        else:
+            outcome.update(status="unchanged", old_score=r.current_score)
+        outcomes.append(outcome)
+    return outcomes
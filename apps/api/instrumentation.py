@@ -0,0 +1,172 @@
+"""Per-request SQL instrumentation.
+
+Listeners on every Engine record, for the request being served, how many
+statements ran, how long they took, the slowest one and how often each
+statement shape (fingerprint) repeated. The stats live in a ContextVar, which
+SQLAlchemy's greenlet bridge carries into the sync execution layer.
+
+SQLInstrumentationMiddleware reports them on every response:
+
+  X-DB-Query-Count  statement count (the test suite asserts round-trip budgets on it)
+  Server-Timing     db;dur=<ms>;desc="<n> statements", db-slowest;dur=<ms>, app;dur=<ms>
+
+and writes one structured (JSON) log line on the "api.requests" logger for
+requests slower than SLOW_REQUEST_MS or that repeat a statement at least
+N_PLUS_ONE_THRESHOLD times (the usual sign of a query inside a loop).
+Statements run while a streaming body is being sent happen after the headers
+went out; they are counted in the log line but not in the headers.
+"""
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 500))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 5))
+
+logger = logging.getLogger("api.requests")
+
+_PARAM_RE = re.compile(r"\$\d+|%\(\w+\)s")
+_IN_LIST_RE = re.compile(r"\bIN \(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Statement shape: placeholders as ?, expanded IN lists collapsed, whitespace squashed."""
+    shape = _PARAM_RE.sub("?", statement)
+    shape = _IN_LIST_RE.sub("IN (...)", shape)
+    return _SPACE_RE.sub(" ", shape).strip()
+
+
+class QueryStats:
+    __slots__ = ("count", "total_ms", "slowest_ms", "slowest_sql", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql: Optional[str] = None
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        shape = fingerprint(statement)
+        self.shapes[shape] += 1
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_sql = shape
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int]]:
+        """Statement shapes executed at least ``threshold`` times, most frequent first."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._instrumentation_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    start = getattr(context, "_instrumentation_start", None)
+    if stats is not None and start is not None:
+        stats.record(statement, (time.perf_counter() - start) * 1000)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Record statements executed in this context (nested blocks record separately)."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+_route_paths: dict = {}
+
+
+def route_path(scope) -> str:
+    """Path template of the matched route (e.g. /student/courses/{course_id}), else the raw path."""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return scope.get("path", "")
+    path = _route_paths.get(endpoint)
+    if path is None:
+        path = next(
+            (r.path for r in scope["app"].routes if getattr(r, "endpoint", None) is endpoint),
+            scope.get("path", ""),
+        )
+        _route_paths[endpoint] = path
+    return path
+
+
+def server_timing(stats: QueryStats, app_ms: float) -> str:
+    return (
+        f'db;dur={stats.total_ms:.1f};desc="{stats.count} statements", '
+        f"db-slowest;dur={stats.slowest_ms:.1f}, "
+        f"app;dur={app_ms:.1f}"
+    )
+
+
+class SQLInstrumentationMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        with track_queries() as stats:
+            async def send_with_stats(message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    headers = MutableHeaders(scope=message)
+                    headers.append("X-DB-Query-Count", str(stats.count))
+                    headers.append("Server-Timing", server_timing(stats, (time.perf_counter() - start) * 1000))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_stats)
+            finally:
+                self._log(scope, status_code, (time.perf_counter() - start) * 1000, stats)
+
+    @staticmethod
+    def _log(scope, status_code: int, duration_ms: float, stats: QueryStats):
+        repeated = stats.repeated()
+        slow = duration_ms >= SLOW_REQUEST_MS
+        if not slow and not repeated:
+            return
+        logger.warning(json.dumps({
+            "event": "slow_request" if slow else "repeated_statements",
+            "method": scope["method"],
+            "route": route_path(scope),
+            "path": scope["path"],
+            "status": status_code,
+            "duration_ms": round(duration_ms, 1),
+            "db_statements": stats.count,
+            "db_ms": round(stats.total_ms, 1),
+            "slowest_ms": round(stats.slowest_ms, 1),
+            "slowest_sql": (stats.slowest_sql or "")[:500],
+            "repeated": [{"count": n, "sql": shape[:500]} for shape, n in repeated],
+        }))
@@ -1,10 +1,39 @@
+import asyncio
+import logging
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routers import auth, student, instructor, admin, analyst
 from reports import router as reports
+from database import engine, read_engine, HAS_READ_REPLICA
+from analytics_views import ANALYTICS_REFRESH_SECONDS, analytics_refresh_loop
+from waitlist import WAITLIST_PROMOTE_SECONDS, waitlist_promotion_loop
+import columnar
+from instrumentation import SQLInstrumentationMiddleware
+import metrics
 
-app = FastAPI(title="Assignment IV API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    if ANALYTICS_REFRESH_SECONDS > 0:
+        tasks.append(asyncio.create_task(analytics_refresh_loop(engine)))
+    if WAITLIST_PROMOTE_SECONDS > 0:
+        tasks.append(asyncio.create_task(waitlist_promotion_loop(engine)))
+    if columnar.ANALYTICS_COLUMNAR_SECONDS > 0:
+        if columnar.np is None:
+            logging.getLogger(__name__).warning("ANALYTICS_COLUMNAR_SECONDS is set but numpy is not installed")
+        else:
+            tasks.append(asyncio.create_task(columnar.columnar_refresh_loop(read_engine)))
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    metrics.mark_worker_exit()
+
+
+app = FastAPI(title="Assignment IV API", version="1.0.0", lifespan=lifespan)
 
 # With allow_credentials=True, CORS spec forbids allow_origins="*"; use explicit origins.
 # CORS_ORIGINS env: comma-separated list (e.g. https://dbmslab-ten.vercel.app,http://localhost:3000)
@@ -25,12 +54,19 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+app.add_middleware(SQLInstrumentationMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.track_engine("primary", engine)
+if HAS_READ_REPLICA:
+    metrics.track_engine("replica", read_engine)
+
 app.include_router(auth.router)
 app.include_router(student.router)
 app.include_router(instructor.router)
 app.include_router(admin.router)
 app.include_router(analyst.router)
 app.include_router(reports.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,125 @@
+"""Prometheus metrics, served at GET /metrics.
+
+Request counts/latency/in-flight per route template, DB pool gauges,
+password hashing time and catalog cache lookups. With several uvicorn
+workers, point PROMETHEUS_MULTIPROC_DIR at an empty writable directory (wipe
+it before each start): every worker then keeps its values in mmap'd files there and a scrape
+answered by any worker aggregates all of them. Without it the values are
+per-process.
+"""
+import os
+import time
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from instrumentation import route_path
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or None
+
+REQUESTS = Counter(
+    "api_http_requests_total", "HTTP requests by route template and status code.",
+    ["method", "route", "status"],
+)
+REQUEST_SECONDS = Histogram(
+    "api_http_request_duration_seconds", "HTTP request latency (until the response body is sent).",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+IN_PROGRESS = Gauge(
+    "api_http_requests_in_progress", "HTTP requests being served.",
+    ["method"], multiprocess_mode="livesum",
+)
+POOL_CONNECTIONS = Gauge(
+    "api_db_pool_connections", "SQLAlchemy pool connections by state, sampled after each request.",
+    ["engine", "state"], multiprocess_mode="livesum",
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "api_password_hash_seconds", "bcrypt hash/verify time, including the wait for a hashing thread.",
+    ["operation"],
+    buckets=(0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1, 2, 5),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "api_password_hash_rejected_total", "Hash/verify calls refused with 503 because the queue was full.",
+)
+CATALOG_CACHE_REQUESTS = Counter(
+    "api_catalog_cache_requests_total", "Course catalog cache lookups (hit, miss) and 304 responses (not_modified).",
+    ["result"],
+)
+
+_engines: dict = {}
+
+
+def track_engine(name: str, db_engine):
+    """Report ``db_engine``'s pool in api_db_pool_connections{engine=name}."""
+    if isinstance(db_engine.pool, AsyncAdaptedQueuePool):
+        _engines[name] = db_engine
+
+
+def _sample_pools():
+    for name, db_engine in _engines.items():
+        pool = db_engine.pool
+        POOL_CONNECTIONS.labels(name, "checked_out").set(pool.checkedout())
+        POOL_CONNECTIONS.labels(name, "checked_in").set(pool.checkedin())
+        POOL_CONNECTIONS.labels(name, "overflow").set(max(pool.overflow(), 0))
+
+
+def mark_worker_exit():
+    """Drop this worker's live gauges from the shared directory (call on shutdown)."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        # The route is only known once the router has matched, so in-flight
+        # requests are labelled by method alone.
+        in_progress = IN_PROGRESS.labels(scope["method"])
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            route = route_path(scope) if "endpoint" in scope else "unmatched"
+            REQUESTS.labels(scope["method"], route, str(status_code)).inc()
+            REQUEST_SECONDS.labels(scope["method"], route).observe(time.perf_counter() - start)
+            _sample_pools()
+
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,47 @@
+"""Ordered SQL migrations for objects the ORM cannot express (extensions,
+triggers, materialized views, ...).
+
+Files in sql/migrations are applied in name order and recorded in the
+schema_migration table. Every file must be idempotent (IF NOT EXISTS /
+CREATE OR REPLACE) so a reset database can simply re-apply them all.
+"""
+from pathlib import Path
+
+from sqlalchemy import text
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "sql" / "migrations"
+
+
+def migration_files() -> list[Path]:
+    return sorted(MIGRATIONS_DIR.glob("*.sql"))
+
+
+async def apply_migrations(db_engine, verbose: bool = True) -> list[str]:
+    """Apply pending migrations, each in its own transaction. Returns the applied names."""
+    applied = []
+    async with db_engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migration ("
+            " name varchar(200) PRIMARY KEY,"
+            " applied_at timestamptz NOT NULL DEFAULT now())"
+        ))
+        done = {r[0] for r in await conn.execute(text("SELECT name FROM schema_migration"))}
+
+    for path in migration_files():
+        if path.name in done:
+            if verbose:
+                print(f"  {path.name} OK")
+            continue
+        async with db_engine.begin() as conn:
+            # Record first: this also opens the transaction the script runs in
+            await conn.execute(
+                text("INSERT INTO schema_migration (name) VALUES (:name)"),
+                {"name": path.name},
+            )
+            # Multi-statement scripts need asyncpg's simple query protocol
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.execute(path.read_text())
+        applied.append(path.name)
+        if verbose:
+            print(f"  {path.name} APPLIED")
+    return applied
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Float, DateTime, Text, CheckConstraint, Index
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, Boolean, String, ForeignKey, Date, Float, DateTime, Text, CheckConstraint, Index, Identity, DDL, event, false
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from database import Base
 
+# Trigram indexes below need pg_trgm; triggers etc. live in sql/migrations
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
 
 class AppUser(Base):
     __tablename__ = "app_user"
@@ -40,6 +44,10 @@ class University(Base):
     name = Column(String(100), nullable=False, unique=True)
     country = Column(String(50), nullable=False)
     
+    __table_args__ = (
+        Index("idx_university_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
+    
     # Relationships
     courses = relationship("Course", back_populates="university")
 
@@ -62,6 +70,10 @@ class Topic(Base):
     topic_id = Column(Integer, primary_key=True, autoincrement=True)
     topic_name = Column(String(100), nullable=False, unique=True)
     
+    __table_args__ = (
+        Index("idx_topic_name_trgm", "topic_name", postgresql_using="gin", postgresql_ops={"topic_name": "gin_trgm_ops"}),
+    )
+    
     # Relationships
     courses = relationship("CourseTopic", back_populates="topic")
 
@@ -89,10 +101,15 @@ class Course(Base):
     textbook_id = Column(Integer, ForeignKey("textbook.textbook_id"), nullable=False)
     max_capacity = Column(Integer, default=100, nullable=False)
     current_enrollment = Column(Integer, default=0, nullable=False)
+    # New applications are approved on arrival while seats remain (sql/migrations/004)
+    auto_approve = Column(Boolean, default=False, server_default=false(), nullable=False)
+    # Maintained by trg_course_search_vector; deferred so it is never loaded with the row
+    search_vector = deferred(Column(TSVECTOR))
     
     __table_args__ = (
         Index("idx_course_duration", "duration_weeks"),
-        Index("idx_course_name_trgm", "course_name"), # Placeholder for trgm, might need extension
+        Index("idx_course_name_trgm", "course_name", postgresql_using="gin", postgresql_ops={"course_name": "gin_trgm_ops"}),
+        Index("idx_course_search_vector", "search_vector", postgresql_using="gin"),
     )
     
     # Relationships
@@ -105,6 +122,40 @@ class Course(Base):
     content_items = relationship("ContentItem", back_populates="course", cascade="all, delete-orphan", passive_deletes=True)
 
 
+# Per-course aggregates maintained by triggers on enrollment (sql/migrations/003_course_stats.sql)
+class CourseStats(Base):
+    __tablename__ = "course_stats"
+    
+    course_id = Column(Integer, ForeignKey("course.course_id", ondelete="CASCADE"), primary_key=True)
+    approved_count = Column(Integer, default=0, nullable=False)
+    pending_count = Column(Integer, default=0, nullable=False)
+    rejected_count = Column(Integer, default=0, nullable=False)
+    score_sum = Column(BigInteger, default=0, nullable=False)  # approved enrollments only
+    score_count = Column(Integer, default=0, nullable=False)
+    pass_count = Column(Integer, default=0, nullable=False)  # score >= 40
+    bucket_0_20 = Column(Integer, default=0, nullable=False)
+    bucket_21_40 = Column(Integer, default=0, nullable=False)
+    bucket_41_60 = Column(Integer, default=0, nullable=False)
+    bucket_61_80 = Column(Integer, default=0, nullable=False)
+    bucket_81_100 = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+# Students waiting for a seat in a full course (sql/migrations/006_waitlist.sql, waitlist.py)
+class Waitlist(Base):
+    __tablename__ = "waitlist"
+
+    course_id = Column(Integer, ForeignKey("course.course_id", ondelete="CASCADE"), primary_key=True)
+    student_id = Column(Integer, ForeignKey("student.student_id", ondelete="CASCADE"), primary_key=True)
+    ticket = Column(BigInteger, Identity(), nullable=False)  # queue order
+    joined_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ux_waitlist_course_ticket", "course_id", "ticket", unique=True),
+        Index("idx_waitlist_student", "student_id"),
+    )
+
+
 class CourseTopic(Base):
     __tablename__ = "course_topic"
     
@@ -0,0 +1,217 @@
+"""Keyset (seek) pagination, field projection and on-demand totals for list endpoints.
+
+List endpoints keep returning a JSON array; paging metadata travels in headers:
+
+  X-Next-Cursor    opaque token for the next page (absent on the last page)
+  Link             the same, as rel="next"
+  X-Total-Count    only with ?count=exact|estimate
+  X-Total-Count-Estimated: true   when the total is the planner's estimate
+
+Cursors encode the sort-key values of the last row of a page, so the next page
+is a ``WHERE (key) > (last)`` index seek instead of an ever-growing OFFSET.
+Sort keys must be NOT NULL and end in a unique column.
+
+Paging is opt-in: without ``limit`` or ``cursor`` the whole listing is returned,
+as before pagination existed; a ``cursor`` alone pages by DEFAULT_PAGE_LIMIT.
+"""
+import base64
+import binascii
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from fastapi import HTTPException, Query, Request, Response, status
+from sqlalchemy import and_, func, or_, select, text, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement, Select
+
+from fast_json import FastJSONResponse
+
+DEFAULT_PAGE_LIMIT = int(os.getenv("DEFAULT_PAGE_LIMIT", 100))
+MAX_PAGE_LIMIT = int(os.getenv("MAX_PAGE_LIMIT", 1000))
+
+# Renders :name binds so a compiled statement can be re-wrapped in text()
+_EXPLAIN_DIALECT = postgresql.dialect(paramstyle="named")
+
+
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+class PageParams:
+    """Query parameters shared by paginated endpoints; use as ``Depends(PageParams)``."""
+
+    def __init__(
+        self,
+        request: Request,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT, description="Page size; omit for every row"),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+        count: Optional[str] = Query(None, pattern="^(exact|estimate)$", description="Also return X-Total-Count"),
+    ):
+        self.request = request
+        # None: unpaged (no limit and no cursor given)
+        self.limit = DEFAULT_PAGE_LIMIT if limit is None and cursor else limit
+        self.cursor = cursor
+        self.fields = fields
+        self.count = count
+
+
+@dataclass(frozen=True)
+class Keyset:
+    """Sort key of a listing: ``(expression, descending)`` pairs, unique overall.
+
+    ``name`` is baked into cursors so a token from one ordering (e.g. ranked
+    search) is rejected by another. ``having`` puts the seek predicate in
+    HAVING, for keys that include aggregates.
+    """
+    name: str
+    columns: tuple[tuple[ColumnElement, bool], ...]
+    having: bool = False
+
+    def encode(self, values: list) -> str:
+        raw = json.dumps([self.name, values], separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+    def decode(self, token: str) -> list:
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            name, values = json.loads(raw)
+        except (binascii.Error, ValueError, TypeError):
+            raise _bad_request("Invalid cursor")
+        if name != self.name or not isinstance(values, list) or len(values) != len(self.columns):
+            raise _bad_request("Cursor does not belong to this listing")
+        return values
+
+    def order_by(self) -> list:
+        return [expr.desc() if descending else expr.asc() for expr, descending in self.columns]
+
+    def after(self, values: list) -> ColumnElement:
+        """Rows strictly after ``values`` in this ordering."""
+        directions = {descending for _, descending in self.columns}
+        exprs = [expr for expr, _ in self.columns]
+        if len(exprs) == 1:
+            expr, descending = self.columns[0]
+            return expr < values[0] if descending else expr > values[0]
+        if len(directions) == 1:
+            # Uniform direction: a row comparison the planner can seek on
+            if directions == {True}:
+                return tuple_(*exprs) < tuple_(*values)
+            return tuple_(*exprs) > tuple_(*values)
+        clauses = []
+        for i, ((expr, descending), value) in enumerate(zip(self.columns, values)):
+            prefix = [e == v for e, v in zip(exprs[:i], values[:i])]
+            clauses.append(and_(*prefix, expr < value if descending else expr > value))
+        return or_(*clauses)
+
+
+class Projection:
+    """Public field name -> column expression for ``?fields=``."""
+
+    def __init__(self, **columns: ColumnElement):
+        self.columns = columns
+
+    def resolve(self, fields: Optional[str]) -> list[str]:
+        if not fields:
+            return list(self.columns)
+        names = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [n for n in names if n not in self.columns]
+        if unknown:
+            raise _bad_request(
+                f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(self.columns)}"
+            )
+        return list(dict.fromkeys(names))
+
+    def select_columns(self, names: list[str]) -> list:
+        return [self.columns[n].label(n) for n in names]
+
+
+@dataclass
+class Page:
+    items: list[dict]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_estimated: bool = False
+
+
+async def count_rows(db: AsyncSession, stmt: Select, mode: str) -> int:
+    """Exact COUNT(*) of ``stmt``, or the planner's row estimate (no scan)."""
+    if mode == "exact":
+        return (await db.execute(select_count(stmt))).scalar_one()
+    compiled = stmt.compile(
+        dialect=_EXPLAIN_DIALECT,
+        compile_kwargs={"render_postcompile": True},
+    )
+    plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"), compiled.params)).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def select_count(stmt: Select) -> Select:
+    return select(func.count()).select_from(stmt.order_by(None).subquery())
+
+
+async def paginate(db: AsyncSession, stmt: Select, keyset: Keyset, params: PageParams) -> Page:
+    """Run one page of ``stmt`` (filters applied, no ORDER BY / LIMIT) in keyset order.
+
+    Items are dicts of the statement's labelled columns.
+    """
+    total = None
+    if params.count:
+        total = await count_rows(db, stmt, params.count)
+
+    key_labels = [f"_k{i}" for i in range(len(keyset.columns))]
+    paged = stmt.add_columns(*(expr.label(k) for (expr, _), k in zip(keyset.columns, key_labels)))
+    if params.cursor:
+        seek = keyset.after(keyset.decode(params.cursor))
+        paged = paged.having(seek) if keyset.having else paged.where(seek)
+    paged = paged.order_by(*keyset.order_by())
+    if params.limit is not None:
+        paged = paged.limit(params.limit + 1)
+
+    rows = (await db.execute(paged)).all()
+    next_cursor = None
+    if params.limit is not None and len(rows) > params.limit:
+        rows = rows[:params.limit]
+        last = rows[-1]._mapping
+        next_cursor = keyset.encode([last[k] for k in key_labels])
+
+    # Sort-key columns were appended last; zip stops before them
+    keys = list(paged.selected_columns.keys())[:-len(key_labels)]
+    items = [dict(zip(keys, row)) for row in rows]
+    return Page(items, next_cursor, total, params.count == "estimate")
+
+
+def page_headers(page: Page, params: PageParams) -> dict:
+    headers = {}
+    if page.next_cursor:
+        headers["X-Next-Cursor"] = page.next_cursor
+        next_url = params.request.url.include_query_params(cursor=page.next_cursor)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    if page.total is not None:
+        headers["X-Total-Count"] = str(page.total)
+        if page.total_estimated:
+            headers["X-Total-Count-Estimated"] = "true"
+    return headers
+
+
+def page_response(page: Page, params: PageParams, response: Response, raw: bool = False) -> Any:
+    """Attach paging headers. With ``?fields=`` or ``raw=True`` the items are
+    sent as-is through FastJSONResponse, bypassing the endpoint's response_model
+    (which expects every field, and would re-validate every row).
+
+    Headers the handler set on ``response`` (e.g. X-Data-Source) are copied
+    over, since FastAPI drops them once a Response is returned."""
+    headers = page_headers(page, params)
+    if params.fields or raw:
+        fast = FastJSONResponse(page.items, headers=headers)
+        fast.raw_headers.extend(
+            (key, value) for key, value in response.headers.raw
+            if key not in (b"content-length", b"content-type")
+        )
+        return fast
+    response.headers.update(headers)
+    return page.items
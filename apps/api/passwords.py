@@ -0,0 +1,89 @@
+"""Password hashing and verification.
+
+bcrypt is deliberately slow (~100-300 ms per call at cost 12), so the async
+helpers run it on a small dedicated thread pool (bcrypt releases the GIL)
+instead of the event loop. The number of queued + running calls is capped;
+beyond that callers get a fast 503 rather than piling up behind a login
+burst. The *_sync variants are for scripts that run outside the server.
+"""
+import asyncio
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import bcrypt
+from fastapi import HTTPException, status
+
+from metrics import PASSWORD_HASH_REJECTED, PASSWORD_HASH_SECONDS
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", HASH_WORKERS * 16))
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+_pending = 0
+_rejected = 0
+
+_COST_RE = re.compile(r"^\$2[abxy]?\$(\d{2})\$")
+
+
+def _to_bytes(value) -> bytes:
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
+def hash_password_sync(password, rounds: Optional[int] = None) -> str:
+    return bcrypt.hashpw(_to_bytes(password), bcrypt.gensalt(rounds or BCRYPT_ROUNDS)).decode("utf-8")
+
+
+def verify_password_sync(plain_password, hashed_password) -> bool:
+    return bcrypt.checkpw(_to_bytes(plain_password), _to_bytes(hashed_password))
+
+
+def hash_cost(hashed_password: str) -> Optional[int]:
+    """Cost factor encoded in a bcrypt hash, or None if it is not a bcrypt hash."""
+    match = _COST_RE.match(hashed_password or "")
+    return int(match.group(1)) if match else None
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True when the stored hash was made with a different cost than BCRYPT_ROUNDS."""
+    return hash_cost(hashed_password) != BCRYPT_ROUNDS
+
+
+async def _run_bounded(operation: str, fn, *args):
+    global _pending, _rejected
+    if _pending >= HASH_MAX_PENDING:
+        _rejected += 1
+        PASSWORD_HASH_REJECTED.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+    _pending += 1
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _pending -= 1
+        PASSWORD_HASH_SECONDS.labels(operation).observe(time.perf_counter() - start)
+
+
+async def hash_password(password) -> str:
+    return await _run_bounded("hash", hash_password_sync, password)
+
+
+async def verify_password(plain_password, hashed_password) -> bool:
+    return await _run_bounded("verify", verify_password_sync, plain_password, hashed_password)
+
+
+def hashing_stats() -> dict:
+    return {
+        "workers": HASH_WORKERS,
+        "max_pending": HASH_MAX_PENDING,
+        "pending": _pending,
+        "rejected": _rejected,
+        "rounds": BCRYPT_ROUNDS,
+    }
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc, case, text
-from database import get_db
-from models import Student, Course, Enrollment, Topic, CourseTopic, Instructor, TeachingAssignment
-from dependencies import RoleChecker
+from sqlalchemy import select, func, desc, case, text, any_, cast, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from typing import Optional
+from models import Student, Course, Enrollment, Topic, CourseTopic, AppUser
+from dependencies import RoleChecker, get_current_user, get_read_db
+from reports.export import EXPORT_FORMAT_PATTERN, export_response
+from analytics_views import analytics_source, set_staleness_headers
+from pagination import PageParams, Keyset, Projection, paginate, page_response
+from routers.analyst import live_data
+from columnar import current_snapshot, set_snapshot_headers
 from datetime import datetime, timedelta
 
 router = APIRouter(
@@ -12,12 +18,30 @@ router = APIRouter(
     dependencies=[Depends(RoleChecker(["analyst", "admin"]))]
 )
 
+def _export_format():
+    return Query(None, alias="format", pattern=EXPORT_FORMAT_PATTERN,
+                 description="Stream the report as csv or ndjson instead of a JSON array")
+
+
+def _module_row(r):
+    return {"program_id": r[0], "avg_score": round(r[1], 2) if r[1] else 0, "students": r[2]}
+
+
 @router.get("/module-analytics")
-async def get_module_analytics(db: AsyncSession = Depends(get_db)):
+async def get_module_analytics(
+    response: Response,
+    export: Optional[str] = _export_format(),
+    live: bool = Depends(live_data),
+    current_user: AppUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
     Cohort Analysis: Track retention or completion rates.
     Simple version: Avg scores per program type.
     """
+    if not export and (snapshot := current_snapshot(live)):
+        set_snapshot_headers(response, snapshot)
+        return snapshot.module_analytics()
     stmt = (
         select(
             Course.program_id, 
@@ -27,67 +51,93 @@ async def get_module_analytics(db: AsyncSession = Depends(get_db)):
         .join(Enrollment, Course.course_id == Enrollment.course_id)
         .group_by(Course.program_id)
     )
+    if export:
+        return export_response("module-analytics", export, current_user, stmt,
+                               ("program_id", "avg_score", "students"), _module_row)
     result = await db.execute(stmt)
-    return [{"program_id": r[0], "avg_score": round(r[1], 2) if r[1] else 0, "students": r[2]} for r in result]
+    return [_module_row(r) for r in result]
+
+IPI_COLUMNS = ("instructor_id", "instructor", "topic_id", "topic", "instructor_avg", "global_topic_avg", "ipi", "graded")
+
 
 @router.get("/instructor-performance")
-async def instructor_performance(db: AsyncSession = Depends(get_db)):
+async def instructor_performance(
+    response: Response,
+    topic: Optional[str] = None,
+    instructor: Optional[str] = None,
+    min_graded: int = Query(0, ge=0, description="Only instructor/topic pairs with at least this many graded enrollments"),
+    sort: str = Query("-ipi", pattern="^-?(ipi|instructor_avg|graded)$"),
+    export: Optional[str] = _export_format(),
+    page: PageParams = Depends(),
+    cached: bool = Query(False, description="Read mv_instructor_performance (may lag by ANALYTICS_REFRESH_SECONDS) instead of computing live"),
+    current_user: AppUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
     Instructor Performance Index (IPI) = Instructor Avg / Global Topic Avg
+
+    One row per instructor and topic, computed live in a single statement (a
+    window over the topic); ``cached=true`` reads the same rows from
+    mv_instructor_performance instead.
     """
-    # 1. Global Topic Avg
-    topic_avg_stmt = (
-        select(
-            Topic.topic_id, 
-            func.avg(Enrollment.evaluation_score).label("global_avg")
-        )
-        .join(CourseTopic, Topic.topic_id == CourseTopic.topic_id)
-        .join(Course, CourseTopic.course_id == Course.course_id)
-        .join(Enrollment, Course.course_id == Enrollment.course_id)
-        .group_by(Topic.topic_id)
-    )
-    top_avg_res = await db.execute(topic_avg_stmt)
-    topic_avgs = {r[0]: r[1] for r in top_avg_res}
+    live = not cached
+    src = analytics_source("mv_instructor_performance", live)
+    stmt = select(src)
+    if topic:
+        stmt = stmt.where(src.c.topic.ilike(f"%{topic}%"))
+    if instructor:
+        stmt = stmt.where(src.c.instructor.ilike(f"%{instructor}%"))
+    if min_graded:
+        stmt = stmt.where(src.c.graded >= min_graded)
+    sort_column = src.c[sort.lstrip("-")]
+    descending = sort.startswith("-")
+
+    if export:
+        order = sort_column.desc() if descending else sort_column.asc()
+        return export_response("instructor-performance", export, current_user,
+                               stmt.order_by(order, src.c.instructor_id, src.c.topic_id),
+                               IPI_COLUMNS, lambda r: dict(r._mapping))
+
+    fields = Projection(**{name: src.c[name] for name in IPI_COLUMNS})
+    keyset = Keyset(f"instructor_performance_{sort}",
+                    ((sort_column, descending), (src.c.instructor_id, False), (src.c.topic_id, False)))
+    stmt = stmt.with_only_columns(*fields.select_columns(fields.resolve(page.fields)))
+    result = await paginate(db, stmt, keyset, page)
+    await set_staleness_headers(response, db, "mv_instructor_performance", live)
+    return page_response(result, page, response, raw=True)
+
+
+def _at_risk_row(r):
+    return {
+        "student_id": r[0], 
+        "name": r[1], 
+        "email": r[2], 
+        "avg_score": round(r[3], 2) if r[3] else 0
+    }
 
-    # 2. Instructor stats per topic
-    stmt = (
-        select(
-            Instructor.instructor_id,
-            Instructor.full_name,
-            Topic.topic_id,
-            Topic.topic_name,
-            func.avg(Enrollment.evaluation_score).label("instructor_avg")
-        )
-        .join(TeachingAssignment, Instructor.instructor_id == TeachingAssignment.instructor_id)
-        .join(Course, TeachingAssignment.course_id == Course.course_id)
-        .join(Enrollment, Course.course_id == Enrollment.course_id)
-        .join(CourseTopic, Course.course_id == CourseTopic.course_id)
-        .join(Topic, CourseTopic.topic_id == Topic.topic_id)
-        .group_by(Instructor.instructor_id, Instructor.full_name, Topic.topic_id, Topic.topic_name)
-    )
-    
-    result = await db.execute(stmt)
-    data = []
-    for r in result:
-        i_id, i_name, t_id, t_name, i_avg = r
-        g_avg = topic_avgs.get(t_id) or 0
-        i_avg = i_avg or 0
-        ipi = i_avg / g_avg if g_avg and g_avg > 0 else 0
-        data.append({
-            "instructor": i_name,
-            "topic": t_name,
-            "instructor_avg": round(i_avg, 2) if i_avg else 0,
-            "global_topic_avg": round(g_avg, 2) if g_avg else 0,
-            "ipi": round(ipi, 2)
-        })
-    
-    return data
 
 @router.get("/at-risk-students")
-async def at_risk_students(threshold: int = 40, db: AsyncSession = Depends(get_db)):
+async def at_risk_students(
+    response: Response,
+    threshold: int = 40,
+    export: Optional[str] = _export_format(),
+    live: bool = Depends(live_data),
+    current_user: AppUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
     Identify students with avg score < threshold.
     """
+    if not export and (snapshot := current_snapshot(live)):
+        set_snapshot_headers(response, snapshot)
+        at_risk = dict(snapshot.at_risk_students(threshold))
+        # The snapshot has no names; look up just the matching students
+        students = await db.execute(
+            select(Student.student_id, Student.full_name, Student.email)
+            .where(Student.student_id == any_(cast(list(at_risk), ARRAY(Integer))))
+            .order_by(Student.student_id)
+        )
+        return [_at_risk_row((sid, name, email, at_risk[sid])) for sid, name, email in students]
     stmt = (
         select(
             Student.student_id,
@@ -99,22 +149,30 @@ async def at_risk_students(threshold: int = 40, db: AsyncSession = Depends(get_d
         .group_by(Student.student_id, Student.full_name, Student.email)
         .having(func.avg(Enrollment.evaluation_score) < threshold)
     )
+    if export:
+        return export_response("at-risk-students", export, current_user, stmt,
+                               ("student_id", "name", "email", "avg_score"), _at_risk_row)
     result = await db.execute(stmt)
-    return [
-        {
-            "student_id": r[0], 
-            "name": r[1], 
-            "email": r[2], 
-            "avg_score": round(r[3], 2) if r[3] else 0
-        } 
-        for r in result
-    ]
+    return [_at_risk_row(r) for r in result]
+
+def _topic_row(r):
+    return {"topic": r[0], "enrollments": r[1]}
+
 
 @router.get("/topic-trends")
-async def topic_trends(db: AsyncSession = Depends(get_db)):
+async def topic_trends(
+    response: Response,
+    export: Optional[str] = _export_format(),
+    live: bool = Depends(live_data),
+    current_user: AppUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
     Topic trends: Count enrollments per topic.
     """
+    if not export and (snapshot := current_snapshot(live)):
+        set_snapshot_headers(response, snapshot)
+        return snapshot.topic_trends()
     stmt = (
         select(Topic.topic_name, func.count(Enrollment.student_id).label("enrollments"))
         .join(CourseTopic, Topic.topic_id == CourseTopic.topic_id)
@@ -123,5 +181,7 @@ async def topic_trends(db: AsyncSession = Depends(get_db)):
         .group_by(Topic.topic_name)
         .order_by(desc("enrollments"))
     )
+    if export:
+        return export_response("topic-trends", export, current_user, stmt, ("topic", "enrollments"), _topic_row)
     result = await db.execute(stmt)
-    return [{"topic": r[0], "enrollments": r[1]} for r in result]
+    return [_topic_row(r) for r in result]
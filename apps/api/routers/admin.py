@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+import os
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, func, and_
+from sqlalchemy import select, delete, func, literal, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from datetime import datetime, timezone
-from database import get_db
-from models import AppUser, TeachingAssignment, Student, Enrollment, Instructor, Course, University, Program, CourseProposal, TopicProposal, Topic, Textbook, Executive, CourseTopic
-from dependencies import RoleChecker
-from routers.auth import get_password_hash
-from pydantic import BaseModel
+from database import get_db, engine, read_engine, HAS_READ_REPLICA, pool_stats, ENGINE_SETTINGS
+from models import AppUser, TeachingAssignment, Student, Enrollment, Instructor, Course, University, Program, CourseProposal, TopicProposal, Topic, Textbook, Executive, CourseTopic, CourseStats
+from dependencies import RoleChecker, invalidate_principal, invalidate_profile
+from cache import cache_stats
+from catalog import bump_catalog_version
+from course_detail import invalidate_course_detail
+from passwords import hash_password, hashing_stats
+from pagination import PageParams, Keyset, Projection, paginate, page_response
+from analytics_views import ANALYTICS_VIEWS, refresh_analytics_views
+from course_stats import check_course_stats
+from counts import table_count
+from waitlist import wake_promoter
+from pydantic import BaseModel, Field
 
 router = APIRouter(
     prefix="/admin",
@@ -66,7 +76,6 @@ class DashboardStats(BaseModel):
     total_courses: int
     total_students: int
     total_instructors: int
-    total_instructors: int
     total_enrollments: int
 
 class StudentUpdateRequest(BaseModel):
@@ -85,6 +94,7 @@ class CourseUpdateRequest(BaseModel):
     duration_weeks: Optional[int] = None
     university_id: Optional[int] = None
     program_id: Optional[int] = None
+    max_capacity: Optional[int] = Field(None, ge=0)
     topic_ids: Optional[List[int]] = None
 
 
@@ -137,29 +147,91 @@ class TopicProposalListItem(BaseModel):
     status: str
 
 
+# Helpers
+async def link_course_topics(db: AsyncSession, course_id: int, topic_ids: Optional[List[int]]):
+    """Link existing topics to a course in one INSERT ... SELECT; unknown ids are skipped."""
+    ids = list(dict.fromkeys(topic_ids or []))
+    if not ids:
+        return
+    await db.execute(
+        pg_insert(CourseTopic)
+        .from_select(
+            ["course_id", "topic_id"],
+            select(literal(course_id, Integer), Topic.topic_id).where(Topic.topic_id.in_(ids)),
+        )
+        .on_conflict_do_nothing()
+    )
+
+
 # Endpoints
 @router.get("/stats", response_model=DashboardStats)
-async def get_dashboard_stats(db: AsyncSession = Depends(get_db)):
-    """Get dashboard statistics for admin."""
-    users = (await db.execute(select(func.count(AppUser.id)))).scalar() or 0
-    courses = (await db.execute(select(func.count(Course.course_id)))).scalar() or 0
-    students = (await db.execute(select(func.count(Student.student_id)))).scalar() or 0
-    instructors = (await db.execute(select(func.count(Instructor.instructor_id)))).scalar() or 0
-    enrollments = (await db.execute(select(func.count()).select_from(Enrollment))).scalar() or 0
-    
-    return DashboardStats(
-        total_users=users,
-        total_courses=courses,
-        total_students=students,
-        total_instructors=instructors,
-        total_enrollments=enrollments
+async def get_dashboard_stats(estimate: bool = False, db: AsyncSession = Depends(get_db)):
+    """Get dashboard statistics for admin in one round trip.
+
+    `estimate=true` reads planner row estimates (pg_class.reltuples) instead of counting.
+    """
+    stmt = select(
+        table_count(AppUser, estimate).label("total_users"),
+        table_count(Course, estimate).label("total_courses"),
+        table_count(Student, estimate).label("total_students"),
+        table_count(Instructor, estimate).label("total_instructors"),
+        table_count(Enrollment, estimate).label("total_enrollments"),
     )
+    row = (await db.execute(stmt)).one()
+    return DashboardStats(**row._mapping)
+
+@router.get("/pool-stats")
+async def get_pool_stats():
+    """Connection pool gauges (checked-out, overflow) and checkout wait-time histogram for this worker."""
+    return {
+        "profile": os.getenv("DB_PROFILE", "dev"),
+        "pool_size": ENGINE_SETTINGS.pool_size,
+        "max_overflow": ENGINE_SETTINGS.max_overflow,
+        "primary": pool_stats(engine),
+        "replica": pool_stats(read_engine) if HAS_READ_REPLICA else None,
+        "password_hashing": hashing_stats(),
+    }
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Hit/miss counters and sizes of the in-process caches of this worker."""
+    return cache_stats()
+
+@router.post("/analytics/refresh")
+async def refresh_analytics(views: Optional[List[str]] = Body(None, embed=True)):
+    """Refresh the analytics materialized views now (all of them unless `views` is given)."""
+    unknown = [v for v in views or [] if v not in ANALYTICS_VIEWS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown view(s): {', '.join(unknown)}")
+    timings = await refresh_analytics_views(engine, views)
+    return {"refreshed": {v: ms for v, ms in timings.items() if ms is not None},
+            "skipped": [v for v, ms in timings.items() if ms is None]}
+
+@router.get("/course-stats/check")
+async def check_course_stats_drift(db: AsyncSession = Depends(get_db)):
+    """Compare course_stats with a full recompute from enrollment (read-only)."""
+    drift = await check_course_stats(db)
+    return {"drifted_courses": len(drift), "drift": drift}
+
+@router.post("/course-stats/repair")
+async def repair_course_stats_drift(db: AsyncSession = Depends(get_db)):
+    """Overwrite drifted course_stats rows with the recomputed values."""
+    drift = await check_course_stats(db, repair=True)
+    return {"drifted_courses": len(drift), "repaired": bool(drift), "drift": drift}
+
+USER_FIELDS = Projection(id=AppUser.id, email=AppUser.email, role=AppUser.role)
+USER_KEY = Keyset("user_id", ((AppUser.id, False),))
+
 
 @router.get("/users", response_model=List[UserResponse])
-async def list_users(db: AsyncSession = Depends(get_db)):
-    """List all app users."""
-    result = await db.execute(select(AppUser))
-    return result.scalars().all()
+async def list_users(
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+):
+    """List app users, one keyset page at a time."""
+    stmt = select(*USER_FIELDS.select_columns(USER_FIELDS.resolve(page.fields)))
+    return page_response(await paginate(db, stmt, USER_KEY, page), page, response)
 
 @router.post("/users")
 async def create_user(
@@ -171,7 +243,7 @@ async def create_user(
     if result.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     # Admin-created instructor/analyst are immediately approved
     now_utc = datetime.now(timezone.utc)
     approved_at = now_utc if user.role in ("instructor", "analyst", "admin") else None
@@ -266,6 +338,13 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
 
     await db.execute(delete(AppUser).where(AppUser.id == user_id))
     await db.commit()
+    invalidate_principal(user.email)
+    if user.role == "student":
+        # Their enrollments freed seats
+        wake_promoter()
+    if user.role == "instructor":
+        # Their teaching assignments went with them; courses list instructors
+        invalidate_course_detail()
     return {"message": "User deleted"}
 
 
@@ -308,6 +387,7 @@ async def approve_instructor(user_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found or not an instructor")
     user.approved_at = datetime.now(timezone.utc)
     await db.commit()
+    invalidate_principal(user.email)
     return {"message": "Instructor approved"}
 
 
@@ -320,6 +400,7 @@ async def approve_analyst(user_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found or not an analyst")
     user.approved_at = datetime.now(timezone.utc)
     await db.commit()
+    invalidate_principal(user.email)
     return {"message": "Analyst approved"}
 
 
@@ -374,10 +455,7 @@ async def approve_course_proposal(
         course_id=course.course_id,
         role="instructor",
     ))
-    for topic_id in body.topic_ids or []:
-        existing = (await db.execute(select(Topic).where(Topic.topic_id == topic_id))).scalar_one_or_none()
-        if existing:
-            db.add(CourseTopic(course_id=course.course_id, topic_id=topic_id))
+    await link_course_topics(db, course.course_id, body.topic_ids)
     proposal.status = "approved"
     try:
         await db.commit()
@@ -389,6 +467,8 @@ async def approve_course_proposal(
         if "foreign key" in msg.lower() or "violates" in msg.lower():
             raise HTTPException(status_code=400, detail="Invalid university, program, textbook, or instructor reference")
         raise HTTPException(status_code=400, detail="Database constraint violation")
+    bump_catalog_version()
+    invalidate_profile(*await _instructor_emails(db, proposal.instructor_id))
     return {"message": "Course approved and created", "course_id": course.course_id}
 
 
@@ -473,12 +553,9 @@ async def create_course(body: CourseCreateRequest, db: AsyncSession = Depends(ge
     )
     db.add(course)
     await db.flush()
-    topic_ids = body.topic_ids or []
-    for topic_id in topic_ids:
-        existing = (await db.execute(select(Topic).where(Topic.topic_id == topic_id))).scalar_one_or_none()
-        if existing:
-            db.add(CourseTopic(course_id=course.course_id, topic_id=topic_id))
+    await link_course_topics(db, course.course_id, body.topic_ids)
     await db.commit()
+    bump_catalog_version()
     await db.refresh(course)
     return {"message": "Course created", "course_id": course.course_id}
 
@@ -522,38 +599,39 @@ async def get_course_for_admin(course_id: int, db: AsyncSession = Depends(get_db
     )
 
 
+COURSE_FIELDS = Projection(
+    course_id=Course.course_id,
+    course_name=Course.course_name,
+    duration_weeks=Course.duration_weeks,
+    university_name=University.name,
+    program_name=Program.program_name,
+    enrollment_count=func.coalesce(CourseStats.approved_count, 0),
+    instructor_names=func.string_agg(func.distinct(Instructor.full_name), ', '),
+)
+COURSE_KEY = Keyset("course_id", ((Course.course_id, False),))
+
+
 @router.get("/courses", response_model=List[CourseResponse])
-async def list_courses(db: AsyncSession = Depends(get_db)):
-    """List all courses with enrollment counts and assigned instructors."""
+async def list_courses(
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+):
+    """List courses with enrollment counts and assigned instructors.
+
+    The projection matches CourseResponse, so rows are sent without re-validation.
+    """
     stmt = (
-        select(
-            Course,
-            University.name.label("university_name"),
-            Program.program_name,
-            func.count(func.distinct(Enrollment.student_id)).label("enrollment_count"),
-            func.string_agg(func.distinct(Instructor.full_name), ', ').label("instructor_names")
-        )
+        select(*COURSE_FIELDS.select_columns(COURSE_FIELDS.resolve(page.fields)))
+        .select_from(Course)
         .outerjoin(University, Course.university_id == University.university_id)
         .outerjoin(Program, Course.program_id == Program.program_id)
-        .outerjoin(Enrollment, and_(Enrollment.course_id == Course.course_id, Enrollment.status == "approved"))
+        .outerjoin(CourseStats, CourseStats.course_id == Course.course_id)
         .outerjoin(TeachingAssignment, Course.course_id == TeachingAssignment.course_id)
         .outerjoin(Instructor, TeachingAssignment.instructor_id == Instructor.instructor_id)
-        .group_by(Course.course_id, University.name, Program.program_name)
+        .group_by(Course.course_id, University.name, Program.program_name, CourseStats.approved_count)
     )
-    result = await db.execute(stmt)
-    
-    courses = []
-    for row in result:
-        courses.append(CourseResponse(
-            course_id=row[0].course_id,
-            course_name=row[0].course_name,
-            duration_weeks=row[0].duration_weeks,
-            university_name=row[1],
-            program_name=row[2],
-            enrollment_count=row[3] or 0,
-            instructor_names=row[4]
-        ))
-    return courses
+    return page_response(await paginate(db, stmt, COURSE_KEY, page), page, response, raw=True)
 
 
 @router.get("/universities")
@@ -580,17 +658,54 @@ async def list_textbooks(db: AsyncSession = Depends(get_db)):
     return [{"textbook_id": t.textbook_id, "title": t.title} for t in result.scalars().all()]
 
 
+INSTRUCTOR_FIELDS = Projection(
+    instructor_id=Instructor.instructor_id,
+    full_name=Instructor.full_name,
+    email=Instructor.email,
+)
+INSTRUCTOR_KEY = Keyset("instructor_id", ((Instructor.instructor_id, False),))
+
+
 @router.get("/instructors", response_model=List[InstructorResponse])
-async def list_instructors(db: AsyncSession = Depends(get_db)):
-    """List all instructors."""
-    result = await db.execute(select(Instructor))
-    return result.scalars().all()
+async def list_instructors(
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+):
+    """List instructors."""
+    stmt = select(*INSTRUCTOR_FIELDS.select_columns(INSTRUCTOR_FIELDS.resolve(page.fields)))
+    return page_response(await paginate(db, stmt, INSTRUCTOR_KEY, page), page, response)
+
+
+STUDENT_FIELDS = Projection(
+    student_id=Student.student_id,
+    full_name=Student.full_name,
+    email=Student.email,
+    country=Student.country,
+    age=Student.age,
+    skill_level=Student.skill_level,
+)
+STUDENT_KEY = Keyset("student_id", ((Student.student_id, False),))
+
 
 @router.get("/students", response_model=List[StudentResponse])
-async def list_students(db: AsyncSession = Depends(get_db)):
-    """List all students."""
-    result = await db.execute(select(Student))
-    return result.scalars().all()
+async def list_students(
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+):
+    """List students."""
+    stmt = select(*STUDENT_FIELDS.select_columns(STUDENT_FIELDS.resolve(page.fields)))
+    return page_response(await paginate(db, stmt, STUDENT_KEY, page), page, response)
+
+async def _instructor_emails(db: AsyncSession, instructor_id: int) -> tuple:
+    """Emails whose cached profile lists this instructor's courses (instructor row and linked user)."""
+    row = (await db.execute(
+        select(Instructor.email, AppUser.email)
+        .outerjoin(AppUser, AppUser.id == Instructor.user_id)
+        .where(Instructor.instructor_id == instructor_id)
+    )).first()
+    return tuple(row) if row else ()
 
 @router.post("/courses/{course_id}/assign-instructor")
 async def assign_instructor(
@@ -623,6 +738,8 @@ async def assign_instructor(
     )
     db.add(new_assignment)
     await db.commit()
+    invalidate_course_detail(course_id)
+    invalidate_profile(*await _instructor_emails(db, request.instructor_id))
     return {"message": "Instructor assigned successfully"}
 
 @router.delete("/courses/{course_id}/instructors/{instructor_id}")
@@ -639,6 +756,8 @@ async def remove_instructor_assignment(
         )
     )
     await db.commit()
+    invalidate_course_detail(course_id)
+    invalidate_profile(*await _instructor_emails(db, instructor_id))
     return {"message": "Instructor removed from course"}
 
 @router.delete("/students/{student_id}")
@@ -658,6 +777,8 @@ async def delete_student(
 
     await db.execute(delete(Student).where(Student.student_id == student_id))
     await db.commit()
+    invalidate_principal(student.email)
+    wake_promoter()
     return {"message": "Student deleted"}
 
 @router.delete("/enrollments/{student_id}/{course_id}")
@@ -666,7 +787,7 @@ async def delete_enrollment(
     course_id: int,
     db: AsyncSession = Depends(get_db)
 ):
-    """Delete an enrollment (trigger handles counter update)."""
+    """Delete an enrollment (trigger releases the seat; the waitlist fills it)."""
     enr_result = await db.execute(
         select(Enrollment).where(
             (Enrollment.student_id == student_id) &
@@ -684,6 +805,7 @@ async def delete_enrollment(
         )
     )
     await db.commit()
+    wake_promoter()
     return {"message": "Enrollment deleted"}
 
 @router.get("/course-assignments/{course_id}", response_model=List[InstructorResponse])
@@ -708,6 +830,7 @@ async def update_student(
     student = result.scalar_one_or_none()
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
+    previous_email = student.email
 
     if student_update.full_name is not None:
         student.full_name = student_update.full_name
@@ -721,6 +844,7 @@ async def update_student(
         student.skill_level = student_update.skill_level
 
     await db.commit()
+    invalidate_principal(previous_email, student.email)
     await db.refresh(student)
     return {"message": "Student updated successfully", "student": {
         "student_id": student.student_id,
@@ -751,13 +875,15 @@ async def update_course(
         course.university_id = course_update.university_id
     if course_update.program_id is not None:
         course.program_id = course_update.program_id
+    seats_added = False
+    if course_update.max_capacity is not None:
+        # Lowering it below current_enrollment keeps existing seats; it only blocks new ones
+        seats_added = course_update.max_capacity > course.max_capacity
+        course.max_capacity = course_update.max_capacity
 
     if course_update.topic_ids is not None:
         await db.execute(delete(CourseTopic).where(CourseTopic.course_id == course_id))
-        for topic_id in course_update.topic_ids:
-            existing = (await db.execute(select(Topic).where(Topic.topic_id == topic_id))).scalar_one_or_none()
-            if existing:
-                db.add(CourseTopic(course_id=course_id, topic_id=topic_id))
+        await link_course_topics(db, course_id, course_update.topic_ids)
 
     try:
         await db.commit()
@@ -765,6 +891,10 @@ async def update_course(
         await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
+    bump_catalog_version()
+    invalidate_course_detail(course_id)
+    if seats_added:
+        wake_promoter()
     await db.refresh(course)
     return {"message": "Course updated successfully"}
 
@@ -782,6 +912,7 @@ async def update_instructor(
 
     if instructor_update.full_name is not None:
         instructor.full_name = instructor_update.full_name
+    previous_email = instructor.email
     if instructor_update.email is not None:
         instructor.email = instructor_update.email
 
@@ -791,6 +922,9 @@ async def update_instructor(
         await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
+    # Names and emails are cached in the detail of every course they teach
+    invalidate_course_detail()
+    invalidate_profile(previous_email, instructor_update.email)
     await db.refresh(instructor)
     return {"message": "Instructor updated successfully"}
 
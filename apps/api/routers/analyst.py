@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, desc
-from database import get_db
-from models import Course, Enrollment, Student, University, Topic, CourseTopic
-from dependencies import RoleChecker
+from models import AppUser, Course, Enrollment, Student, University, Topic, CourseTopic
+from dependencies import RoleChecker, get_current_user, get_read_db
+from pagination import PageParams, Keyset, Projection, paginate, page_response
+from analytics_views import analytics_source, set_staleness_headers
+from columnar import current_snapshot, set_snapshot_headers
 
 router = APIRouter(
     prefix="/analytics",
@@ -11,74 +13,103 @@ router = APIRouter(
     dependencies=[Depends(RoleChecker(["analyst", "admin"]))]
 )
 
+
+async def live_data(
+    fresh: bool = Query(False, description="Admins only: compute from live tables instead of the materialized views"),
+    current_user: AppUser = Depends(get_current_user),
+) -> bool:
+    if fresh and current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="fresh=true is restricted to admins")
+    return fresh
+
+
 @router.get("/stats")
-async def get_overall_stats(db: AsyncSession = Depends(get_db)):
+async def get_overall_stats(
+    response: Response,
+    live: bool = Depends(live_data),
+    db: AsyncSession = Depends(get_read_db),
+):
     """Get overall platform statistics."""
-    total_courses = (await db.execute(select(func.count(Course.course_id)))).scalar() or 0
-    total_students = (await db.execute(select(func.count(Student.student_id)))).scalar() or 0
-    total_enrollments = (await db.execute(select(func.count()).select_from(Enrollment))).scalar() or 0
-    avg_score = (await db.execute(
-        select(func.avg(Enrollment.evaluation_score)).where(Enrollment.evaluation_score.isnot(None))
-    )).scalar()
-    
+    if snapshot := current_snapshot(live):
+        set_snapshot_headers(response, snapshot)
+        return snapshot.overview()
+    src = analytics_source("mv_analytics_overview", live)
+    row = (await db.execute(select(src))).mappings().first() or {}
+    await set_staleness_headers(response, db, "mv_analytics_overview", live)
+    avg_score = row.get("average_score")
     return {
-        "total_courses": total_courses,
-        "total_students": total_students,
-        "total_enrollments": total_enrollments,
-        "average_score": round(avg_score, 2) if avg_score else 0
+        "total_courses": row.get("total_courses") or 0,
+        "total_students": row.get("total_students") or 0,
+        "total_enrollments": row.get("total_enrollments") or 0,
+        "average_score": round(float(avg_score), 2) if avg_score else 0
     }
 
 @router.get("/most-popular-course")
 async def most_popular_course(
+    response: Response,
     university: str = None,
-    db: AsyncSession = Depends(get_db)
+    live: bool = Depends(live_data),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get the most popular course by enrollment count."""
-    stmt = (
-        select(Course.course_name, func.count(Enrollment.student_id).label("count"))
-        .join(Enrollment, Course.course_id == Enrollment.course_id)
-    )
+    if not university and (snapshot := current_snapshot(live)):
+        set_snapshot_headers(response, snapshot)
+        return snapshot.most_popular_course()
+    src = analytics_source("mv_course_enrollment", live)
+    stmt = select(src.c.course_name, src.c.enrollments).where(src.c.enrollments > 0)
     
     if university:
-        stmt = stmt.join(University, Course.university_id == University.university_id).where(
+        stmt = stmt.join(University, src.c.university_id == University.university_id).where(
             University.name.ilike(f"%{university}%")
         )
     
-    stmt = stmt.group_by(Course.course_id, Course.course_name).order_by(desc("count")).limit(1)
-    result = await db.execute(stmt)
-    row = result.first()
+    stmt = stmt.order_by(src.c.enrollments.desc(), src.c.course_id).limit(1)
+    row = (await db.execute(stmt)).first()
+    await set_staleness_headers(response, db, "mv_course_enrollment", live)
     
     if row:
         return {"course": row[0], "enrollments": row[1]}
     return {"course": None, "enrollments": 0}
 
 @router.get("/enrollments-per-course")
-async def enrollments_per_course(db: AsyncSession = Depends(get_db)):
-    """Get enrollment count for each course."""
-    stmt = (
-        select(Course.course_id, Course.course_name, func.count(Enrollment.student_id).label("count"))
-        .outerjoin(Enrollment, Course.course_id == Enrollment.course_id)
-        .group_by(Course.course_id, Course.course_name)
-        .order_by(desc("count"))
-    )
-    result = await db.execute(stmt)
-    return [{"course_id": r[0], "title": r[1], "count": r[2]} for r in result]
+async def enrollments_per_course(
+    response: Response,
+    page: PageParams = Depends(),
+    live: bool = Depends(live_data),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get enrollment count for each course, busiest first."""
+    src = analytics_source("mv_course_enrollment", live)
+    fields = Projection(course_id=src.c.course_id, title=src.c.course_name, count=src.c.enrollments)
+    # Busiest first; course_id breaks ties so the cursor is unique
+    keyset = Keyset("enrollments_per_course", ((src.c.enrollments, True), (src.c.course_id, False)))
+    stmt = select(*fields.select_columns(fields.resolve(page.fields)))
+    result = await paginate(db, stmt, keyset, page)
+    await set_staleness_headers(response, db, "mv_course_enrollment", live)
+    return page_response(result, page, response)
 
 @router.get("/avg-score-by-course")
-async def avg_score_by_course(db: AsyncSession = Depends(get_db)):
+async def avg_score_by_course(
+    response: Response,
+    live: bool = Depends(live_data),
+    db: AsyncSession = Depends(get_read_db),
+):
     """Get average evaluation score per course."""
+    if snapshot := current_snapshot(live):
+        set_snapshot_headers(response, snapshot)
+        return snapshot.avg_score_by_course()
+    src = analytics_source("mv_course_enrollment", live)
     stmt = (
-        select(Course.course_name, func.avg(Enrollment.evaluation_score).label("avg_score"))
-        .join(Enrollment, Course.course_id == Enrollment.course_id)
-        .where(Enrollment.evaluation_score.isnot(None))
-        .group_by(Course.course_id, Course.course_name)
-        .order_by(desc("avg_score"))
+        select(src.c.course_name, src.c.avg_score)
+        .where(src.c.graded > 0)
+        .order_by(src.c.avg_score.desc())
     )
     result = await db.execute(stmt)
-    return [{"course": r[0], "avg_score": round(r[1], 2) if r[1] else 0} for r in result]
+    await set_staleness_headers(response, db, "mv_course_enrollment", live)
+    return [{"course": r[0], "avg_score": round(float(r[1]), 2) if r[1] else 0} for r in result]
 
 @router.get("/top-indian-student-by-ai-average")
-async def top_indian_student(db: AsyncSession = Depends(get_db)):
+async def top_indian_student(db: AsyncSession = Depends(get_read_db)):
     """
     Get the top Indian student by average score in AI-topic courses.
 
@@ -112,62 +143,79 @@ async def top_indian_student(db: AsyncSession = Depends(get_db)):
     return {"name": None, "avg_score": 0}
 
 @router.get("/courses-by-university")
-async def courses_by_university(db: AsyncSession = Depends(get_db)):
+async def courses_by_university(
+    response: Response,
+    live: bool = Depends(live_data),
+    db: AsyncSession = Depends(get_read_db),
+):
     """Get course count per university."""
-    stmt = (
-        select(University.name, func.count(Course.course_id).label("count"))
-        .join(Course, University.university_id == Course.university_id)
-        .group_by(University.university_id, University.name)
-        .order_by(desc("count"))
-    )
+    if snapshot := current_snapshot(live):
+        set_snapshot_headers(response, snapshot)
+        return snapshot.courses_by_university()
+    src = analytics_source("mv_courses_by_university", live)
+    stmt = select(src.c.university, src.c.course_count).order_by(src.c.course_count.desc())
     result = await db.execute(stmt)
+    await set_staleness_headers(response, db, "mv_courses_by_university", live)
     return [{"university": r[0], "count": r[1]} for r in result]
 
 @router.get("/students-by-country")
-async def students_by_country(db: AsyncSession = Depends(get_db)):
+async def students_by_country(
+    response: Response,
+    live: bool = Depends(live_data),
+    db: AsyncSession = Depends(get_read_db),
+):
     """Get student count by country."""
-    stmt = (
-        select(Student.country, func.count(Student.student_id).label("count"))
-        .group_by(Student.country)
-        .order_by(desc("count"))
-    )
+    if snapshot := current_snapshot(live):
+        set_snapshot_headers(response, snapshot)
+        return snapshot.students_by_country()
+    src = analytics_source("mv_students_by_country", live)
+    stmt = select(src.c.country, src.c.student_count).order_by(src.c.student_count.desc())
     result = await db.execute(stmt)
+    await set_staleness_headers(response, db, "mv_students_by_country", live)
     return [{"country": r[0], "count": r[1]} for r in result]
 
 @router.get("/skill-level-distribution")
-async def skill_level_distribution(db: AsyncSession = Depends(get_db)):
+async def skill_level_distribution(
+    response: Response,
+    live: bool = Depends(live_data),
+    db: AsyncSession = Depends(get_read_db),
+):
     """Get student distribution by skill level."""
-    stmt = (
-        select(Student.skill_level, func.count(Student.student_id).label("count"))
-        .where(Student.skill_level.isnot(None))
-        .group_by(Student.skill_level)
-        .order_by(desc("count"))
-    )
+    if snapshot := current_snapshot(live):
+        set_snapshot_headers(response, snapshot)
+        return snapshot.skill_level_distribution()
+    src = analytics_source("mv_skill_level_distribution", live)
+    stmt = select(src.c.skill_level, src.c.student_count).order_by(src.c.student_count.desc())
     result = await db.execute(stmt)
+    await set_staleness_headers(response, db, "mv_skill_level_distribution", live)
     return [{"skill_level": r[0], "count": r[1]} for r in result]
 
 @router.get("/top-courses")
-async def top_courses(limit: int = 5, db: AsyncSession = Depends(get_db)):
+async def top_courses(
+    response: Response,
+    limit: int = 5,
+    live: bool = Depends(live_data),
+    db: AsyncSession = Depends(get_read_db),
+):
     """Get top courses by enrollment."""
+    if snapshot := current_snapshot(live):
+        set_snapshot_headers(response, snapshot)
+        return snapshot.top_courses(limit)
+    src = analytics_source("mv_course_enrollment", live)
     stmt = (
-        select(
-            Course.course_id,
-            Course.course_name,
-            func.count(Enrollment.student_id).label("enrollments"),
-            func.avg(Enrollment.evaluation_score).label("avg_score")
-        )
-        .join(Enrollment, Course.course_id == Enrollment.course_id)
-        .group_by(Course.course_id, Course.course_name)
-        .order_by(desc("enrollments"))
+        select(src.c.course_id, src.c.course_name, src.c.enrollments, src.c.avg_score)
+        .where(src.c.enrollments > 0)
+        .order_by(src.c.enrollments.desc(), src.c.course_id)
         .limit(limit)
     )
     result = await db.execute(stmt)
+    await set_staleness_headers(response, db, "mv_course_enrollment", live)
     return [
         {
             "course_id": r[0],
             "course_name": r[1],
             "enrollments": r[2],
-            "avg_score": round(r[3], 2) if r[3] else None
+            "avg_score": round(float(r[3]), 2) if r[3] else None
         }
         for r in result
     ]
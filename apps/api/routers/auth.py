@@ -16,28 +16,13 @@ from schemas import (
     AnalystRegister,
 )
 from dependencies import get_current_user, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from passwords import hash_password, verify_password, needs_rehash
 
 router = APIRouter(
     prefix="/auth",
     tags=["auth"],
 )
 
-import bcrypt
-
-# pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def verify_password(plain_password, hashed_password):
-    if isinstance(plain_password, str):
-        plain_password = plain_password.encode('utf-8')
-    if isinstance(hashed_password, str):
-        hashed_password = hashed_password.encode('utf-8')
-    return bcrypt.checkpw(plain_password, hashed_password)
-
-def get_password_hash(password):
-    if isinstance(password, str):
-        password = password.encode('utf-8')
-    return bcrypt.hashpw(password, bcrypt.gensalt()).decode('utf-8')
-
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     if expires_delta:
@@ -54,7 +39,7 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     if result.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     db_user = AppUser(email=user.email, password_hash=hashed_password, role=user.role)
     db.add(db_user)
     await db.commit()
@@ -69,7 +54,7 @@ async def register_student(data: StudentRegister, db: AsyncSession = Depends(get
         raise HTTPException(status_code=400, detail="Email already registered")
     if data.age < 13:
         raise HTTPException(status_code=400, detail="Student must be at least 13 years old")
-    hashed = get_password_hash(data.password)
+    hashed = await hash_password(data.password)
     db_user = AppUser(email=data.email, password_hash=hashed, role="student")
     db.add(db_user)
     await db.flush()
@@ -93,7 +78,7 @@ async def register_instructor(data: InstructorRegister, db: AsyncSession = Depen
     result = await db.execute(select(AppUser).where(AppUser.email == data.email))
     if result.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed = get_password_hash(data.password)
+    hashed = await hash_password(data.password)
     db_user = AppUser(
         email=data.email,
         password_hash=hashed,
@@ -119,7 +104,7 @@ async def register_analyst(data: AnalystRegister, db: AsyncSession = Depends(get
     result = await db.execute(select(AppUser).where(AppUser.email == data.email))
     if result.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed = get_password_hash(data.password)
+    hashed = await hash_password(data.password)
     db_user = AppUser(
         email=data.email,
         password_hash=hashed,
@@ -144,7 +129,7 @@ async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(AppUser).where(AppUser.email == user_data.email))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(user_data.password, user.password_hash):
+    if not user or not await verify_password(user_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -157,6 +142,11 @@ async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
             status_code=status.HTTP_403_FORBIDDEN,
             detail="pending_approval",
         )
+
+    # Transparently upgrade hashes made with a different BCRYPT_ROUNDS
+    if needs_rehash(user.password_hash):
+        user.password_hash = await hash_password(user_data.password)
+        await db.commit()
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func, case, text, delete as sql_delete
+from sqlalchemy import select, update, and_, or_, func, text, delete as sql_delete
 from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from datetime import date
 from database import get_db
-from models import Course, TeachingAssignment, ContentItem, Instructor, AppUser, Enrollment, Student, AuditLog, CourseProposal, TopicProposal, University, Program, Textbook, Topic, CourseTopic
-from dependencies import get_current_user, RoleChecker
+from models import Course, CourseStats, TeachingAssignment, ContentItem, Instructor, AppUser, Enrollment, Student, AuditLog, CourseProposal, TopicProposal, University, Program, Textbook, Topic, CourseTopic
+from dependencies import Profile, get_current_user, get_profile, RoleChecker
+from grading import BULK_GRADE_MAX_ROWS, validate_grades, parse_grades_csv, apply_grades
+from applications import approve_applications, reject_applications
+from enrollment_engine import enroll_student
+from waitlist import wake_promoter
+from catalog import bump_catalog_version
+from course_detail import invalidate_course_detail
+from fast_json import FastJSONResponse, rows_to_dicts
+from analytics_views import SCORE_VIEWS, mark_views_stale
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -60,35 +68,16 @@ class AnalyticsResponse(BaseModel):
     total_students: int
     avg_score: Optional[float] = None
 
-# ── Helper: Resolve Instructor from AppUser ──────────────────────
+# ── Helper: Course ownership ─────────────────────────────────────
 
-async def get_instructor_from_user(current_user: AppUser, db: AsyncSession) -> Optional[Instructor]:
-    """Resolve instructor record from current user. Uses user_id FK if available, falls back to email match."""
-    # Try FK-based lookup first
-    result = await db.execute(
-        select(Instructor).where(
-            (Instructor.user_id == current_user.id) | (Instructor.email == current_user.email)
-        )
-    )
-    return result.scalar_one_or_none()
-
-
-async def verify_course_ownership(instructor: Optional[Instructor], course_id: int, current_user: AppUser, db: AsyncSession):
+def verify_course_ownership(profile: Profile, course_id: int, current_user: AppUser):
     """Verify the instructor is assigned to this course, or user is admin."""
-    if not instructor and current_user.role != "admin":
+    if current_user.role == "admin":
+        return
+    if profile.instructor_id is None:
         raise HTTPException(status_code=403, detail="Not an instructor")
-    
-    if instructor:
-        assignment = await db.execute(
-            select(TeachingAssignment).where(
-                and_(
-                    TeachingAssignment.instructor_id == instructor.instructor_id,
-                    TeachingAssignment.course_id == course_id
-                )
-            )
-        )
-        if not assignment.scalar_one_or_none() and current_user.role != "admin":
-            raise HTTPException(status_code=403, detail="You are not assigned to this course")
+    if not profile.teaches(course_id):
+        raise HTTPException(status_code=403, detail="You are not assigned to this course")
 
 # ── GET /instructor/courses ──────────────────────────────────────
 
@@ -150,13 +139,12 @@ class TopicProposalResponse(BaseModel):
 
 @router.get("/courses", response_model=List[CourseResponse])
 async def get_my_courses(
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get courses assigned to the current instructor."""
-    instructor = await get_instructor_from_user(current_user, db)
-    
-    if not instructor:
+    if profile.instructor_id is None:
         return []
 
     # Get courses with approved student count
@@ -173,7 +161,7 @@ async def get_my_courses(
                 Enrollment.status == "approved",
             ),
         )
-        .where(TeachingAssignment.instructor_id == instructor.instructor_id)
+        .where(TeachingAssignment.instructor_id == profile.instructor_id)
         .group_by(Course.course_id)
     )
     result = await db.execute(stmt)
@@ -193,12 +181,12 @@ async def get_my_courses(
 @router.get("/courses/{course_id}/students", response_model=List[StudentInCourse])
 async def get_course_students(
     course_id: int,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get all students enrolled in a course."""
-    instructor = await get_instructor_from_user(current_user, db)
-    await verify_course_ownership(instructor, course_id, current_user, db)
+    verify_course_ownership(profile, course_id, current_user)
 
     stmt = (
         select(Student, Enrollment.evaluation_score)
@@ -224,25 +212,12 @@ async def get_course_students(
 @router.get("/courses/{course_id}/applications", response_model=List[ApplicationItem])
 async def get_course_applications(
     course_id: int,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get pending applications (enrollments) for this course."""
-    result = await db.execute(select(Instructor).where(Instructor.email == current_user.email))
-    instructor = result.scalar_one_or_none()
-    if instructor:
-        assignment = await db.execute(
-            select(TeachingAssignment).where(
-                and_(
-                    TeachingAssignment.instructor_id == instructor.instructor_id,
-                    TeachingAssignment.course_id == course_id
-                )
-            )
-        )
-        if not assignment.scalar_one_or_none() and current_user.role != "admin":
-            raise HTTPException(status_code=403, detail="You are not assigned to this course")
-    elif current_user.role != "admin":
-        raise HTTPException(status_code=403, detail="Not an instructor")
+    verify_course_ownership(profile, course_id, current_user)
 
     stmt = (
         select(Student, Enrollment.enroll_date)
@@ -268,37 +243,18 @@ async def get_course_applications(
 async def approve_application(
     course_id: int,
     body: ApproveRejectRequest,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Approve a pending enrollment. Capacity already reserved."""
-    result = await db.execute(select(Instructor).where(Instructor.email == current_user.email))
-    instructor = result.scalar_one_or_none()
-    if instructor:
-        assignment = await db.execute(
-            select(TeachingAssignment).where(
-                and_(
-                    TeachingAssignment.instructor_id == instructor.instructor_id,
-                    TeachingAssignment.course_id == course_id
-                )
-            )
-        )
-        if not assignment.scalar_one_or_none() and current_user.role != "admin":
-            raise HTTPException(status_code=403, detail="You are not assigned to this course")
-    elif current_user.role != "admin":
-        raise HTTPException(status_code=403, detail="Not an instructor")
+    """Approve a pending enrollment, if the course has a free seat."""
+    verify_course_ownership(profile, course_id, current_user)
 
-    enroll_result = await db.execute(
-        select(Enrollment).where(
-            Enrollment.course_id == course_id,
-            Enrollment.student_id == body.student_id,
-            Enrollment.status == "pending",
-        )
-    )
-    enrollment = enroll_result.scalar_one_or_none()
-    if not enrollment:
+    outcome = (await approve_applications(db, course_id, [body.student_id]))["results"][0]
+    if outcome["status"] == "waiting":
+        raise HTTPException(status_code=409, detail="Course is full")
+    if outcome["status"] != "approved":
         raise HTTPException(status_code=404, detail="Application not found or already processed")
-    enrollment.status = "approved"
     await db.commit()
     return {"message": "Application approved"}
 
@@ -307,67 +263,108 @@ async def approve_application(
 async def reject_application(
     course_id: int,
     body: ApproveRejectRequest,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Reject a pending enrollment and free the reserved slot."""
-    result = await db.execute(select(Instructor).where(Instructor.email == current_user.email))
-    instructor = result.scalar_one_or_none()
-    if instructor:
-        assignment = await db.execute(
-            select(TeachingAssignment).where(
-                and_(
-                    TeachingAssignment.instructor_id == instructor.instructor_id,
-                    TeachingAssignment.course_id == course_id
-                )
-            )
-        )
-        if not assignment.scalar_one_or_none() and current_user.role != "admin":
-            raise HTTPException(status_code=403, detail="You are not assigned to this course")
-    elif current_user.role != "admin":
-        raise HTTPException(status_code=403, detail="Not an instructor")
+    verify_course_ownership(profile, course_id, current_user)
 
-    enroll_result = await db.execute(
-        select(Enrollment, Course).join(Course, Enrollment.course_id == Course.course_id).where(
-            Enrollment.course_id == course_id,
-            Enrollment.student_id == body.student_id,
-            Enrollment.status == "pending",
-        )
-    )
-    row = enroll_result.one_or_none()
-    if not row:
+    outcome = (await reject_applications(db, course_id, [body.student_id]))["results"][0]
+    if outcome["status"] != "rejected":
         raise HTTPException(status_code=404, detail="Application not found or already processed")
-    enrollment, course = row
-    enrollment.status = "rejected"
-    course.current_enrollment -= 1
     await db.commit()
+    wake_promoter()
     return {"message": "Application rejected"}
 
 
+# ── Batch application decisions ──────────────────────────────────
+
+class BatchDecisionRequest(BaseModel):
+    student_ids: Optional[List[int]] = Field(None, max_length=5000)
+    all_pending: bool = False
+    limit: Optional[int] = Field(None, ge=0, description="Approve at most this many (approve only)")
+
+
+def _batch_targets(body: BatchDecisionRequest) -> Optional[List[int]]:
+    if body.all_pending == (body.student_ids is not None):
+        raise HTTPException(status_code=400, detail="Give either student_ids or all_pending=true")
+    return None if body.all_pending else body.student_ids
+
+
+@router.post("/courses/{course_id}/applications/approve-batch")
+async def approve_applications_batch(
+    course_id: int,
+    body: BatchDecisionRequest,
+    profile: Profile = Depends(get_profile),
+    current_user: AppUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Approve many pending applications in one transaction, oldest first, up to capacity."""
+    student_ids = _batch_targets(body)
+    verify_course_ownership(profile, course_id, current_user)
+
+    result = await approve_applications(db, course_id, student_ids, body.limit)
+    await db.commit()
+    return result
+
+
+@router.post("/courses/{course_id}/applications/reject-batch")
+async def reject_applications_batch(
+    course_id: int,
+    body: BatchDecisionRequest,
+    profile: Profile = Depends(get_profile),
+    current_user: AppUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Reject many pending applications in one transaction, freeing their seats."""
+    student_ids = _batch_targets(body)
+    verify_course_ownership(profile, course_id, current_user)
+
+    result = await reject_applications(db, course_id, student_ids)
+    await db.commit()
+    if result["rejected"]:
+        wake_promoter()
+    return result
+
+
+class AutoApproveRequest(BaseModel):
+    enabled: bool
+
+
+@router.put("/courses/{course_id}/auto-approve")
+async def set_auto_approve(
+    course_id: int,
+    body: AutoApproveRequest,
+    profile: Profile = Depends(get_profile),
+    current_user: AppUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Toggle auto-approval of new applications. Enabling it also approves the
+    pending backlog up to capacity, in the same transaction."""
+    verify_course_ownership(profile, course_id, current_user)
+
+    result = await db.execute(
+        update(Course).where(Course.course_id == course_id).values(auto_approve=body.enabled)
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Course not found")
+    backlog = await approve_applications(db, course_id) if body.enabled else None
+    await db.commit()
+    return {"course_id": course_id, "auto_approve": body.enabled, "backlog": backlog}
+
+
 @router.patch("/courses/{course_id}/students/{student_id}/grade")
 async def set_student_grade(
     course_id: int,
     student_id: int,
     body: GradeRequest,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Set or update evaluation score (grade) for a student in this course."""
-    result = await db.execute(select(Instructor).where(Instructor.email == current_user.email))
-    instructor = result.scalar_one_or_none()
-    if instructor:
-        assignment = await db.execute(
-            select(TeachingAssignment).where(
-                and_(
-                    TeachingAssignment.instructor_id == instructor.instructor_id,
-                    TeachingAssignment.course_id == course_id
-                )
-            )
-        )
-        if not assignment.scalar_one_or_none() and current_user.role != "admin":
-            raise HTTPException(status_code=403, detail="You are not assigned to this course")
-    elif current_user.role != "admin":
-        raise HTTPException(status_code=403, detail="Not an instructor")
+    verify_course_ownership(profile, course_id, current_user)
 
     enroll_result = await db.execute(
         select(Enrollment).where(
@@ -383,24 +380,24 @@ async def set_student_grade(
         raise HTTPException(status_code=400, detail="evaluation_score must be between 0 and 100")
     enrollment.evaluation_score = body.evaluation_score
     await db.commit()
+    mark_views_stale(*SCORE_VIEWS)
     return {"message": "Grade updated", "evaluation_score": body.evaluation_score}
 
 
 @router.post("/course-proposals", response_model=CourseProposalResponse)
 async def create_course_proposal(
     body: CourseProposalCreate,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Submit a course proposal for admin approval."""
-    result = await db.execute(select(Instructor).where(Instructor.email == current_user.email))
-    instructor = result.scalar_one_or_none()
-    if not instructor and current_user.role != "admin":
+    if profile.instructor_id is None and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not an instructor")
-    if not instructor:
+    if profile.instructor_id is None:
         raise HTTPException(status_code=403, detail="Only instructors can create course proposals")
     proposal = CourseProposal(
-        instructor_id=instructor.instructor_id,
+        instructor_id=profile.instructor_id,
         course_name=body.course_name,
         duration_weeks=body.duration_weeks,
         university_id=body.university_id,
@@ -425,17 +422,16 @@ async def create_course_proposal(
 
 @router.get("/course-proposals", response_model=List[CourseProposalResponse])
 async def list_my_course_proposals(
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """List current instructor's course proposals."""
-    result = await db.execute(select(Instructor).where(Instructor.email == current_user.email))
-    instructor = result.scalar_one_or_none()
-    if not instructor and current_user.role != "admin":
+    if profile.instructor_id is None and current_user.role != "admin":
         return []
-    if not instructor:
+    if profile.instructor_id is None:
         return []
-    stmt = select(CourseProposal).where(CourseProposal.instructor_id == instructor.instructor_id)
+    stmt = select(CourseProposal).where(CourseProposal.instructor_id == profile.instructor_id)
     result = await db.execute(stmt)
     proposals = result.scalars().all()
     return [
@@ -456,18 +452,17 @@ async def list_my_course_proposals(
 @router.post("/topic-proposals", response_model=TopicProposalResponse)
 async def create_topic_proposal(
     body: TopicProposalCreate,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Submit a topic proposal for admin approval."""
-    result = await db.execute(select(Instructor).where(Instructor.email == current_user.email))
-    instructor = result.scalar_one_or_none()
-    if not instructor and current_user.role != "admin":
+    if profile.instructor_id is None and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not an instructor")
-    if not instructor:
+    if profile.instructor_id is None:
         raise HTTPException(status_code=403, detail="Only instructors can create topic proposals")
     proposal = TopicProposal(
-        instructor_id=instructor.instructor_id,
+        instructor_id=profile.instructor_id,
         topic_name=body.topic_name,
         status="pending",
     )
@@ -505,17 +500,16 @@ async def list_textbooks(db: AsyncSession = Depends(get_db)):
 
 @router.get("/topic-proposals", response_model=List[TopicProposalResponse])
 async def list_my_topic_proposals(
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """List current instructor's topic proposals."""
-    result = await db.execute(select(Instructor).where(Instructor.email == current_user.email))
-    instructor = result.scalar_one_or_none()
-    if not instructor and current_user.role != "admin":
+    if profile.instructor_id is None and current_user.role != "admin":
         return []
-    if not instructor:
+    if profile.instructor_id is None:
         return []
-    stmt = select(TopicProposal).where(TopicProposal.instructor_id == instructor.instructor_id)
+    stmt = select(TopicProposal).where(TopicProposal.instructor_id == profile.instructor_id)
     result = await db.execute(stmt)
     proposals = result.scalars().all()
     return [
@@ -546,12 +540,12 @@ async def get_course_content(
 async def add_content_item(
     course_id: int,
     item: ContentItemCreate,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Add a content item to a course."""
-    instructor = await get_instructor_from_user(current_user, db)
-    await verify_course_ownership(instructor, course_id, current_user, db)
+    verify_course_ownership(profile, course_id, current_user)
 
     new_content = ContentItem(
         course_id=course_id,
@@ -561,6 +555,7 @@ async def add_content_item(
     )
     db.add(new_content)
     await db.commit()
+    invalidate_course_detail(course_id)
     await db.refresh(new_content)
     return {"message": "Content added successfully", "content_id": new_content.content_id}
 
@@ -570,12 +565,12 @@ async def add_content_item(
 async def delete_content_item(
     course_id: int,
     content_id: int,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a content item from a course."""
-    instructor = await get_instructor_from_user(current_user, db)
-    await verify_course_ownership(instructor, course_id, current_user, db)
+    verify_course_ownership(profile, course_id, current_user)
 
     result = await db.execute(
         select(ContentItem).where(
@@ -588,6 +583,7 @@ async def delete_content_item(
     
     await db.delete(content)
     await db.commit()
+    invalidate_course_detail(course_id)
     return {"message": "Content item deleted successfully"}
 
 # ── PUT /instructor/enrollments/{student_id}/{course_id} ─────────
@@ -597,12 +593,12 @@ async def grade_student(
     student_id: int,
     course_id: int,
     grade: GradeUpdate,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Grade a student — update evaluation_score with audit logging."""
-    instructor = await get_instructor_from_user(current_user, db)
-    await verify_course_ownership(instructor, course_id, current_user, db)
+    verify_course_ownership(profile, course_id, current_user)
 
     # Find the enrollment
     result = await db.execute(
@@ -625,12 +621,13 @@ async def grade_student(
         course_id=course_id,
         old_score=old_score,
         new_score=grade.evaluation_score,
-        changed_by=f"instructor_{instructor.instructor_id}" if instructor else f"admin_{current_user.id}"
+        changed_by=f"instructor_{profile.instructor_id}" if profile.instructor_id else f"admin_{current_user.id}"
     )
     db.add(audit_entry)
 
     enrollment.evaluation_score = grade.evaluation_score
     await db.commit()
+    mark_views_stale(*SCORE_VIEWS)
 
     return {
         "message": "Grade updated successfully",
@@ -640,73 +637,105 @@ async def grade_student(
         "new_score": grade.evaluation_score
     }
 
+# ── PUT /instructor/courses/{id}/grades (bulk) ───────────────────
+
+class BulkGradeRequest(BaseModel):
+    grades: List[dict] = Field(..., description="[{student_id, evaluation_score}, ...]")
+
+
+async def _bulk_grade(course_id: int, rows: list, all_or_nothing: bool, profile: Profile, current_user: AppUser, db: AsyncSession):
+    if len(rows) > BULK_GRADE_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_GRADE_MAX_ROWS} grades per request")
+    verify_course_ownership(profile, course_id, current_user)
+
+    valid, errors = validate_grades(rows)
+    outcomes = []
+    if not (errors and all_or_nothing):
+        changed_by = f"instructor_{profile.instructor_id}" if profile.instructor_id else f"admin_{current_user.id}"
+        outcomes = await apply_grades(db, course_id, valid, changed_by)
+    results = sorted(errors + outcomes, key=lambda r: r["row"])
+    failed = [r for r in results if r["status"] == "error"]
+
+    if failed and all_or_nothing:
+        await db.rollback()
+        raise HTTPException(status_code=422, detail={"message": "No grades applied", "errors": failed})
+    await db.commit()
+    if outcomes:
+        mark_views_stale(*SCORE_VIEWS)
+    return {
+        "course_id": course_id,
+        "updated": sum(r["status"] == "updated" for r in results),
+        "unchanged": sum(r["status"] == "unchanged" for r in results),
+        "failed": len(failed),
+        "results": results,
+    }
+
+
+@router.put("/courses/{course_id}/grades")
+async def bulk_grade_students(
+    course_id: int,
+    body: BulkGradeRequest,
+    all_or_nothing: bool = False,
+    profile: Profile = Depends(get_profile),
+    current_user: AppUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Grade many students at once; valid rows are applied, invalid ones reported per row."""
+    return await _bulk_grade(course_id, body.grades, all_or_nothing, profile, current_user, db)
+
+
+@router.put("/courses/{course_id}/grades/csv")
+async def bulk_grade_students_csv(
+    course_id: int,
+    file: UploadFile = File(..., description="CSV with student_id,evaluation_score columns"),
+    all_or_nothing: bool = False,
+    profile: Profile = Depends(get_profile),
+    current_user: AppUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Same as PUT /grades, from an uploaded CSV (rows numbered from 0 after the header)."""
+    try:
+        rows = parse_grades_csv(await file.read())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await _bulk_grade(course_id, rows, all_or_nothing, profile, current_user, db)
+
 # ── GET /instructor/courses/{id}/analytics ───────────────────────
 
 @router.get("/courses/{course_id}/analytics", response_model=AnalyticsResponse)
 async def get_course_analytics(
     course_id: int,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get analytics for a specific course — score distribution, pass rate, at-risk count."""
-    instructor = await get_instructor_from_user(current_user, db)
-    await verify_course_ownership(instructor, course_id, current_user, db)
-
-    # Score distribution using SUM(CASE WHEN ...) — universally compatible
-    stmt = select(
-        func.sum(case(
-            (and_(Enrollment.evaluation_score >= 0, Enrollment.evaluation_score <= 20), 1),
-            else_=0
-        )).label("bucket_0_20"),
-        func.sum(case(
-            (and_(Enrollment.evaluation_score >= 21, Enrollment.evaluation_score <= 40), 1),
-            else_=0
-        )).label("bucket_21_40"),
-        func.sum(case(
-            (and_(Enrollment.evaluation_score >= 41, Enrollment.evaluation_score <= 60), 1),
-            else_=0
-        )).label("bucket_41_60"),
-        func.sum(case(
-            (and_(Enrollment.evaluation_score >= 61, Enrollment.evaluation_score <= 80), 1),
-            else_=0
-        )).label("bucket_61_80"),
-        func.sum(case(
-            (and_(Enrollment.evaluation_score >= 81, Enrollment.evaluation_score <= 100), 1),
-            else_=0
-        )).label("bucket_81_100"),
-        func.count().label("total"),
-        func.sum(case(
-            (Enrollment.evaluation_score >= 40, 1),
-            else_=0
-        )).label("passed"),
-        func.sum(case(
-            ((Enrollment.evaluation_score < 40) | (Enrollment.evaluation_score.is_(None)), 1),
-            else_=0
-        )).label("at_risk"),
-        func.avg(Enrollment.evaluation_score).label("avg_score"),
-    ).where(
-        Enrollment.course_id == course_id,
-        Enrollment.status == "approved",
+    verify_course_ownership(profile, course_id, current_user)
+
+    # Trigger-maintained aggregates (approved enrollments); no scan of enrollment
+    stats = (await db.execute(
+        select(CourseStats).where(CourseStats.course_id == course_id)
+    )).scalar_one_or_none() or CourseStats(
+        approved_count=0, score_sum=0, score_count=0, pass_count=0,
+        bucket_0_20=0, bucket_21_40=0, bucket_41_60=0, bucket_61_80=0, bucket_81_100=0,
     )
 
-    result = await db.execute(stmt)
-    row = result.one()
-
-    total = row.total or 0
-    passed = row.passed or 0
+    total = stats.approved_count
+    avg_score = stats.score_sum / stats.score_count if stats.score_count else None
 
     return AnalyticsResponse(
         distribution={
-            "0-20": row.bucket_0_20 or 0,
-            "21-40": row.bucket_21_40 or 0,
-            "41-60": row.bucket_41_60 or 0,
-            "61-80": row.bucket_61_80 or 0,
-            "81-100": row.bucket_81_100 or 0,
+            "0-20": stats.bucket_0_20,
+            "21-40": stats.bucket_21_40,
+            "41-60": stats.bucket_41_60,
+            "61-80": stats.bucket_61_80,
+            "81-100": stats.bucket_81_100,
         },
-        pass_rate=round((passed / total) * 100, 1) if total > 0 else 0.0,
-        at_risk_count=row.at_risk or 0,
+        pass_rate=round((stats.pass_count / total) * 100, 1) if total > 0 else 0.0,
+        # Ungraded or below 40
+        at_risk_count=total - stats.pass_count,
         total_students=total,
-        avg_score=round(row.avg_score, 2) if row.avg_score else None
+        avg_score=round(avg_score, 2) if avg_score else None
     )
 
 # ── Topic ↔ Course Linking ────────────────────────────────────────
@@ -721,12 +750,12 @@ async def list_topics(db: AsyncSession = Depends(get_db)):
 @router.get("/courses/{course_id}/topics")
 async def get_course_topics(
     course_id: int,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get topics linked to a course."""
-    instructor = await get_instructor_from_user(current_user, db)
-    await verify_course_ownership(instructor, course_id, current_user, db)
+    verify_course_ownership(profile, course_id, current_user)
 
     stmt = (
         select(Topic)
@@ -742,12 +771,12 @@ async def get_course_topics(
 async def add_topic_to_course(
     course_id: int,
     body: TopicLinkRequest,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Link an approved topic to a course."""
-    instructor = await get_instructor_from_user(current_user, db)
-    await verify_course_ownership(instructor, course_id, current_user, db)
+    verify_course_ownership(profile, course_id, current_user)
 
     # Verify topic exists
     topic_res = await db.execute(select(Topic).where(Topic.topic_id == body.topic_id))
@@ -769,6 +798,8 @@ async def add_topic_to_course(
     new_link = CourseTopic(course_id=course_id, topic_id=body.topic_id)
     db.add(new_link)
     await db.commit()
+    bump_catalog_version()
+    invalidate_course_detail(course_id)
     return {"message": "Topic added to course"}
 
 
@@ -776,12 +807,12 @@ async def add_topic_to_course(
 async def remove_topic_from_course(
     course_id: int,
     topic_id: int,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Remove a topic from a course."""
-    instructor = await get_instructor_from_user(current_user, db)
-    await verify_course_ownership(instructor, course_id, current_user, db)
+    verify_course_ownership(profile, course_id, current_user)
 
     await db.execute(
         sql_delete(CourseTopic).where(
@@ -792,6 +823,8 @@ async def remove_topic_from_course(
         )
     )
     await db.commit()
+    bump_catalog_version()
+    invalidate_course_detail(course_id)
     return {"message": "Topic removed from course"}
 
 
@@ -802,47 +835,32 @@ async def get_instructor_stats(
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get statistics for the current instructor."""
-    instructor = await get_instructor_from_user(current_user, db)
-    
-    if not instructor:
-        return {"total_courses": 0, "total_students": 0, "avg_student_score": None}
-
-    # Count courses
-    course_count_stmt = select(func.count(TeachingAssignment.course_id)).where(
-        TeachingAssignment.instructor_id == instructor.instructor_id
+    """Get statistics for the current instructor in one round trip."""
+    # Same instructor resolution as get_profile, inlined as a CTE
+    my_courses = (
+        select(TeachingAssignment.course_id)
+        .join(Instructor, Instructor.instructor_id == TeachingAssignment.instructor_id)
+        .where((Instructor.user_id == current_user.id) | (Instructor.email == current_user.email))
+        .cte("my_courses")
     )
-    course_count = (await db.execute(course_count_stmt)).scalar() or 0
-    
-    # Count total students (approved enrollments only) across all courses
-    student_count_stmt = (
+    course_ids = select(my_courses.c.course_id)
+    stmt = select(
+        select(func.count()).select_from(my_courses).scalar_subquery().label("total_courses"),
+        # Distinct students (approved enrollments) across all courses
         select(func.count(func.distinct(Enrollment.student_id)))
-        .join(TeachingAssignment, TeachingAssignment.course_id == Enrollment.course_id)
-        .where(
-            TeachingAssignment.instructor_id == instructor.instructor_id,
-            Enrollment.status == "approved",
-        )
+        .where(Enrollment.course_id.in_(course_ids), Enrollment.status == "approved")
+        .scalar_subquery().label("total_students"),
+        # Average score across approved enrollments, from course_stats
+        select(func.sum(CourseStats.score_sum) / func.nullif(func.sum(CourseStats.score_count), 0))
+        .where(CourseStats.course_id.in_(course_ids))
+        .scalar_subquery().label("avg_score"),
     )
-    student_count = (await db.execute(student_count_stmt)).scalar() or 0
-    
-    # Average score across approved enrollments in instructor's courses
-    avg_score_stmt = (
-        select(func.avg(Enrollment.evaluation_score))
-        .join(TeachingAssignment, TeachingAssignment.course_id == Enrollment.course_id)
-        .where(
-            and_(
-                TeachingAssignment.instructor_id == instructor.instructor_id,
-                Enrollment.status == "approved",
-                Enrollment.evaluation_score.isnot(None)
-            )
-        )
-    )
-    avg_score = (await db.execute(avg_score_stmt)).scalar()
+    row = (await db.execute(stmt)).one()
     
     return {
-        "total_courses": course_count,
-        "total_students": student_count,
-        "avg_student_score": round(avg_score, 2) if avg_score else None
+        "total_courses": row.total_courses,
+        "total_students": row.total_students,
+        "avg_student_score": round(row.avg_score, 2) if row.avg_score else None
     }
 
 # ═══════════════════════════════════════════════════════════════════
@@ -854,6 +872,7 @@ async def get_instructor_stats(
 @router.get("/courses/{course_id}/rankings")
 async def get_student_rankings(
     course_id: int,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -866,10 +885,10 @@ async def get_student_rankings(
 
     Demonstrates: Window Functions (OVER, PARTITION BY, ORDER BY)
     """
-    instructor = await get_instructor_from_user(current_user, db)
-    await verify_course_ownership(instructor, course_id, current_user, db)
+    verify_course_ownership(profile, course_id, current_user)
 
-    # Raw SQL with window functions — cannot be expressed cleanly in ORM
+    # Raw SQL with window functions — cannot be expressed cleanly in ORM.
+    # Columns are already the response fields, so rows go straight to JSON.
     stmt = text("""
         SELECT
             s.student_id,
@@ -878,10 +897,11 @@ async def get_student_rankings(
             e.evaluation_score,
             RANK()         OVER (ORDER BY e.evaluation_score DESC NULLS LAST) AS rank,
             DENSE_RANK()   OVER (ORDER BY e.evaluation_score DESC NULLS LAST) AS dense_rank,
-            PERCENT_RANK() OVER (ORDER BY e.evaluation_score ASC  NULLS FIRST) AS percentile,
-            ROW_NUMBER()   OVER (ORDER BY e.evaluation_score DESC NULLS LAST) AS row_num,
+            round(CAST(PERCENT_RANK() OVER (ORDER BY e.evaluation_score ASC NULLS FIRST) * 100 AS numeric), 1)
+                AS percentile,
+            ROW_NUMBER()   OVER (ORDER BY e.evaluation_score DESC NULLS LAST) AS row_number,
             COUNT(*)       OVER () AS total_students,
-            AVG(e.evaluation_score) OVER () AS class_avg
+            round(AVG(e.evaluation_score) OVER (), 2) AS class_average
         FROM enrollment e
         JOIN student s ON s.student_id = e.student_id
         WHERE e.course_id = :course_id AND e.status = 'approved'
@@ -889,34 +909,18 @@ async def get_student_rankings(
     """)
 
     result = await db.execute(stmt, {"course_id": course_id})
-    rows = result.fetchall()
-
-    rankings = []
-    for row in rows:
-        rankings.append({
-            "student_id": row[0],
-            "full_name": row[1],
-            "email": row[2],
-            "evaluation_score": row[3],
-            "rank": row[4],
-            "dense_rank": row[5],
-            "percentile": round(float(row[6]) * 100, 1) if row[6] is not None else None,
-            "row_number": row[7],
-            "total_students": row[8],
-            "class_average": round(float(row[9]), 2) if row[9] is not None else None,
-        })
-
-    return {
+    return FastJSONResponse({
         "course_id": course_id,
         "ranking_method": "Window Functions: RANK(), DENSE_RANK(), PERCENT_RANK(), ROW_NUMBER()",
-        "students": rankings
-    }
+        "students": rows_to_dicts(result),
+    })
 
 # ── GET /instructor/courses/{id}/audit-log (Trigger + Audit) ────
 
 @router.get("/courses/{course_id}/audit-log")
 async def get_course_audit_log(
     course_id: int,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -926,8 +930,7 @@ async def get_course_audit_log(
 
     Demonstrates: Active Database (Triggers), Audit Trail Querying
     """
-    instructor = await get_instructor_from_user(current_user, db)
-    await verify_course_ownership(instructor, course_id, current_user, db)
+    verify_course_ownership(profile, course_id, current_user)
 
     stmt = text("""
         SELECT
@@ -969,7 +972,7 @@ async def get_course_audit_log(
         "entries": entries
     }
 
-# ── POST /instructor/courses/{id}/safe-enroll (Pessimistic Lock) ─
+# ── POST /instructor/courses/{id}/safe-enroll (Atomic seat reservation) ─
 
 class SafeEnrollRequest(BaseModel):
     student_id: int
@@ -978,94 +981,59 @@ class SafeEnrollRequest(BaseModel):
 async def safe_enroll_student(
     course_id: int,
     request: SafeEnrollRequest,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Safe Enrollment with Pessimistic Locking (SELECT ... FOR UPDATE).
-    Prevents race conditions when multiple users try to enroll in the
-    last remaining seat simultaneously.
-
-    Flow:
-    1. Lock the course row (SELECT FOR UPDATE)
-    2. Check if current_enrollment < max_capacity
-    3. Check if student is not already enrolled
-    4. Insert enrollment
-    5. The enrollment count trigger auto-increments current_enrollment
-
-    Demonstrates: Transaction Isolation, Pessimistic Locking, Concurrency Control
-    """
-    instructor = await get_instructor_from_user(current_user, db)
-    await verify_course_ownership(instructor, course_id, current_user, db)
-
-    student_id = request.student_id
-
-    try:
-        # Step 1: Lock the course row — no other transaction can modify it
-        lock_result = await db.execute(
-            text("SELECT course_id, course_name, max_capacity, current_enrollment "
-                 "FROM course WHERE course_id = :cid FOR UPDATE"),
-            {"cid": course_id}
-        )
-        course_row = lock_result.fetchone()
-
-        if not course_row:
-            raise HTTPException(status_code=404, detail="Course not found")
+    Safe Enrollment with an atomic seat reservation.
+    Prevents overbooking when many users race for the last seats, without
+    serializing the whole enrollment on a course row lock.
 
-        course_name = course_row[1]
-        max_cap = course_row[2]
-        current_enr = course_row[3]
+    Flow (one statement, see enrollment_engine.py):
+    1. UPDATE course SET current_enrollment = current_enrollment + 1
+       WHERE current_enrollment < max_capacity (and not already enrolled)
+    2. INSERT the approved enrollment for the reserved seat, ON CONFLICT DO NOTHING
+    3. Full/duplicate attempts roll back their savepoint; deadlocks / serialization failures retried
 
-        # Step 2: Capacity check (inside the lock)
-        if current_enr >= max_cap:
-            raise HTTPException(
-                status_code=409,
-                detail=f"Course '{course_name}' is full ({current_enr}/{max_cap})"
-            )
-
-        # Step 3: Duplicate check
-        dup_result = await db.execute(
-            text("SELECT 1 FROM enrollment WHERE student_id = :sid AND course_id = :cid"),
-            {"sid": student_id, "cid": course_id}
-        )
-        if dup_result.fetchone():
-            raise HTTPException(
-                status_code=409,
-                detail=f"Student {student_id} is already enrolled in '{course_name}'"
-            )
+    Demonstrates: Conditional Updates, Optimistic Concurrency Control
+    """
+    verify_course_ownership(profile, course_id, current_user)
 
-        # Step 4: Verify student exists
-        student_result = await db.execute(
-            text("SELECT full_name FROM student WHERE student_id = :sid"),
-            {"sid": student_id}
+    student_id = request.student_id
+    student_name = (await db.execute(
+        select(Student.full_name).where(Student.student_id == student_id)
+    )).scalar_one_or_none()
+    if student_name is None:
+        raise HTTPException(status_code=404, detail=f"Student {student_id} not found")
+
+    result = await enroll_student(db, student_id, course_id, status="approved")
+    if result.outcome == "no_course":
+        raise HTTPException(status_code=404, detail="Course not found")
+    if result.outcome == "no_student":
+        raise HTTPException(status_code=404, detail=f"Student {student_id} not found")
+    if result.outcome == "full":
+        raise HTTPException(
+            status_code=409,
+            detail=f"Course '{result.course_name}' is full ({result.seats_taken}/{result.max_capacity})"
         )
-        student_row = student_result.fetchone()
-        if not student_row:
-            raise HTTPException(status_code=404, detail=f"Student {student_id} not found")
-
-        # Step 5: Insert enrollment (trigger auto-updates current_enrollment)
-        await db.execute(
-            text("INSERT INTO enrollment (student_id, course_id, enroll_date, status) VALUES (:sid, :cid, CURRENT_DATE, 'approved')"),
-            {"sid": student_id, "cid": course_id}
+    if result.outcome == "duplicate":
+        raise HTTPException(
+            status_code=409,
+            detail=f"Student {student_id} is already enrolled in '{result.course_name}'"
         )
+    await db.commit()
 
-        await db.commit()
-
-        return {
-            "message": "Student enrolled successfully (with pessimistic lock)",
-            "student_id": student_id,
-            "student_name": student_row[0],
-            "course_id": course_id,
-            "course_name": course_name,
-            "enrollment_count": f"{current_enr + 1}/{max_cap}",
-            "locking_method": "SELECT ... FOR UPDATE (Pessimistic Lock)"
-        }
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        await db.rollback()
-        raise HTTPException(status_code=500, detail=f"Enrollment failed: {str(e)}")
+    return {
+        "message": "Student enrolled successfully (atomic seat reservation)",
+        "student_id": student_id,
+        "student_name": student_name,
+        "course_id": course_id,
+        "course_name": result.course_name,
+        "enrollment_count": f"{result.seats_taken}/{result.max_capacity}",
+        "locking_method": "UPDATE ... WHERE current_enrollment < max_capacity (conditional update)",
+        "attempts": result.attempts,
+    }
 
 
 # --- Textbook management (instructor + admin) ---
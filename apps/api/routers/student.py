@@ -1,13 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, and_, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, delete, func, String
+from sqlalchemy.dialects.postgresql import ARRAY
 from typing import List, Optional
-from datetime import date
-from database import get_db
-from models import Course, Enrollment, Student, AppUser, University, Program, Topic, CourseTopic, TeachingAssignment, Instructor
-from dependencies import get_current_user, RoleChecker
+from datetime import date, datetime
+from database import get_db, mark_recent_write
+from models import Course, Enrollment, Student, AppUser, University, Program, Topic, CourseTopic, Waitlist
+from dependencies import Profile, get_current_user, get_profile, get_read_db, RoleChecker
 from pydantic import BaseModel
+from search import apply_course_search, SEARCH_MODE_PATTERN
+from fast_json import dumps
+from pagination import PageParams, Keyset, Projection, paginate, page_headers
+from catalog import catalog_version, catalog_key, get_cached_page, cache_page, page_or_not_modified
+from enrollment_engine import enroll_student
+from waitlist import join_waitlist, waitlist_position, my_waitlists
+from course_detail import STATIC_FIELDS, load_course_detail
 
 router = APIRouter(
     prefix="/student",
@@ -22,6 +29,7 @@ class CourseResponse(BaseModel):
     university_name: Optional[str] = None
     program_name: Optional[str] = None
     topics: List[str] = []
+    rank: Optional[float] = None  # relevance, only set for ranked search modes
     
     class Config:
         from_attributes = True
@@ -86,6 +94,23 @@ class CourseDetailResponse(BaseModel):
     class Config:
         from_attributes = True
 
+COURSE_FIELDS = Projection(
+    course_id=Course.course_id,
+    course_name=Course.course_name,
+    duration_weeks=Course.duration_weeks,
+    university_name=University.name,
+    program_name=Program.program_name,
+    topics=func.array(
+        select(Topic.topic_name)
+        .join(CourseTopic, CourseTopic.topic_id == Topic.topic_id)
+        .where(CourseTopic.course_id == Course.course_id)
+        .scalar_subquery(),
+        type_=ARRAY(String),
+    ),
+)
+COURSE_KEY = Keyset("course_id", ((Course.course_id, False),))
+
+
 @router.get("/courses", response_model=List[CourseResponse])
 async def get_courses(
     query: Optional[str] = None,
@@ -93,114 +118,105 @@ async def get_courses(
     program_type: Optional[str] = None,
     university: Optional[str] = None,
     max_duration_weeks: Optional[int] = None,
-    db: AsyncSession = Depends(get_db)
+    search_mode: Optional[str] = Query(None, pattern=SEARCH_MODE_PATTERN),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all available courses with optional filtering."""
-    stmt = (
-        select(Course)
-        .options(
-            selectinload(Course.university),
-            selectinload(Course.program),
-            selectinload(Course.topics).selectinload(CourseTopic.topic)
+    """Get available courses with optional filtering, one keyset page at a time.
+
+    `search_mode` (prefix | fuzzy | fulltext) changes how `query` is matched
+    and orders results by relevance; without it `query` is a substring match.
+    Pages are served from the catalog cache, with an ETag (catalog.py).
+    """
+    key = catalog_key(page.request, catalog_version())
+    cached = get_cached_page(key)
+    if cached is None:
+        cached = await _build_catalog_page(
+            db, page, key, query, topic, program_type, university, max_duration_weeks, search_mode,
         )
+    return page_or_not_modified(page.request, cached)
+
+
+async def _build_catalog_page(db, page, key, query, topic, program_type, university,
+                              max_duration_weeks, search_mode):
+    stmt = (
+        select(*COURSE_FIELDS.select_columns(COURSE_FIELDS.resolve(page.fields)))
+        .select_from(Course)
+        .outerjoin(University, Course.university_id == University.university_id)
+        .outerjoin(Program, Course.program_id == Program.program_id)
     )
     
+    rank = None
     if query:
-        stmt = stmt.where(
-            or_(
-                Course.course_name.ilike(f"%{query}%"),
-            )
-        )
+        stmt, rank = apply_course_search(stmt, query, search_mode)
     
     if max_duration_weeks:
         stmt = stmt.where(Course.duration_weeks <= max_duration_weeks)
     
     if university:
-        stmt = stmt.join(University).where(University.name.ilike(f"%{university}%"))
+        stmt = stmt.where(University.name.ilike(f"%{university}%"))
     
     if program_type:
-        stmt = stmt.join(Program).where(Program.program_type == program_type)
+        stmt = stmt.where(Program.program_type == program_type)
     
     if topic:
-        stmt = stmt.join(CourseTopic).join(Topic).where(Topic.topic_name.ilike(f"%{topic}%"))
-        
-    result = await db.execute(stmt)
-    courses = result.scalars().unique().all()
+        stmt = stmt.where(
+            select(CourseTopic.course_id)
+            .join(Topic, CourseTopic.topic_id == Topic.topic_id)
+            .where(CourseTopic.course_id == Course.course_id, Topic.topic_name.ilike(f"%{topic}%"))
+            .exists()
+        )
 
-    response = []
-    for course in courses:
-        response.append(CourseResponse(
-            course_id=course.course_id,
-            course_name=course.course_name,
-            duration_weeks=course.duration_weeks,
-            university_name=course.university.name if course.university else None,
-            program_name=course.program.program_name if course.program else None,
-            topics=[ct.topic.topic_name for ct in course.topics] if course.topics else []
-        ))
-    return response
+    keyset = COURSE_KEY
+    if rank is not None:
+        stmt = stmt.add_columns(rank.label("rank"))
+        keyset = Keyset(f"course_rank_{search_mode}", ((rank, True), (Course.course_id, False)))
+
+    result = await paginate(db, stmt, keyset, page)
+    for item in result.items:
+        if item.get("rank") is not None:
+            item["rank"] = round(item["rank"], 4)
+        elif not page.fields:
+            item["rank"] = None  # CourseResponse always has the field
+    return cache_page(key, dumps(result.items), page_headers(result, page))
 
 @router.post("/enrollments")
 async def enroll_course(
     request: EnrollmentRequest,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Enroll current user in a course."""
-    result = await db.execute(select(Student).where(Student.email == current_user.email))
-    student = result.scalar_one_or_none()
-    
-    if not student:
-        raise HTTPException(status_code=404, detail="Student profile not found for this user")
-
-    existing = await db.execute(
-        select(Enrollment).where(
-            and_(
-                Enrollment.student_id == student.student_id,
-                Enrollment.course_id == request.course_id
-            )
-        )
-    )
-    if existing.scalar_one_or_none():
-        raise HTTPException(status_code=400, detail="Already enrolled in this course")
-
-    course_stmt = select(Course).where(Course.course_id == request.course_id).with_for_update()
-    course_result = await db.execute(course_stmt)
-    course = course_result.scalar_one_or_none()
-    
-    if not course:
+    """Enroll current user in a course (seat reserved atomically, see enrollment_engine)."""
+    student_id = _student_id(profile)
+    result = await enroll_student(db, student_id, request.course_id)
+    if result.outcome == "no_course":
         raise HTTPException(status_code=404, detail="Course not found")
-        
-    if course.current_enrollment >= course.max_capacity:
+    if result.outcome == "duplicate":
+        raise HTTPException(status_code=400, detail="Already enrolled in this course")
+    if result.outcome == "full":
         raise HTTPException(status_code=400, detail="Course is full")
-
-    new_enrollment = Enrollment(
-        student_id=student.student_id,
-        course_id=request.course_id,
-        enroll_date=date.today(),
-        evaluation_score=None,
-        status="pending",
-    )
-    db.add(new_enrollment)
     await db.commit()
+    mark_recent_write(current_user.email)
+    if result.status == "approved":
+        return {"message": "Enrolled successfully."}
     return {"message": "Application submitted. Instructor will review."}
 
 @router.get("/enrollments/me", response_model=List[EnrollmentResponse])
 async def get_my_enrollments(
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all enrollments for the current user."""
-    result = await db.execute(select(Student).where(Student.email == current_user.email))
-    student = result.scalar_one_or_none()
-    
-    if not student:
+    if profile.student_id is None:
         return []
 
     stmt = (
         select(Enrollment, Course)
         .join(Course, Enrollment.course_id == Course.course_id)
         .where(
-            Enrollment.student_id == student.student_id,
+            Enrollment.student_id == profile.student_id,
             Enrollment.status == "approved",
         )
     )
@@ -220,121 +236,42 @@ async def get_my_enrollments(
 async def get_course_detail(
     course_id: int,
     current_user: AppUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get course details for the current student (must be enrolled)."""
-    stmt = (
-        select(Course)
-        .options(
-            selectinload(Course.university),
-            selectinload(Course.program),
-            selectinload(Course.textbook),
-            selectinload(Course.topics).selectinload(CourseTopic.topic),
-            selectinload(Course.content_items),
-            selectinload(Course.teaching_assignments).selectinload(TeachingAssignment.instructor)
-        )
-        .where(Course.course_id == course_id)
-    )
-    result = await db.execute(stmt)
-    course = result.scalar_one_or_none()
-    
-    if not course:
+    is_admin = current_user.role == "admin"
+    detail = await load_course_detail(db, course_id, None if is_admin else current_user.email)
+    if detail is None:
         raise HTTPException(status_code=404, detail="Course not found")
-    
-    evaluation_score = None
-    enroll_date = None
-
-    if current_user.role != "admin":
-        student_result = await db.execute(select(Student).where(Student.email == current_user.email))
-        student = student_result.scalar_one_or_none()
-        
-        if not student:
-            raise HTTPException(status_code=404, detail="Student profile not found for this user")
 
-        enrollment_result = await db.execute(
-            select(Enrollment).where(
-                and_(
-                    Enrollment.student_id == student.student_id,
-                    Enrollment.course_id == course_id
-                )
-            )
-        )
-        enrollment = enrollment_result.scalar_one_or_none()
-        
-        if not enrollment:
+    if not is_admin:
+        if detail["student_id"] is None:
+            raise HTTPException(status_code=404, detail="Student profile not found for this user")
+        if not detail["enrolled"]:
             raise HTTPException(status_code=403, detail="You are not enrolled in this course")
-        
-        evaluation_score = enrollment.evaluation_score
-        enroll_date = enrollment.enroll_date
-
-    content_items = []
-    if course.content_items:
-        content_items = [
-            ContentItemResponse(
-                content_id=item.content_id,
-                title=item.title,
-                content_type=item.content_type,
-                url=item.url
-            )
-            for item in course.content_items
-        ]
-
-    instructors = []
-    if course.teaching_assignments:
-        for assignment in course.teaching_assignments:
-            if assignment.instructor:
-                instructors.append(
-                    InstructorInfo(
-                        instructor_id=assignment.instructor.instructor_id,
-                        full_name=assignment.instructor.full_name,
-                        email=assignment.instructor.email,
-                        role=assignment.role
-                    )
-                )
-
-    # Live count of approved enrollments (fixes stale current_enrollment counter)
-    approved_count_result = await db.execute(
-        select(func.count(Enrollment.student_id)).where(
-            and_(
-                Enrollment.course_id == course_id,
-                Enrollment.status == "approved"
-            )
-        )
-    )
-    live_enrollment_count = approved_count_result.scalar() or 0
 
     return CourseDetailResponse(
-        course_id=course.course_id,
-        course_name=course.course_name,
-        duration_weeks=course.duration_weeks,
-        max_capacity=course.max_capacity,
-        current_enrollment=live_enrollment_count,
-        university_name=course.university.name if course.university else None,
-        program_name=course.program.program_name if course.program else None,
-        textbook_title=course.textbook.title if course.textbook else None,
-        textbook_url=course.textbook.url if course.textbook else None,
-        topics=[ct.topic.topic_name for ct in course.topics] if course.topics else [],
-        evaluation_score=evaluation_score,
-        enroll_date=enroll_date,
-        content_items=content_items,
-        instructors=instructors
+        **{field: detail[field] for field in STATIC_FIELDS},
+        # Approved enrollments from course_stats (current_enrollment also counts pending rows)
+        current_enrollment=detail["approved_count"] or 0,
+        evaluation_score=detail["evaluation_score"],
+        enroll_date=detail["enroll_date"],
     )
 
 @router.get("/applications/me", response_model=List[ApplicationResponse])
 async def get_my_applications(
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get current user's course applications (pending or rejected)."""
-    result = await db.execute(select(Student).where(Student.email == current_user.email))
-    student = result.scalar_one_or_none()
-    if not student:
+    if profile.student_id is None:
         return []
     stmt = (
         select(Enrollment, Course)
         .join(Course, Enrollment.course_id == Course.course_id)
         .where(
-            Enrollment.student_id == student.student_id,
+            Enrollment.student_id == profile.student_id,
             Enrollment.status.in_(["pending", "rejected"]),
         )
     )
@@ -350,50 +287,121 @@ async def get_my_applications(
     ]
 
 
-@router.get("/stats")
-async def get_student_stats(
+# ── Waitlist ─────────────────────────────────────────────────────
+
+class WaitlistPosition(BaseModel):
+    course_id: int
+    position: int
+    waiting: int
+    joined_at: datetime
+
+
+class MyWaitlistEntry(BaseModel):
+    course_id: int
+    course_name: str
+    position: int
+    joined_at: datetime
+
+
+def _student_id(profile: Profile) -> int:
+    if profile.student_id is None:
+        raise HTTPException(status_code=404, detail="Student profile not found for this user")
+    return profile.student_id
+
+
+@router.post("/courses/{course_id}/waitlist", response_model=WaitlistPosition)
+async def join_course_waitlist(
+    course_id: int,
+    profile: Profile = Depends(get_profile),
     current_user: AppUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get statistics for the current student."""
-    result = await db.execute(select(Student).where(Student.email == current_user.email))
-    student = result.scalar_one_or_none()
-    
-    if not student:
-        return {"total_enrollments": 0, "avg_score": None, "courses_completed": 0}
+    """Queue for a seat in a full course; the seat is taken automatically when one frees up."""
+    student_id = _student_id(profile)
+    queued = select(Waitlist.student_id).where(Waitlist.course_id == Course.course_id).exists()
+    seats = (await db.execute(
+        select(Course.current_enrollment, Course.max_capacity, queued.label("queued"))
+        .where(Course.course_id == course_id)
+    )).one_or_none()
+    if seats is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    if seats.current_enrollment < seats.max_capacity and not seats.queued:
+        raise HTTPException(status_code=409, detail="Course has free seats; enroll directly")
+    if not await join_waitlist(db, course_id, student_id):
+        raise HTTPException(status_code=400, detail="Already enrolled in this course")
+    position = await waitlist_position(db, course_id, student_id)
+    await db.commit()
+    mark_recent_write(current_user.email)
+    return position
 
-    # Count approved enrollments only
-    count_stmt = select(func.count(Enrollment.course_id)).where(
-        Enrollment.student_id == student.student_id,
-        Enrollment.status == "approved",
-    )
-    count_result = await db.execute(count_stmt)
-    total = count_result.scalar() or 0
-    
-    # Average score (approved enrollments only)
-    avg_stmt = select(func.avg(Enrollment.evaluation_score)).where(
-        and_(
-            Enrollment.student_id == student.student_id,
-            Enrollment.status == "approved",
-            Enrollment.evaluation_score.isnot(None)
-        )
+
+@router.get("/courses/{course_id}/waitlist", response_model=WaitlistPosition)
+async def get_waitlist_position(
+    course_id: int,
+    profile: Profile = Depends(get_profile),
+    current_user: AppUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """My place in a course's waitlist (1 = next in line)."""
+    position = await waitlist_position(db, course_id, _student_id(profile))
+    if position is None:
+        raise HTTPException(status_code=404, detail="Not on the waitlist for this course")
+    return position
+
+
+@router.delete("/courses/{course_id}/waitlist")
+async def leave_course_waitlist(
+    course_id: int,
+    profile: Profile = Depends(get_profile),
+    current_user: AppUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Leave a course's waitlist."""
+    student_id = _student_id(profile)
+    result = await db.execute(
+        delete(Waitlist).where(Waitlist.course_id == course_id, Waitlist.student_id == student_id)
     )
-    avg_result = await db.execute(avg_stmt)
-    avg_score = avg_result.scalar()
-    
-    # Courses with score (completed, approved only)
-    completed_stmt = select(func.count(Enrollment.course_id)).where(
-        and_(
-            Enrollment.student_id == student.student_id,
-            Enrollment.status == "approved",
-            Enrollment.evaluation_score.isnot(None)
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Not on the waitlist for this course")
+    await db.commit()
+    mark_recent_write(current_user.email)
+    return {"message": "Left the waitlist"}
+
+
+@router.get("/waitlist/me", response_model=List[MyWaitlistEntry])
+async def get_my_waitlists(
+    profile: Profile = Depends(get_profile),
+    current_user: AppUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """All waitlists I am on, with my position in each."""
+    if profile.student_id is None:
+        return []
+    return await my_waitlists(db, profile.student_id)
+
+
+@router.get("/stats")
+async def get_student_stats(
+    current_user: AppUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get statistics for the current student (approved enrollments) in one round trip."""
+    approved = Enrollment.status == "approved"
+    stmt = (
+        select(
+            func.count().filter(approved).label("total"),
+            func.avg(Enrollment.evaluation_score).filter(approved).label("avg_score"),
+            # Courses with a score count as completed
+            func.count(Enrollment.evaluation_score).filter(approved).label("completed"),
         )
+        .select_from(Student)
+        .outerjoin(Enrollment, Enrollment.student_id == Student.student_id)
+        .where(Student.email == current_user.email)
     )
-    completed_result = await db.execute(completed_stmt)
-    completed = completed_result.scalar() or 0
+    row = (await db.execute(stmt)).one()
     
     return {
-        "total_enrollments": total,
-        "avg_score": round(avg_score, 2) if avg_score else None,
-        "courses_completed": completed
+        "total_enrollments": row.total,
+        "avg_score": round(row.avg_score, 2) if row.avg_score else None,
+        "courses_completed": row.completed
     }
@@ -0,0 +1,152 @@
+"""
+Columnar analytics benchmark: the analyst group-by queries computed live in
+Postgres (what ``?fresh=true`` runs) versus the same answers from a
+columnar.Snapshot in memory. Also times the full snapshot load and an
+incremental refresh after a single grade change. Needs numpy.
+
+Fixtures (--students x --courses enrollments, 1.25M by default) are seeded
+inside one transaction that is rolled back at the end.
+
+Run from: apps/api/
+Command:  python scripts/bench_columnar.py [--students 50000] [--courses 25] [--repeat 5]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, text
+from database import engine
+from analytics_views import analytics_source
+from columnar import ColumnarStore, np
+
+QUERIES = [
+    ("overview",
+     select(analytics_source("mv_analytics_overview", live=True)),
+     lambda s: s.overview()),
+    ("top courses",
+     select(analytics_source("mv_course_enrollment", live=True)).order_by(text("enrollments DESC")).limit(5),
+     lambda s: s.top_courses(5)),
+    ("students by country",
+     select(analytics_source("mv_students_by_country", live=True)),
+     lambda s: s.students_by_country()),
+    ("topic trends", text("""
+        SELECT t.topic_name, count(e.student_id) FROM topic t
+          JOIN course_topic ct ON ct.topic_id = t.topic_id
+          JOIN enrollment e ON e.course_id = ct.course_id
+         GROUP BY t.topic_name ORDER BY 2 DESC
+     """), lambda s: s.topic_trends()),
+    ("at-risk students", text("""
+        SELECT s.student_id, avg(e.evaluation_score) FROM student s
+          JOIN enrollment e ON e.student_id = s.student_id
+         GROUP BY s.student_id HAVING avg(e.evaluation_score) < 40
+     """), lambda s: s.at_risk_students(40)),
+    ("module analytics", text("""
+        SELECT c.program_id, avg(e.evaluation_score), count(e.student_id) FROM course c
+          JOIN enrollment e ON e.course_id = c.course_id
+         GROUP BY c.program_id
+     """), lambda s: s.module_analytics()),
+]
+
+
+async def seed(conn, students: int, courses: int):
+    # Negative ids keep the fixtures clear of real rows; all rolled back anyway
+    await conn.execute(text(
+        "INSERT INTO university (university_id, name, country) VALUES (-1, 'Bench University', 'Nowhere')"
+    ))
+    await conn.execute(text(
+        "INSERT INTO program (program_id, program_name, program_type, duration_weeks_or_months) "
+        "VALUES (-1, 'Bench Program', 'certificate', 12)"
+    ))
+    await conn.execute(text("INSERT INTO textbook (textbook_id, title) VALUES (-1, 'Bench Textbook')"))
+    await conn.execute(text("""
+        INSERT INTO course (course_id, course_name, duration_weeks, university_id, program_id, textbook_id,
+                            max_capacity, current_enrollment)
+        SELECT -g, 'Bench Course ' || g, 12, -1, -1, -1, CAST(:students AS int), 0
+          FROM generate_series(1, CAST(:courses AS int)) AS g
+    """), {"students": students, "courses": courses})
+    await conn.execute(text("""
+        INSERT INTO topic (topic_id, topic_name)
+        SELECT -g, 'Bench Topic ' || g FROM generate_series(1, 5) AS g
+    """))
+    await conn.execute(text("""
+        INSERT INTO course_topic (course_id, topic_id)
+        SELECT -c, -(1 + c % 5) FROM generate_series(1, CAST(:courses AS int)) AS c
+    """), {"courses": courses})
+    await conn.execute(text("""
+        INSERT INTO student (student_id, email, full_name, age, country, skill_level)
+        SELECT -g, 'bench' || g || '@example.invalid', 'Bench Student ' || g, 20,
+               (ARRAY['India', 'Nepal', 'Kenya', 'Chile'])[1 + g % 4],
+               (ARRAY['beginner', 'intermediate', 'advanced'])[1 + g % 3]
+          FROM generate_series(1, CAST(:n AS int)) AS g
+    """), {"n": students})
+    await conn.execute(text("""
+        INSERT INTO enrollment (student_id, course_id, enroll_date, status, evaluation_score)
+        SELECT -s, -c, CURRENT_DATE, 'approved', CASE WHEN random() < 0.8 THEN (random() * 100)::int END
+          FROM generate_series(1, CAST(:students AS int)) AS s
+         CROSS JOIN generate_series(1, CAST(:courses AS int)) AS c
+    """), {"students": students, "courses": courses})
+
+
+def median_ms(samples: list[float]) -> float:
+    return statistics.median(samples) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=50_000)
+    parser.add_argument("--courses", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    if np is None:
+        sys.exit("numpy is not installed")
+
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            start = time.perf_counter()
+            await seed(conn, args.students, args.courses)
+            await conn.execute(text("ANALYZE enrollment"))
+            seeded = time.perf_counter() - start
+            total = (await conn.execute(text("SELECT count(*) FROM enrollment"))).scalar_one()
+
+            print("=" * 64)
+            print(f" Columnar analytics: {total:,} enrollments (seeded in {seeded:.1f}s)")
+            print("=" * 64)
+
+            store = ColumnarStore()
+            load = await store.refresh(conn)
+            print(f"  full snapshot load       {load['ms']:>8} ms  ({load['ranges']} ranges)")
+            await conn.execute(text(
+                "UPDATE enrollment SET evaluation_score = 55 WHERE student_id = -1 AND course_id = -1"
+            ))
+            incremental = await store.refresh(conn)
+            print(f"  refresh after 1 change   {incremental['ms']:>8} ms  "
+                  f"({incremental['ranges_read']} range re-read)")
+            idle = await store.refresh(conn)
+            print(f"  refresh, nothing changed {idle['ms']:>8} ms\n")
+
+            snapshot = store.snapshot
+            print(f"  {'query':<22}{'SQL ms':>10}{'columnar ms':>14}{'speedup':>10}")
+            for label, stmt, compute in QUERIES:
+                sql, col = [], []
+                for _ in range(args.repeat):
+                    t = time.perf_counter()
+                    (await conn.execute(stmt)).all()
+                    sql.append(time.perf_counter() - t)
+                    t = time.perf_counter()
+                    compute(snapshot)
+                    col.append(time.perf_counter() - t)
+                print(f"  {label:<22}{median_ms(sql):>10.1f}{median_ms(col):>14.2f}"
+                      f"{statistics.median(sql) / statistics.median(col):>9.0f}x")
+        finally:
+            await trans.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
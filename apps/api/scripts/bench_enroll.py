@@ -0,0 +1,148 @@
+"""
+Enrollment contention benchmark: N concurrent students racing for M seats in
+one course, through the old path (SELECT ... FOR UPDATE on the course row,
+duplicate check, INSERT, counter UPDATE) and through
+enrollment_engine.enroll_student(). Asserts that neither overbooks and
+reports throughput.
+
+Unlike the other benchmarks the enrollments must really commit to contend,
+so fixtures use negative ids and are deleted at the end.
+
+Run from: apps/api/
+Command:  python scripts/bench_enroll.py [--students 500] [--seats 200] [--concurrency 32]
+"""
+import argparse
+import asyncio
+import sys
+import os
+import time
+from dataclasses import replace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from database import DATABASE_URL, build_engine, load_engine_settings
+from enrollment_engine import enroll_student
+
+COURSE_ID = -1
+
+
+async def seed(conn, students: int, seats: int):
+    await conn.execute(text(
+        "INSERT INTO university (university_id, name, country) VALUES (-1, 'Bench University', 'Nowhere')"
+    ))
+    await conn.execute(text(
+        "INSERT INTO program (program_id, program_name, program_type, duration_weeks_or_months) "
+        "VALUES (-1, 'Bench Program', 'certificate', 12)"
+    ))
+    await conn.execute(text("INSERT INTO textbook (textbook_id, title) VALUES (-1, 'Bench Textbook')"))
+    await conn.execute(text(
+        "INSERT INTO course (course_id, course_name, duration_weeks, university_id, program_id, textbook_id, "
+        "max_capacity, current_enrollment) VALUES (-1, 'Bench Course', 12, -1, -1, -1, :seats, 0)"
+    ), {"seats": seats})
+    await conn.execute(text("""
+        INSERT INTO student (student_id, email, full_name, age, country)
+        SELECT -g, 'bench' || g || '@example.invalid', 'Bench Student ' || g, 20, 'Nowhere'
+          FROM generate_series(1, CAST(:n AS int)) AS g
+    """), {"n": students})
+
+
+async def cleanup(conn):
+    await conn.execute(text("DELETE FROM enrollment WHERE course_id = -1"))
+    await conn.execute(text("DELETE FROM student WHERE student_id < 0 AND email LIKE 'bench%@example.invalid'"))
+    await conn.execute(text("DELETE FROM course WHERE course_id = -1"))
+    await conn.execute(text("DELETE FROM textbook WHERE textbook_id = -1"))
+    await conn.execute(text("DELETE FROM program WHERE program_id = -1"))
+    await conn.execute(text("DELETE FROM university WHERE university_id = -1"))
+
+
+async def enroll_locked(session: AsyncSession, student_id: int) -> bool:
+    """The pre-engine path: lock the course row for the whole check-then-insert."""
+    params = {"sid": student_id, "cid": COURSE_ID}
+    if (await session.execute(
+        text("SELECT 1 FROM enrollment WHERE student_id = :sid AND course_id = :cid"), params
+    )).first():
+        await session.rollback()
+        return False
+    course = (await session.execute(
+        text("SELECT max_capacity, current_enrollment FROM course WHERE course_id = :cid FOR UPDATE"), params
+    )).one()
+    if course.current_enrollment >= course.max_capacity:
+        await session.rollback()
+        return False
+    await session.execute(text(
+        "INSERT INTO enrollment (student_id, course_id, enroll_date, status) VALUES (:sid, :cid, CURRENT_DATE, 'pending')"
+    ), params)
+    # What trg_auto_enrollment_count used to do
+    await session.execute(text(
+        "UPDATE course SET current_enrollment = current_enrollment + 1 WHERE course_id = :cid"
+    ), params)
+    await session.commit()
+    return True
+
+
+async def enroll_engine(session: AsyncSession, student_id: int) -> bool:
+    enrolled = (await enroll_student(session, student_id, COURSE_ID)).outcome == "enrolled"
+    await session.commit()
+    return enrolled
+
+
+async def race(Session, fn, students: int):
+    async def one(student_id: int) -> bool:
+        async with Session() as session:
+            return await fn(session, student_id)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(-g) for g in range(1, students + 1)))
+    return sum(results), time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--seats", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32, help="connection pool size")
+    args = parser.parse_args()
+
+    engine = build_engine(DATABASE_URL, replace(
+        load_engine_settings("bench"), pool_size=args.concurrency, max_overflow=0,
+    ))
+    Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    print("=" * 60)
+    print(f" Enrollment race: {args.students:,} students, {args.seats:,} seats, "
+          f"{args.concurrency} connections")
+    print("=" * 60)
+
+    async with engine.begin() as conn:
+        await cleanup(conn)
+        await seed(conn, args.students, args.seats)
+    try:
+        print(f"  {'path':<24}{'enrolled':>10}{'seconds':>10}{'attempts/s':>12}")
+        for label, fn in (("FOR UPDATE (old)", enroll_locked), ("enrollment_engine", enroll_engine)):
+            enrolled, seconds = await race(Session, fn, args.students)
+            async with engine.connect() as conn:
+                rows = (await conn.execute(text(
+                    "SELECT count(*) FROM enrollment WHERE course_id = -1"
+                ))).scalar_one()
+                counter = (await conn.execute(text(
+                    "SELECT current_enrollment FROM course WHERE course_id = -1"
+                ))).scalar_one()
+            print(f"  {label:<24}{enrolled:>10}{seconds:>10.2f}{args.students / seconds:>12.0f}")
+            assert enrolled == rows == counter == min(args.students, args.seats), \
+                f"{label}: {enrolled} enrolled, {rows} rows, counter {counter}"
+
+            async with engine.begin() as conn:
+                # Releases the seats through trg_enrollment_seat_release
+                await conn.execute(text("DELETE FROM enrollment WHERE course_id = -1"))
+        print("\n  no overbooking on either path")
+    finally:
+        async with engine.begin() as conn:
+            await cleanup(conn)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
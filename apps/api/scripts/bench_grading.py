@@ -0,0 +1,129 @@
+"""
+Grading benchmark: the per-row path of PUT /instructor/enrollments/{sid}/{cid}
+(instructor lookup, ownership check, SELECT, audit INSERT, UPDATE, commit,
+once per student) versus grading.apply_grades() for the whole course.
+
+Everything happens inside one transaction that is rolled back at the end
+(per-row commits are savepoints), so it is safe to point at a dev database.
+
+Run from: apps/api/
+Command:  python scripts/bench_grading.py [--students 300] [--repeat 5]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from database import engine
+from instrumentation import track_queries
+from grading import apply_grades, validate_grades
+
+COURSE_ID = -1
+INSTRUCTOR_ID = -1
+
+
+async def seed(conn, n: int):
+    # Negative ids keep the fixtures clear of real rows; all rolled back anyway
+    await conn.execute(text(
+        "INSERT INTO university (university_id, name, country) VALUES (-1, 'Bench University', 'Nowhere')"
+    ))
+    await conn.execute(text(
+        "INSERT INTO program (program_id, program_name, program_type, duration_weeks_or_months) "
+        "VALUES (-1, 'Bench Program', 'certificate', 12)"
+    ))
+    await conn.execute(text("INSERT INTO textbook (textbook_id, title) VALUES (-1, 'Bench Textbook')"))
+    await conn.execute(text(
+        "INSERT INTO course (course_id, course_name, duration_weeks, university_id, program_id, textbook_id, "
+        "max_capacity, current_enrollment) VALUES (-1, 'Bench Course', 12, -1, -1, -1, 100000, 0)"
+    ))
+    await conn.execute(text(
+        "INSERT INTO instructor (instructor_id, full_name, email) VALUES (-1, 'Bench Instructor', 'bench@example.invalid')"
+    ))
+    await conn.execute(text("INSERT INTO teaching_assignment (instructor_id, course_id) VALUES (-1, -1)"))
+    await conn.execute(text("""
+        INSERT INTO student (student_id, email, full_name, age, country)
+        SELECT -g, 'bench' || g || '@example.invalid', 'Bench Student ' || g, 20, 'Nowhere'
+          FROM generate_series(1, CAST(:n AS int)) AS g
+    """), {"n": n})
+    await conn.execute(text("""
+        INSERT INTO enrollment (student_id, course_id, enroll_date, status)
+        SELECT -g, -1, CURRENT_DATE, 'approved' FROM generate_series(1, CAST(:n AS int)) AS g
+    """), {"n": n})
+
+
+async def grade_per_row(conn, grades: list[tuple[int, int]]):
+    for student_id, score in grades:
+        await conn.execute(text("SAVEPOINT per_row"))
+        await conn.execute(text("SELECT * FROM instructor WHERE email = 'bench@example.invalid'"))
+        await conn.execute(
+            text("SELECT * FROM teaching_assignment WHERE instructor_id = :iid AND course_id = :cid"),
+            {"iid": INSTRUCTOR_ID, "cid": COURSE_ID},
+        )
+        old = (await conn.execute(
+            text("SELECT evaluation_score FROM enrollment WHERE student_id = :sid AND course_id = :cid"),
+            {"sid": student_id, "cid": COURSE_ID},
+        )).scalar_one()
+        await conn.execute(text(
+            "INSERT INTO audit_log (student_id, course_id, old_score, new_score, changed_by) "
+            "VALUES (:sid, :cid, :old, :new, 'bench')"
+        ), {"sid": student_id, "cid": COURSE_ID, "old": old, "new": score})
+        await conn.execute(
+            text("UPDATE enrollment SET evaluation_score = :new WHERE student_id = :sid AND course_id = :cid"),
+            {"sid": student_id, "cid": COURSE_ID, "new": score},
+        )
+        await conn.execute(text("RELEASE SAVEPOINT per_row"))
+
+
+async def grade_bulk(conn, grades: list[tuple[int, int]]):
+    valid, _ = validate_grades({"student_id": s, "evaluation_score": g} for s, g in grades)
+    await conn.execute(text("SELECT * FROM instructor WHERE email = 'bench@example.invalid'"))
+    await conn.execute(
+        text("SELECT * FROM teaching_assignment WHERE instructor_id = :iid AND course_id = :cid"),
+        {"iid": INSTRUCTOR_ID, "cid": COURSE_ID},
+    )
+    await apply_grades(conn, COURSE_ID, valid, "bench")
+
+
+async def time_path(conn, fn, n: int, repeat: int):
+    samples, statements = [], 0
+    for r in range(repeat):
+        # A different score each round, so every row really changes
+        grades = [(-g, (g + r) % 101) for g in range(1, n + 1)]
+        with track_queries() as stats:
+            start = time.perf_counter()
+            await fn(conn, grades)
+            samples.append((time.perf_counter() - start) * 1000)
+        statements = stats.count
+    return statements, statistics.median(samples), max(samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f" Grading benchmark ({args.students:,} students in one course)")
+    print("=" * 60)
+
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            await seed(conn, args.students)
+            print(f"  {'path':<24}{'statements':>12}{'median ms':>12}{'max ms':>10}")
+            for label, fn in (("per-row (old)", grade_per_row), ("bulk apply_grades", grade_bulk)):
+                statements, median, worst = await time_path(conn, fn, args.students, args.repeat)
+                print(f"  {label:<24}{statements:>12}{median:>12.2f}{worst:>10.2f}")
+        finally:
+            await trans.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Course search benchmark: the old ILIKE sequential-scan path versus the
+indexed search modes, at a synthetic catalog size (default 100k courses).
+
+Everything happens inside one transaction that is rolled back at the end,
+so it is safe to point at a dev database that already has the migrations.
+
+Run from: apps/api/
+Command:  python scripts/bench_search.py [--courses 100000] [--repeat 20]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, text, desc
+from database import engine
+from models import Course
+from search import apply_course_search
+
+WORDS = [
+    "data", "machine", "learning", "deep", "systems", "database", "network",
+    "security", "cloud", "compiler", "graphics", "vision", "quantum", "robotics",
+    "statistics", "algebra", "calculus", "design", "web", "mobile",
+]
+
+# (label, query, search_mode, disable indexes to mimic the pre-migration plan).
+# Queries match ~1 course in 400, like a realistic catalog search.
+CASES = [
+    ("ILIKE seq scan (old)", "graphics quantum", None, True),
+    ("ILIKE trigram", "graphics quantum", None, False),
+    ("prefix", "graph quant", "prefix", False),
+    ("fuzzy", "grafics quantm", "fuzzy", False),
+    ("fulltext", "graphics quantum -web", "fulltext", False),
+]
+
+
+async def seed(conn, n: int):
+    # Negative ids keep the fixtures clear of real rows; all rolled back anyway
+    await conn.execute(text(
+        "INSERT INTO university (university_id, name, country) VALUES (-1, 'Bench University', 'Nowhere')"
+    ))
+    await conn.execute(text(
+        "INSERT INTO program (program_id, program_name, program_type, duration_weeks_or_months) "
+        "VALUES (-1, 'Bench Program', 'certificate', 12)"
+    ))
+    await conn.execute(text("INSERT INTO textbook (textbook_id, title) VALUES (-1, 'Bench Textbook')"))
+    nw = len(WORDS)
+    await conn.execute(text(f"""
+        INSERT INTO course (course_name, duration_weeks, university_id, program_id, textbook_id,
+                            max_capacity, current_enrollment)
+        SELECT initcap(w[1 + g % {nw}]) || ' ' || initcap(w[1 + (g / {nw}) % {nw}]) || ' '
+               || initcap(w[1 + (g / {nw * nw}) % {nw}]) || ' ' || g,
+               4 + g % 12, -1, -1, -1, 100, 0
+          FROM generate_series(1, CAST(:n AS int)) AS g,
+               (SELECT CAST(:words AS text[]) AS w) AS words
+    """), {"n": n, "words": WORDS})
+    await conn.execute(text("ANALYZE course"))
+
+
+async def time_case(conn, query: str, mode, seq_scan: bool, repeat: int):
+    stmt, rank = apply_course_search(select(Course.course_id, Course.course_name), query, mode)
+    if rank is not None:
+        stmt = stmt.order_by(desc(rank), Course.course_id)
+
+    await conn.execute(text("SAVEPOINT bench_case"))
+    if seq_scan:
+        await conn.execute(text("SET LOCAL enable_bitmapscan = off"))
+        await conn.execute(text("SET LOCAL enable_indexscan = off"))
+    samples = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len((await conn.execute(stmt)).all())
+        samples.append((time.perf_counter() - start) * 1000)
+    await conn.execute(text("ROLLBACK TO SAVEPOINT bench_case"))
+    return rows, statistics.median(samples), max(samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f" Course search benchmark ({args.courses:,} synthetic courses)")
+    print("=" * 60)
+
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            start = time.perf_counter()
+            await seed(conn, args.courses)
+            print(f"  seeded in {time.perf_counter() - start:.1f}s\n")
+
+            print(f"  {'case':<24}{'rows':>6}{'median ms':>12}{'max ms':>10}")
+            for label, query, mode, seq_scan in CASES:
+                rows, median, worst = await time_case(conn, query, mode, seq_scan, args.repeat)
+                print(f"  {label:<24}{rows:>6}{median:>12.2f}{worst:>10.2f}")
+        finally:
+            await trans.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Serialization benchmark: a 10k-row course list returned the default way
+(list of dicts, validated against response_model=List[CourseResponse] and run
+through jsonable_encoder) versus fast_json.FastJSONResponse built straight
+from the row tuples. Both routes are served by a throwaway FastAPI app over
+ASGI, so routing and response handling are included but no database is needed.
+
+Run from: apps/api/
+Command:  python scripts/bench_serialization.py [--rows 10000] [--repeat 10]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import os
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+from fast_json import FastJSONResponse, orjson
+from routers.student import CourseResponse
+
+KEYS = ["course_id", "course_name", "duration_weeks", "university_name", "program_name", "topics", "rank"]
+
+
+def make_rows(n: int) -> list[tuple]:
+    return [
+        (i, f"Course {i}", 4 + i % 20, f"University {i % 50}", f"Program {i % 12}",
+         [f"Topic {i % 7}", f"Topic {i % 11}"], None)
+        for i in range(1, n + 1)
+    ]
+
+
+def build_app(rows: list[tuple]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/current", response_model=List[CourseResponse])
+    async def current():
+        return [dict(zip(KEYS, row)) for row in rows]
+
+    @app.get("/fast", response_model=List[CourseResponse])
+    async def fast():
+        return FastJSONResponse([dict(zip(KEYS, row)) for row in rows])
+
+    return app
+
+
+async def time_route(client: httpx.AsyncClient, path: str, repeat: int) -> tuple[list[float], bytes]:
+    timings = []
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        r = await client.get(path)
+        timings.append((time.perf_counter() - start) * 1000)
+        body = r.content
+    return timings, body
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    app = build_app(make_rows(args.rows))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/current")  # warm up
+        current, current_body = await time_route(client, "/current", args.repeat)
+        fast, fast_body = await time_route(client, "/fast", args.repeat)
+
+    assert json.loads(current_body) == json.loads(fast_body), "responses differ"
+
+    print("=" * 60)
+    print(f" {args.rows:,}-row response, {args.repeat} requests each "
+          f"(encoder: {'orjson' if orjson else 'stdlib json'})")
+    print("=" * 60)
+    print(f"  {'path':<28}{'median ms':>12}{'min ms':>10}")
+    for label, timings in (("response_model + encoder", current), ("FastJSONResponse", fast)):
+        print(f"  {label:<28}{statistics.median(timings):>12.1f}{min(timings):>10.1f}")
+    print(f"\n  speedup: {statistics.median(current) / statistics.median(fast):.1f}x, "
+          f"identical JSON ({len(fast_body):,} bytes)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,40 @@
+"""
+Compare the trigger-maintained course_stats table with a full recompute
+from enrollment and report drift.
+
+Run from: apps/api/
+Command:  python scripts/check_course_stats.py [--repair]
+Exit code 1 when drift was found (and not repaired).
+"""
+import argparse
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine, AsyncSessionLocal
+from course_stats import check_course_stats
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repair", action="store_true", help="overwrite drifted rows with recomputed values")
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as session:
+        drift = await check_course_stats(session, repair=args.repair)
+    await engine.dispose()
+
+    for entry in drift:
+        cols = ", ".join(f"{c} {v['stored']} -> {v['expected']}" for c, v in entry["columns"].items())
+        print(f"  course {entry['course_id']}: {cols}")
+    if not drift:
+        print("  course_stats OK")
+        return 0
+    print(f"\n  {len(drift)} course(s) drifted{' (repaired)' if args.repair else ''}")
+    return 0 if args.repair else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
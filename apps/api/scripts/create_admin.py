@@ -6,7 +6,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
 
 from apps.api.database import engine, AsyncSessionLocal
 from apps.api.models import AppUser
-from apps.api.routers.auth import get_password_hash
+from apps.api.passwords import hash_password_sync
 from sqlalchemy import select
 
 async def create_admin():
@@ -20,7 +20,7 @@ async def create_admin():
         print("Creating admin user...")
         admin_user = AppUser(
             email="admin@example.com",
-            password_hash=get_password_hash("admin123"),
+            password_hash=hash_password_sync("admin123"),
             role="admin"
         )
         db.add(admin_user)
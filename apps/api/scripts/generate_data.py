@@ -0,0 +1,359 @@
+"""
+Synthetic data generator: production-scale universities, programs, textbooks,
+topics, instructors, courses, students, enrollments and grade audit history.
+
+Rows are produced from one seeded random.Random, rendered to CSV in memory
+and streamed to Postgres with COPY, a batch at a time, so the same --seed
+always produces the same data. Course popularity follows a Zipf curve
+(--skew), countries and skill levels follow fixed weights, and scores are
+normal around a per-course mean. New ids start after the current maximum of
+each table, so the generator adds to whatever is already loaded.
+
+Everything runs in one transaction. Row triggers on the loaded tables are
+disabled for the load (ALTER TABLE ... DISABLE TRIGGER USER, which needs
+table ownership), and the data they maintain (course search vectors,
+course_stats, seat counts) is rebuilt set-wise afterwards. The analytics
+views are refreshed at the end.
+
+Run from: apps/api/
+Command:  python scripts/generate_data.py [--students 1e6] [--courses 50k] [--enrollments-per-student 3] [--seed 42]
+"""
+import argparse
+import asyncio
+import csv
+import io
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from database import engine
+from analytics_views import refresh_analytics_views
+
+COPY_BATCH_ROWS = 20_000
+
+# Dates are anchored so a seed reproduces the same rows on any day
+EPOCH = date(2024, 1, 1)
+DATE_SPAN_DAYS = 730
+
+COUNTRIES = {
+    "India": 40, "United States": 14, "Nigeria": 6, "Brazil": 6, "Bangladesh": 5, "Pakistan": 5,
+    "United Kingdom": 4, "Germany": 3, "Indonesia": 3, "Egypt": 3, "Mexico": 3, "Kenya": 2,
+    "Canada": 2, "Philippines": 2, "Vietnam": 2,
+}
+SKILL_LEVELS = {"beginner": 45, "intermediate": 35, "advanced": 20}
+CATEGORIES = {"student": 70, "professional": 30}
+STATUSES = {"approved": 85, "pending": 10, "rejected": 5}
+PROGRAM_TYPES = ["certificate", "diploma", "degree"]
+ROLES = ["instructor", "teaching_assistant"]
+
+FIRST_NAMES = [
+    "Aarav", "Aditi", "Amina", "Ana", "Arjun", "Chen", "Chloe", "Daniel", "Diya", "Emeka", "Fatima",
+    "Hiro", "Isha", "Ivan", "Kavya", "Lucas", "Maria", "Mei", "Mohammed", "Nadia", "Omar", "Priya",
+    "Rahul", "Sara", "Sofia", "Tanvir", "Thabo", "Wei", "Yusuf", "Zara",
+]
+LAST_NAMES = [
+    "Ahmed", "Banerjee", "Chowdhury", "Costa", "Das", "Garcia", "Gupta", "Hassan", "Iyer", "Khan",
+    "Kim", "Kumar", "Li", "Mensah", "Mukherjee", "Nguyen", "Okafor", "Patel", "Reddy", "Rossi",
+    "Santos", "Sato", "Sharma", "Silva", "Singh", "Smith", "Tanaka", "Wang", "Williams", "Yadav",
+]
+SUBJECTS = [
+    "Algorithms", "Artificial Intelligence", "Cloud Computing", "Compilers", "Computer Networks",
+    "Computer Vision", "Cryptography", "Data Mining", "Data Science", "Database Systems",
+    "Deep Learning", "Distributed Systems", "Embedded Systems", "Game Development",
+    "Information Retrieval", "Machine Learning", "Mobile Development", "NLP", "Operating Systems",
+    "Probability", "Python", "Quantum Computing", "Reinforcement Learning", "Robotics", "Security",
+    "Software Engineering", "Statistics", "Web Development",
+]
+LEVELS = ["Foundations of", "Introduction to", "Applied", "Advanced", "Topics in", "Practical"]
+
+# Tables loaded here, parents first; the id column new rows are numbered from
+TABLE_IDS = {
+    "university": "university_id", "program": "program_id", "textbook": "textbook_id",
+    "topic": "topic_id", "instructor": "instructor_id", "course": "course_id", "student": "student_id",
+}
+LOADED_TABLES = list(TABLE_IDS) + ["course_topic", "teaching_assignment", "enrollment", "audit_log"]
+
+
+def count(value: str) -> int:
+    """Accept 1000000, 1e6 or 50k."""
+    value = value.strip().lower().replace("_", "")
+    scale = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip("km")) * scale)
+
+
+def weighted(rng: random.Random, weights: dict, k: int) -> list:
+    return rng.choices(list(weights), weights=list(weights.values()), k=k)
+
+
+def full_name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def zipf_cum_weights(n: int, skew: float, rng: random.Random) -> list[float]:
+    """Cumulative Zipf weights over n items; the ranks are shuffled so popularity is not id order."""
+    ranks = list(range(1, n + 1))
+    rng.shuffle(ranks)
+    return list(itertools.accumulate(1 / r ** skew for r in ranks))
+
+
+def pick_distinct(rng: random.Random, population: range, cum_weights: list[float], k: int) -> list[int]:
+    """k distinct items drawn by weight (fewer if the draws keep colliding)."""
+    picked: dict[int, None] = {}
+    for _ in range(5):
+        for item in rng.choices(population, cum_weights=cum_weights, k=k - len(picked)):
+            picked[item] = None
+        if len(picked) >= k:
+            break
+    return list(picked)[:k]
+
+
+def score(rng: random.Random, mean: float) -> int:
+    return min(100, max(0, round(rng.gauss(mean, 15))))
+
+
+class Generator:
+    """Row generators for one run; call them in declaration order for a reproducible stream."""
+
+    def __init__(self, args, base: dict[str, int]):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.base = base
+        self.audit_rows: list[tuple] = []
+        self.enrollments = 0
+
+    def ids(self, table: str, n: int) -> range:
+        start = self.base[table] + 1
+        return range(start, start + n)
+
+    def universities(self):
+        for uid in self.ids("university", self.args.universities):
+            country = weighted(self.rng, COUNTRIES, 1)[0]
+            yield uid, f"University of {self.rng.choice(LAST_NAMES)} {uid}", country
+
+    def programs(self):
+        for pid in self.ids("program", self.args.programs):
+            kind = self.rng.choice(PROGRAM_TYPES)
+            yield pid, f"{self.rng.choice(SUBJECTS)} {kind.title()} {pid}", kind, self.rng.randint(6, 48)
+
+    def textbooks(self):
+        for tid in self.ids("textbook", self.args.textbooks):
+            yield tid, f"{self.rng.choice(LEVELS)} {self.rng.choice(SUBJECTS)}, vol. {tid}", f"978{tid:010d}", None
+
+    def topics(self):
+        for tid in self.ids("topic", self.args.topics):
+            yield tid, f"{self.rng.choice(SUBJECTS)} {tid}"
+
+    def instructors(self):
+        for iid in self.ids("instructor", self.args.instructors):
+            yield iid, full_name(self.rng), f"instructor{iid}@generated.test", self.rng.randint(0, 35), None
+
+    def courses(self):
+        universities = self.ids("university", self.args.universities)
+        programs = self.ids("program", self.args.programs)
+        textbooks = self.ids("textbook", self.args.textbooks)
+        # Per-course difficulty, used for score generation
+        self.course_mean = [self.rng.gauss(68, 8) for _ in range(self.args.courses)]
+        for cid in self.ids("course", self.args.courses):
+            name = f"{self.rng.choice(LEVELS)} {self.rng.choice(SUBJECTS)} {cid}"
+            # Capacity and current_enrollment are set from the loaded enrollments afterwards
+            yield (cid, name, self.rng.randint(4, 16), self.rng.choice(universities),
+                   self.rng.choice(programs), self.rng.choice(textbooks), 100, 0)
+
+    def course_topics(self):
+        topics = self.ids("topic", self.args.topics)
+        cum = zipf_cum_weights(len(topics), 1.0, self.rng)
+        for cid in self.ids("course", self.args.courses):
+            for tid in pick_distinct(self.rng, topics, cum, self.rng.randint(1, min(3, len(topics)))):
+                yield cid, tid
+
+    def teaching_assignments(self):
+        instructors = self.ids("instructor", self.args.instructors)
+        for cid in self.ids("course", self.args.courses):
+            staff = self.rng.sample(instructors, min(len(instructors), self.rng.randint(1, 2)))
+            for role, iid in zip(ROLES, staff):
+                yield iid, cid, role
+
+    def students(self):
+        ids = self.ids("student", self.args.students)
+        n = len(ids)
+        rng = self.rng
+        columns = zip(ids, rng.choices(FIRST_NAMES, k=n), rng.choices(LAST_NAMES, k=n),
+                      weighted(rng, COUNTRIES, n), weighted(rng, SKILL_LEVELS, n), weighted(rng, CATEGORIES, n))
+        for sid, first, last, country, skill, category in columns:
+            age = min(100, max(13, round(rng.triangular(16, 65, 22))))
+            yield sid, f"{first} {last}", age, country, category, skill, f"student{sid}@generated.test"
+
+    def enrollment_rows(self):
+        courses = self.ids("course", self.args.courses)
+        cum = zipf_cum_weights(len(courses), self.args.skew, self.rng)
+        per_student = self.args.enrollments_per_student
+        cap = max(1, len(courses) // 2)
+        first_course = courses.start
+        dates = [EPOCH + timedelta(days=d) for d in range(DATE_SPAN_DAYS)]
+        # Hot loop: one random() per decision, cumulative status shares
+        total = sum(STATUSES.values())
+        status_cuts = [(share / total, status) for status, share in
+                       zip(STATUSES, itertools.accumulate(STATUSES.values()))]
+        graded, audited = self.args.graded, self.args.audit
+        rng = self.rng
+        random, gauss = rng.random, rng.gauss
+        for sid in self.ids("student", self.args.students):
+            k = min(cap, max(1, round(rng.expovariate(1 / per_student)))) if per_student > 0 else 0
+            for cid in pick_distinct(rng, courses, cum, k):
+                r = random()
+                status = next(s for cut, s in status_cuts if r < cut)
+                enrolled = dates[int(random() * DATE_SPAN_DAYS)]
+                value = None
+                if status == "approved" and random() < graded:
+                    value = min(100, max(0, round(gauss(self.course_mean[cid - first_course], 15))))
+                    if random() < audited:
+                        self.audit(sid, cid, enrolled, value)
+                self.enrollments += 1
+                yield sid, cid, enrolled, value, status
+
+    def audit(self, sid: int, cid: int, enrolled: date, final: int):
+        """Grade history ending at ``final``: a first grade, then up to two regrades."""
+        changes = [score(self.rng, final) for _ in range(self.rng.randint(0, 2))] + [final]
+        old = None
+        at = datetime.combine(enrolled, dtime(9), tzinfo=timezone.utc)
+        for new in changes:
+            at += timedelta(days=self.rng.randint(7, 60), minutes=self.rng.randrange(600))
+            changed_by = f"instructor{self.base['instructor'] + 1 + self.rng.randrange(self.args.instructors)}@generated.test"
+            self.audit_rows.append((sid, cid, old, new, changed_by, at))
+            old = new
+
+
+async def copy_rows(pg, table: str, columns: list[str], rows) -> int:
+    """COPY ``rows`` into ``table``, rendering COPY_BATCH_ROWS rows of CSV per chunk."""
+    copied = 0
+
+    async def chunks():
+        nonlocal copied
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        while batch := list(itertools.islice(rows, COPY_BATCH_ROWS)):
+            writer.writerows(batch)
+            copied += len(batch)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    await pg.copy_to_table(table, source=chunks(), columns=columns, format="csv")
+    return copied
+
+
+async def rebuild_derived(conn, gen: Generator):
+    """Recompute what the disabled row triggers would have maintained for the new courses."""
+    params = {"lo": gen.ids("course", 1).start, "hi": gen.base["course"] + gen.args.courses}
+    await conn.execute(text("""
+        UPDATE course c
+           SET search_vector = fn_course_search_document(c.course_id, c.course_name, c.university_id, c.program_id)
+         WHERE c.course_id BETWEEN :lo AND :hi
+    """), params)
+    await conn.execute(text("""
+        INSERT INTO course_stats (
+            course_id, approved_count, pending_count, rejected_count, score_sum, score_count,
+            pass_count, bucket_0_20, bucket_21_40, bucket_41_60, bucket_61_80, bucket_81_100)
+        SELECT course_id, approved_count, pending_count, rejected_count, score_sum, score_count,
+               pass_count, bucket_0_20, bucket_21_40, bucket_41_60, bucket_61_80, bucket_81_100
+          FROM v_course_stats_recomputed
+         WHERE course_id BETWEEN :lo AND :hi
+    """), params)
+    # Seat-holding rows; popular courses get room for a few more
+    await conn.execute(text("""
+        UPDATE course c
+           SET current_enrollment = s.approved_count + s.pending_count,
+               max_capacity = greatest(c.max_capacity, ((s.approved_count + s.pending_count) * 6 / 5 / 50 + 1) * 50)
+          FROM course_stats s
+         WHERE s.course_id = c.course_id AND c.course_id BETWEEN :lo AND :hi
+    """), params)
+    # Keep serial/identity sequences ahead of the explicit ids
+    for table, column in TABLE_IDS.items():
+        await conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), max({column})) FROM {table}"
+        ))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=count, default=count("100k"))
+    parser.add_argument("--courses", type=count, default=count("5k"))
+    parser.add_argument("--enrollments-per-student", type=float, default=3.0)
+    parser.add_argument("--instructors", type=count, default=None, help="default: courses / 10")
+    parser.add_argument("--universities", type=count, default=50)
+    parser.add_argument("--programs", type=count, default=40)
+    parser.add_argument("--textbooks", type=count, default=None, help="default: courses / 5")
+    parser.add_argument("--topics", type=count, default=200)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of course popularity")
+    parser.add_argument("--graded", type=float, default=0.75, help="share of approved enrollments with a score")
+    parser.add_argument("--audit", type=float, default=0.1, help="share of graded enrollments with audit history")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    args.instructors = args.instructors or max(5, args.courses // 10)
+    args.textbooks = args.textbooks or max(1, args.courses // 5)
+
+    print("=" * 60)
+    print(f" Generating data (seed {args.seed})")
+    print("=" * 60)
+    start = time.perf_counter()
+
+    async with engine.begin() as conn:
+        base = {}
+        for table, column in TABLE_IDS.items():
+            base[table] = (await conn.execute(text(f"SELECT coalesce(max({column}), 0) FROM {table}"))).scalar_one()
+        gen = Generator(args, base)
+
+        for table in LOADED_TABLES:
+            await conn.execute(text(f"ALTER TABLE {table} DISABLE TRIGGER USER"))
+
+        pg = (await conn.get_raw_connection()).driver_connection
+        loads = [
+            ("university", ["university_id", "name", "country"], gen.universities()),
+            ("program", ["program_id", "program_name", "program_type", "duration_weeks_or_months"], gen.programs()),
+            ("textbook", ["textbook_id", "title", "isbn", "url"], gen.textbooks()),
+            ("topic", ["topic_id", "topic_name"], gen.topics()),
+            ("instructor", ["instructor_id", "full_name", "email", "teaching_years", "user_id"], gen.instructors()),
+            ("course", ["course_id", "course_name", "duration_weeks", "university_id", "program_id",
+                        "textbook_id", "max_capacity", "current_enrollment"], gen.courses()),
+            ("course_topic", ["course_id", "topic_id"], gen.course_topics()),
+            ("teaching_assignment", ["instructor_id", "course_id", "role"], gen.teaching_assignments()),
+            ("student", ["student_id", "full_name", "age", "country", "category", "skill_level", "email"],
+             gen.students()),
+            ("enrollment", ["student_id", "course_id", "enroll_date", "evaluation_score", "status"],
+             gen.enrollment_rows()),
+            # Filled while the enrollments were generated
+            ("audit_log", ["student_id", "course_id", "old_score", "new_score", "changed_by", "changed_at"],
+             None),
+        ]
+        for table, columns, rows in loads:
+            t = time.perf_counter()
+            copied = await copy_rows(pg, table, columns, iter(gen.audit_rows) if rows is None else rows)
+            print(f"  {table:<22}{copied:>12,} rows  {time.perf_counter() - t:>7.1f}s")
+
+        t = time.perf_counter()
+        await rebuild_derived(conn, gen)
+        for table in LOADED_TABLES:
+            await conn.execute(text(f"ALTER TABLE {table} ENABLE TRIGGER USER"))
+        print(f"  {'derived data':<22}{'':>12}       {time.perf_counter() - t:>7.1f}s")
+
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in LOADED_TABLES:
+            await conn.execute(text(f"ANALYZE {table}"))
+    loaded = time.perf_counter() - start
+    timings = await refresh_analytics_views(engine)
+    await engine.dispose()
+
+    print("-" * 60)
+    print(f"  {gen.enrollments:,} enrollments loaded in {loaded:.1f}s")
+    print(f"  analytics views refreshed in {sum(ms or 0 for ms in timings.values()) / 1000:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
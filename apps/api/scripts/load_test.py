@@ -0,0 +1,346 @@
+"""
+Load test: virtual users replay the main user journeys against the API and
+report per-route throughput, latency percentiles, error rate and database
+statements per request (from the X-DB-Query-Count and Server-Timing headers
+that instrumentation.py adds to every response).
+
+Scenarios (--mix picks them by weight):
+  student     log in, browse /student/courses, enroll, poll /student/enrollments/me
+  instructor  list courses, approve a pending application, grade a student
+  analyst     dashboard fan-out: every /analytics aggregate and two reports at once
+
+By default the app runs in-process (httpx.ASGITransport, no network, no
+background loops); --url targets a running server instead. Student accounts
+are registered for each run (loadtest-<run>-<n>@example.test) and enrollments
+really commit, so point it at a development database, e.g. one filled by
+scripts/generate_data.py. Instructor and analyst logins default to the
+seed_data.py accounts.
+
+Results can be written as JSON (--out) and compared with an earlier run
+(--compare): a route regresses when its p95 latency or statements per
+request grow by more than --threshold, or its error rate grows. The exit
+status is 1 on regression.
+
+Run from: apps/api/
+Command:  python scripts/load_test.py [--duration 30] [--users 20] [--mix student=8,instructor=1,analyst=1]
+          [--url http://localhost:8000] [--out results.json] [--compare baseline.json --threshold 0.1]
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import subprocess
+import sys
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+ANALYST_DASHBOARD = [
+    "/analytics/stats", "/analytics/most-popular-course", "/analytics/enrollments-per-course",
+    "/analytics/avg-score-by-course", "/analytics/courses-by-university", "/analytics/students-by-country",
+    "/analytics/skill-level-distribution", "/analytics/top-courses", "/reports/topic-trends",
+    "/reports/module-analytics",
+]
+SEARCH_TERMS = ["data", "learning", "intro", "python", "systems", "advanced"]
+
+_DB_TIMING_RE = re.compile(r"\bdb;dur=([\d.]+)")
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    """Per-route samples: (latency ms, status, db statements, db ms)."""
+
+    def __init__(self):
+        self.samples: dict[str, list[tuple]] = defaultdict(list)
+        self.failures: dict[str, int] = defaultdict(int)
+
+    def add(self, route: str, latency_ms: float, response: httpx.Response, expected: tuple):
+        count = response.headers.get("X-DB-Query-Count")
+        timing = _DB_TIMING_RE.search(response.headers.get("Server-Timing", ""))
+        self.samples[route].append((
+            latency_ms, response.status_code,
+            int(count) if count is not None else None,
+            float(timing.group(1)) if timing else None,
+        ))
+        if response.status_code not in expected:
+            self.failures[route] += 1
+
+    def error(self, route: str, latency_ms: float):
+        """Transport error: no response at all."""
+        self.samples[route].append((latency_ms, 0, None, None))
+        self.failures[route] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            latencies = sorted(s[0] for s in samples)
+            counts = [s[2] for s in samples if s[2] is not None]
+            db_ms = [s[3] for s in samples if s[3] is not None]
+            routes[route] = {
+                "requests": len(samples),
+                "rps": round(len(samples) / elapsed, 2),
+                "error_rate": round(self.failures[route] / len(samples), 4),
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "db_statements": round(sum(counts) / len(counts), 2) if counts else None,
+                "db_ms": round(sum(db_ms) / len(db_ms), 2) if db_ms else None,
+                "statuses": {str(code): n for code, n in sorted(Counter(s[1] for s in samples).items())},
+            }
+        total = sum(r["requests"] for r in routes.values())
+        return {
+            "requests": total,
+            "rps": round(total / elapsed, 2),
+            "error_rate": round(sum(self.failures.values()) / total, 4) if total else 0.0,
+            "routes": routes,
+        }
+
+
+class Session:
+    """One virtual user's client: every call is timed and recorded under its route template."""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder):
+        self.client = client
+        self.recorder = recorder
+        self.headers: dict[str, str] = {}
+
+    async def call(self, method: str, route: str, path: str = None, expected: tuple = (200,), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path or route, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.error(f"{method} {route}", (time.perf_counter() - start) * 1000)
+            return None
+        self.recorder.add(f"{method} {route}", (time.perf_counter() - start) * 1000, response, expected)
+        return response
+
+    async def login(self, email: str, password: str) -> bool:
+        response = await self.call("POST", "/auth/login", json={"email": email, "password": password})
+        if response is None or response.status_code != 200:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+
+# ── Scenarios ────────────────────────────────────────────────────
+
+async def student_journey(s: Session, rng: random.Random, account: tuple, think: float):
+    if not await s.login(*account):
+        return
+    params = {"limit": 20}
+    if rng.random() < 0.5:
+        params["query"] = rng.choice(SEARCH_TERMS)
+    page = await s.call("GET", "/student/courses", params=params)
+    courses = page.json() if page is not None and page.status_code == 200 else []
+    await asyncio.sleep(think)
+    if courses:
+        course_id = rng.choice(courses)["course_id"]
+        # Already enrolled and full course are normal outcomes under load
+        enrolled = await s.call("POST", "/student/enrollments", json={"course_id": course_id}, expected=(200, 400))
+        if enrolled is not None and enrolled.status_code == 200:
+            # The detail page is 403 until the student has applied
+            await s.call("GET", "/student/courses/{course_id}", f"/student/courses/{course_id}")
+    for _ in range(3):
+        await asyncio.sleep(think)
+        await s.call("GET", "/student/enrollments/me")
+
+
+async def instructor_journey(s: Session, rng: random.Random, account: tuple, think: float):
+    if not await s.login(*account):
+        return
+    response = await s.call("GET", "/instructor/courses")
+    courses = response.json() if response is not None and response.status_code == 200 else []
+    if not courses:
+        return
+    course_id = rng.choice(courses)["course_id"]
+    await asyncio.sleep(think)
+    applications = await s.call("GET", "/instructor/courses/{course_id}/applications",
+                                f"/instructor/courses/{course_id}/applications")
+    pending = applications.json() if applications is not None and applications.status_code == 200 else []
+    if pending:
+        # 404/409: another virtual user got there first, or the course filled up
+        await s.call("POST", "/instructor/courses/{course_id}/applications/approve",
+                     f"/instructor/courses/{course_id}/applications/approve",
+                     json={"student_id": rng.choice(pending)["student_id"]}, expected=(200, 404, 409))
+    students = await s.call("GET", "/instructor/courses/{course_id}/students",
+                            f"/instructor/courses/{course_id}/students")
+    roster = students.json() if students is not None and students.status_code == 200 else []
+    if roster:
+        await asyncio.sleep(think)
+        student_id = rng.choice(roster)["student_id"]
+        await s.call("PATCH", "/instructor/courses/{course_id}/students/{student_id}/grade",
+                     f"/instructor/courses/{course_id}/students/{student_id}/grade",
+                     json={"evaluation_score": rng.randint(30, 100)})
+
+
+async def analyst_journey(s: Session, rng: random.Random, account: tuple, think: float):
+    if not await s.login(*account):
+        return
+    # The dashboard loads its panels in parallel
+    await asyncio.gather(*(s.call("GET", path) for path in ANALYST_DASHBOARD))
+    await asyncio.sleep(think)
+
+
+SCENARIOS = {"student": student_journey, "instructor": instructor_journey, "analyst": analyst_journey}
+
+
+# ── Runner ───────────────────────────────────────────────────────
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def account(value: str) -> tuple[str, str]:
+    email, sep, password = value.partition(":")
+    if not sep:
+        raise argparse.ArgumentTypeError("expected email:password")
+    return email, password
+
+
+def make_client(url: str | None) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=30.0, limits=limits)
+    from main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                             timeout=30.0, limits=limits)
+
+
+async def register_students(client: httpx.AsyncClient, n: int, run_id: str) -> list[tuple[str, str]]:
+    accounts = []
+    for i in range(n):
+        email, password = f"loadtest-{run_id}-{i}@example.test", "loadtest123"
+        response = await client.post("/auth/register/student", json={
+            "full_name": f"Load Test {i}", "email": email, "age": 21, "country": "India", "password": password,
+        })
+        if response.status_code != 200:
+            sys.exit(f"Registering {email} failed: {response.status_code} {response.text}")
+        accounts.append((email, password))
+    return accounts
+
+
+async def virtual_user(n: int, client, recorder: Recorder, args, students: list, deadline: float):
+    rng = random.Random(args.seed * 1_000_003 + n)
+    names, weights = list(args.mix), list(args.mix.values())
+    accounts = {"student": students[n % len(students)], "instructor": args.instructor, "analyst": args.analyst}
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(names, weights=weights)[0]
+        await SCENARIOS[scenario](Session(client, recorder), rng, accounts[scenario], args.think)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Routes whose p95, statements per request or error rate got worse than ``baseline``."""
+    regressions = []
+    for route, now in current["routes"].items():
+        before = baseline["routes"].get(route)
+        if before is None:
+            continue
+        if before["p95_ms"] and now["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{route}: p95 {before['p95_ms']} -> {now['p95_ms']} ms")
+        if before["db_statements"] is not None and now["db_statements"] is not None \
+                and now["db_statements"] > before["db_statements"] * (1 + threshold):
+            regressions.append(f"{route}: statements/request {before['db_statements']} -> {now['db_statements']}")
+        if now["error_rate"] > before["error_rate"]:
+            regressions.append(f"{route}: error rate {before['error_rate']:.2%} -> {now['error_rate']:.2%}")
+    return regressions
+
+
+def print_summary(result: dict):
+    print(f"\n  {'route':<62}{'req':>7}{'rps':>8}{'err%':>7}{'p50':>8}{'p95':>8}{'p99':>8}{'stmts':>7}")
+    for route, r in result["routes"].items():
+        stmts = "-" if r["db_statements"] is None else f"{r['db_statements']:.1f}"
+        print(f"  {route[:61]:<62}{r['requests']:>7}{r['rps']:>8.1f}{r['error_rate'] * 100:>7.1f}"
+              f"{r['p50_ms']:>8.1f}{r['p95_ms']:>8.1f}{r['p99_ms']:>8.1f}{stmts:>7}")
+    print("-" * 115)
+    print(f"  {result['requests']:,} requests, {result['rps']:.1f} req/s, {result['error_rate']:.2%} errors")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target a running server instead of the in-process app")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--students", type=int, default=None, help="student accounts to register (default: --users)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("student=8,instructor=1,analyst=1"))
+    parser.add_argument("--think", type=float, default=0.0, help="pause between steps, seconds")
+    parser.add_argument("--instructor", type=account, default=account("andrew.ng@stanford.edu:instructor123"))
+    parser.add_argument("--analyst", type=account, default=account("admin@iitkgp.ac.in:admin123"))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression")
+    args = parser.parse_args()
+
+    recorder = Recorder()
+    async with make_client(args.url) as client:
+        run_id = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        students = await register_students(client, args.students or args.users, run_id)
+
+        print("=" * 115)
+        print(f" Load test: {args.users} users for {args.duration:.0f}s against {args.url or 'in-process app'}")
+        print(f" Mix: {', '.join(f'{k}={v:g}' for k, v in args.mix.items())}")
+        print("=" * 115)
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            virtual_user(n, client, recorder, args, students, deadline) for n in range(args.users)
+        ))
+        elapsed = time.perf_counter() - start
+
+    result = {
+        "commit": git_commit(),
+        "started_at": run_id,
+        "target": args.url or "in-process",
+        "users": args.users,
+        "duration_s": round(elapsed, 1),
+        "mix": args.mix,
+        **recorder.summary(elapsed),
+    }
+    print_summary(result)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"  results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        print(f"\n  Compared with {args.compare} ({baseline.get('commit') or 'unknown commit'}), "
+              f"threshold {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"    REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("    no regressions")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
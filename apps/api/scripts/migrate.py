@@ -0,0 +1,27 @@
+"""
+Apply pending SQL migrations from sql/migrations.
+
+Run from: apps/api/
+Command:  python scripts/migrate.py
+"""
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from migrations import apply_migrations
+
+
+async def main():
+    print("=" * 60)
+    print(" DBMS Lab -- SQL migrations")
+    print("=" * 60)
+    applied = await apply_migrations(engine)
+    print(f"\n  {len(applied)} migration(s) applied")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
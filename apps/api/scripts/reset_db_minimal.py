@@ -5,10 +5,12 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import bcrypt
 from sqlalchemy import text
 from database import engine, AsyncSessionLocal, Base
 from models import AppUser
+from passwords import hash_password_sync
+from migrations import apply_migrations
+from analytics_views import ANALYTICS_VIEWS
 
 async def main():
     print("=" * 60)
@@ -17,38 +19,23 @@ async def main():
 
     print("1. Dropping all tables...")
     async with engine.begin() as conn:
+        # Views built on the ORM tables would block drop_all
+        for view in ANALYTICS_VIEWS:
+            await conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {view}"))
+        await conn.execute(text("DROP TABLE IF EXISTS analytics_refresh"))
+        await conn.execute(text("DROP VIEW IF EXISTS v_course_stats_recomputed"))
         await conn.run_sync(Base.metadata.drop_all)
+        await conn.execute(text("DROP TABLE IF EXISTS schema_migration"))
         await conn.run_sync(Base.metadata.create_all)
     print("   Tables recreated.")
     
-    print("   Creating Trigger for Enrollment Count...")
-    async with engine.begin() as conn:
-        await conn.execute(text("""
-        CREATE OR REPLACE FUNCTION fn_update_enrollment_count()
-        RETURNS TRIGGER AS $$
-        BEGIN
-            IF TG_OP = 'INSERT' THEN
-                UPDATE course SET current_enrollment = current_enrollment + 1
-                WHERE course_id = NEW.course_id;
-            ELSIF TG_OP = 'DELETE' THEN
-                UPDATE course SET current_enrollment = current_enrollment - 1
-                WHERE course_id = OLD.course_id;
-            END IF;
-            RETURN NULL;
-        END;
-        $$ LANGUAGE plpgsql;
-        """))
-        await conn.execute(text("""
-        CREATE TRIGGER trg_auto_enrollment_count
-        AFTER INSERT OR DELETE ON enrollment
-        FOR EACH ROW EXECUTE FUNCTION fn_update_enrollment_count();
-        """))
-    print("   Trigger created.")
+    print("   Applying SQL migrations...")
+    await apply_migrations(engine)
 
 
     print("2. Creating ONLY Admin user...")
     async with AsyncSessionLocal() as session:
-        pwd_hash = bcrypt.hashpw("admin123".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        pwd_hash = hash_password_sync("admin123")
         admin = AppUser(
             email="admin@iitkgp.ac.in",
             password_hash=pwd_hash,
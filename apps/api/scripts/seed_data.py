@@ -11,18 +11,15 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import bcrypt
 from sqlalchemy import text, select
 from database import engine, AsyncSessionLocal, Base
 from models import AppUser, Instructor, Student, ContentItem, Course
+from passwords import hash_password_sync
+from migrations import apply_migrations
 
 
-def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-
-INSTRUCTOR_PWD = hash_password("instructor123")
-STUDENT_PWD = hash_password("student123")
+INSTRUCTOR_PWD = hash_password_sync("instructor123")
+STUDENT_PWD = hash_password_sync("student123")
 
 # Instructor data: (full_name, email)
 INSTRUCTOR_DATA = [
@@ -228,7 +225,7 @@ async def update_enrollment_counts(session):
     print("\n-- 8. Enrollment counts --")
     await session.execute(text(
         "UPDATE course c SET current_enrollment = "
-        "(SELECT COUNT(*) FROM enrollment e WHERE e.course_id = c.course_id)"
+        "(SELECT COUNT(*) FROM enrollment e WHERE e.course_id = c.course_id AND e.status IN ('pending', 'approved'))"
     ))
     await session.commit()
     print("  Synced OK")
@@ -291,26 +288,9 @@ async def create_triggers(session):
             AFTER UPDATE OF evaluation_score ON enrollment
             FOR EACH ROW EXECUTE FUNCTION fn_audit_grade_change();
         """))
-        await session.execute(text("""
-            CREATE OR REPLACE FUNCTION fn_auto_update_enrollment_count()
-            RETURNS TRIGGER AS $$
-            BEGIN
-                IF TG_OP = 'INSERT' THEN
-                    UPDATE course SET current_enrollment = current_enrollment + 1 WHERE course_id = NEW.course_id;
-                ELSIF TG_OP = 'DELETE' THEN
-                    UPDATE course SET current_enrollment = current_enrollment - 1 WHERE course_id = OLD.course_id;
-                END IF;
-                RETURN NULL;
-            END; $$ LANGUAGE plpgsql;
-        """))
-        await session.execute(text("DROP TRIGGER IF EXISTS trg_auto_enrollment_count ON enrollment"))
-        await session.execute(text("""
-            CREATE TRIGGER trg_auto_enrollment_count
-            AFTER INSERT OR DELETE ON enrollment
-            FOR EACH ROW EXECUTE FUNCTION fn_auto_update_enrollment_count();
-        """))
         await session.commit()
-        print("  Audit + enrollment triggers OK")
+        # Seat counting for enrollment lives in sql/migrations/005_enrollment_seats.sql
+        print("  Audit trigger OK")
     except Exception as e:
         print(f"  Note: {e}")
         await session.rollback()
@@ -331,6 +311,11 @@ async def create_indexes(session):
     await session.commit()
 
 
+async def run_migrations():
+    print("\n-- 12. SQL migrations --")
+    await apply_migrations(engine)
+
+
 async def verify(session):
     print("\n" + "=" * 60)
     print(" VERIFICATION")
@@ -411,6 +396,7 @@ async def main():
         await seed_content_items(session)
         await create_triggers(session)
         await create_indexes(session)
+        await run_migrations()
         await verify(session)
     
     print("=" * 60)
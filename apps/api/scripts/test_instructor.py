@@ -66,7 +66,7 @@ if r.status_code == 200:
 else:
     print(f"[FAIL] GET /courses/{cid}/audit-log -> {r.status_code} {r.text}")
 
-# 9. POST /instructor/courses/{id}/safe-enroll (Pessimistic Lock)
+# 9. POST /instructor/courses/{id}/safe-enroll (Atomic seat reservation)
 # Find a student not enrolled in a different course
 r2 = requests.get(f"{API}/instructor/courses", headers=H)
 all_courses = r2.json()
@@ -0,0 +1,55 @@
+"""Course catalog search (backed by sql/migrations/001_course_search.sql).
+
+Modes:
+  (default)  substring match on course name, ILIKE '%q%' served by the trigram index
+  prefix     type-ahead: every word is a prefix of a word in the course document
+  fuzzy      trigram similarity on the course name, tolerant of typos
+  fulltext   web-search syntax over course, university, program and topic names
+Ranked modes order by relevance, best first.
+"""
+import re
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.sql import Select
+
+from models import Course
+
+SEARCH_MODES = ("prefix", "fuzzy", "fulltext")
+SEARCH_MODE_PATTERN = "^(" + "|".join(SEARCH_MODES) + ")$"
+
+# Must match the text search config used by fn_course_search_document()
+TS_CONFIG = "simple"
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def prefix_tsquery(query: str) -> Optional[str]:
+    """'deep lea' -> 'deep:* & lea:*' (None if the query has no word characters)."""
+    words = _WORD_RE.findall(query)
+    if not words:
+        return None
+    return " & ".join(f"{w}:*" for w in words)
+
+
+def apply_course_search(stmt: Select, query: str, mode: Optional[str] = None):
+    """Add the search predicate for ``mode`` to a Course select.
+
+    Returns ``(stmt, rank)`` where ``rank`` is a relevance expression to order
+    by, or None for the unranked substring mode.
+    """
+    if mode == "fulltext":
+        tsq = func.websearch_to_tsquery(TS_CONFIG, query)
+        return stmt.where(Course.search_vector.op("@@")(tsq)), func.ts_rank_cd(Course.search_vector, tsq)
+
+    if mode == "prefix":
+        expr = prefix_tsquery(query)
+        if expr is not None:
+            tsq = func.to_tsquery(TS_CONFIG, expr)
+            return stmt.where(Course.search_vector.op("@@")(tsq)), func.ts_rank_cd(Course.search_vector, tsq)
+        # Nothing searchable (e.g. only punctuation): fall back to substring
+
+    if mode == "fuzzy":
+        return stmt.where(Course.course_name.op("%")(query)), func.similarity(Course.course_name, query)
+
+    return stmt.where(Course.course_name.ilike(f"%{query}%")), None
@@ -0,0 +1,110 @@
+-- Course catalog search: pg_trgm indexes for ILIKE / fuzzy matching and a
+-- trigger-maintained tsvector over course, university, program and topic names.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Replace the btree "placeholder" with a real trigram index
+DROP INDEX IF EXISTS idx_course_name_trgm;
+CREATE INDEX IF NOT EXISTS idx_course_name_trgm ON course USING gin (course_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_university_name_trgm ON university USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_topic_name_trgm ON topic USING gin (topic_name gin_trgm_ops);
+
+ALTER TABLE course ADD COLUMN IF NOT EXISTS search_vector tsvector;
+CREATE INDEX IF NOT EXISTS idx_course_search_vector ON course USING gin (search_vector);
+
+-- Weighted document: course name (A), university and topics (B), program (C).
+-- 'simple' config: these are names, so no stemming and prefix queries behave.
+CREATE OR REPLACE FUNCTION fn_course_search_document(
+    p_course_id int, p_course_name text, p_university_id int, p_program_id int
+) RETURNS tsvector AS $$
+    SELECT setweight(to_tsvector('simple', coalesce(p_course_name, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(
+               (SELECT name FROM university WHERE university_id = p_university_id), '')), 'B')
+        || setweight(to_tsvector('simple', coalesce(
+               (SELECT string_agg(t.topic_name, ' ')
+                  FROM course_topic ct JOIN topic t ON t.topic_id = ct.topic_id
+                 WHERE ct.course_id = p_course_id), '')), 'B')
+        || setweight(to_tsvector('simple', coalesce(
+               (SELECT program_name FROM program WHERE program_id = p_program_id), '')), 'C');
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION fn_course_search_vector() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector := fn_course_search_document(
+        NEW.course_id, NEW.course_name, NEW.university_id, NEW.program_id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_course_search_vector ON course;
+CREATE TRIGGER trg_course_search_vector
+BEFORE INSERT OR UPDATE OF course_name, university_id, program_id ON course
+FOR EACH ROW EXECUTE FUNCTION fn_course_search_vector();
+
+-- Recompute the document of courses whose related names changed
+CREATE OR REPLACE FUNCTION fn_refresh_course_search(p_course_ids int[]) RETURNS void AS $$
+    UPDATE course c
+       SET search_vector = fn_course_search_document(c.course_id, c.course_name, c.university_id, c.program_id)
+     WHERE c.course_id = ANY(p_course_ids);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION fn_course_topic_search() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM fn_refresh_course_search(ARRAY[NEW.course_id]);
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        PERFORM fn_refresh_course_search(ARRAY[OLD.course_id]);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_course_topic_search ON course_topic;
+CREATE TRIGGER trg_course_topic_search
+AFTER INSERT OR UPDATE OR DELETE ON course_topic
+FOR EACH ROW EXECUTE FUNCTION fn_course_topic_search();
+
+CREATE OR REPLACE FUNCTION fn_topic_name_search() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM fn_refresh_course_search(
+        ARRAY(SELECT course_id FROM course_topic WHERE topic_id = NEW.topic_id));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_topic_name_search ON topic;
+CREATE TRIGGER trg_topic_name_search
+AFTER UPDATE OF topic_name ON topic
+FOR EACH ROW EXECUTE FUNCTION fn_topic_name_search();
+
+CREATE OR REPLACE FUNCTION fn_university_name_search() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM fn_refresh_course_search(
+        ARRAY(SELECT course_id FROM course WHERE university_id = NEW.university_id));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_university_name_search ON university;
+CREATE TRIGGER trg_university_name_search
+AFTER UPDATE OF name ON university
+FOR EACH ROW EXECUTE FUNCTION fn_university_name_search();
+
+CREATE OR REPLACE FUNCTION fn_program_name_search() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM fn_refresh_course_search(
+        ARRAY(SELECT course_id FROM course WHERE program_id = NEW.program_id));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_program_name_search ON program;
+CREATE TRIGGER trg_program_name_search
+AFTER UPDATE OF program_name ON program
+FOR EACH ROW EXECUTE FUNCTION fn_program_name_search();
+
+-- Backfill existing rows
+SELECT fn_refresh_course_search(ARRAY(SELECT course_id FROM course));
+
+ANALYZE course;
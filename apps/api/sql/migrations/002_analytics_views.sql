@@ -0,0 +1,56 @@
+-- Materialized views behind the /analytics router. Refreshed CONCURRENTLY by
+-- analytics_views.refresh_analytics_views(); each needs a unique index for that.
+-- Column lists must stay in sync with the live queries in analytics_views.py.
+
+CREATE TABLE IF NOT EXISTS analytics_refresh (
+    view_name    varchar(63) PRIMARY KEY,
+    refreshed_at timestamptz NOT NULL DEFAULT now(),
+    duration_ms  integer
+);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_analytics_overview AS
+SELECT 1 AS id,
+       (SELECT count(*) FROM course)  AS total_courses,
+       (SELECT count(*) FROM student) AS total_students,
+       (SELECT count(*) FROM enrollment) AS total_enrollments,
+       (SELECT avg(evaluation_score) FROM enrollment WHERE evaluation_score IS NOT NULL) AS average_score;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_analytics_overview ON mv_analytics_overview (id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_course_enrollment AS
+SELECT c.course_id,
+       c.course_name,
+       c.university_id,
+       count(e.student_id)       AS enrollments,
+       count(e.evaluation_score) AS graded,
+       avg(e.evaluation_score)   AS avg_score
+  FROM course c
+  LEFT JOIN enrollment e ON e.course_id = c.course_id
+ GROUP BY c.course_id;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_course_enrollment ON mv_course_enrollment (course_id);
+CREATE INDEX IF NOT EXISTS idx_mv_course_enrollment_rank ON mv_course_enrollment (enrollments DESC, course_id);
+CREATE INDEX IF NOT EXISTS idx_mv_course_enrollment_score ON mv_course_enrollment (avg_score DESC) WHERE graded > 0;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_courses_by_university AS
+SELECT u.university_id, u.name AS university, count(c.course_id) AS course_count
+  FROM university u
+  JOIN course c ON c.university_id = u.university_id
+ GROUP BY u.university_id;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_courses_by_university ON mv_courses_by_university (university_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_students_by_country AS
+SELECT country, count(*) AS student_count
+  FROM student
+ GROUP BY country;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_students_by_country ON mv_students_by_country (country);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_skill_level_distribution AS
+SELECT skill_level, count(*) AS student_count
+  FROM student
+ WHERE skill_level IS NOT NULL
+ GROUP BY skill_level;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_skill_level_distribution ON mv_skill_level_distribution (skill_level);
+
+INSERT INTO analytics_refresh (view_name)
+VALUES ('mv_analytics_overview'), ('mv_course_enrollment'), ('mv_courses_by_university'),
+       ('mv_students_by_country'), ('mv_skill_level_distribution')
+ON CONFLICT (view_name) DO UPDATE SET refreshed_at = now();
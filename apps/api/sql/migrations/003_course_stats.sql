@@ -0,0 +1,125 @@
+-- Per-course enrollment and score aggregates, maintained by triggers on enrollment.
+-- Score columns cover approved enrollments only (what instructors grade and see).
+-- v_course_stats_recomputed is the from-scratch definition: used for the backfill
+-- and by course_stats.check_course_stats() to detect drift.
+
+CREATE TABLE IF NOT EXISTS course_stats (
+    course_id      integer PRIMARY KEY REFERENCES course (course_id) ON DELETE CASCADE,
+    approved_count integer NOT NULL DEFAULT 0,
+    pending_count  integer NOT NULL DEFAULT 0,
+    rejected_count integer NOT NULL DEFAULT 0,
+    score_sum      bigint  NOT NULL DEFAULT 0,
+    score_count    integer NOT NULL DEFAULT 0,
+    pass_count     integer NOT NULL DEFAULT 0,
+    bucket_0_20    integer NOT NULL DEFAULT 0,
+    bucket_21_40   integer NOT NULL DEFAULT 0,
+    bucket_41_60   integer NOT NULL DEFAULT 0,
+    bucket_61_80   integer NOT NULL DEFAULT 0,
+    bucket_81_100  integer NOT NULL DEFAULT 0,
+    updated_at     timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE VIEW v_course_stats_recomputed AS
+SELECT c.course_id,
+       count(*) FILTER (WHERE e.status = 'approved')::int AS approved_count,
+       count(*) FILTER (WHERE e.status = 'pending')::int  AS pending_count,
+       count(*) FILTER (WHERE e.status = 'rejected')::int AS rejected_count,
+       coalesce(sum(e.evaluation_score) FILTER (WHERE e.status = 'approved'), 0)::bigint AS score_sum,
+       count(e.evaluation_score) FILTER (WHERE e.status = 'approved')::int AS score_count,
+       count(*) FILTER (WHERE e.status = 'approved' AND e.evaluation_score >= 40)::int AS pass_count,
+       count(*) FILTER (WHERE e.status = 'approved' AND e.evaluation_score BETWEEN 0 AND 20)::int   AS bucket_0_20,
+       count(*) FILTER (WHERE e.status = 'approved' AND e.evaluation_score BETWEEN 21 AND 40)::int  AS bucket_21_40,
+       count(*) FILTER (WHERE e.status = 'approved' AND e.evaluation_score BETWEEN 41 AND 60)::int  AS bucket_41_60,
+       count(*) FILTER (WHERE e.status = 'approved' AND e.evaluation_score BETWEEN 61 AND 80)::int  AS bucket_61_80,
+       count(*) FILTER (WHERE e.status = 'approved' AND e.evaluation_score BETWEEN 81 AND 100)::int AS bucket_81_100
+  FROM course c
+  LEFT JOIN enrollment e ON e.course_id = c.course_id
+ GROUP BY c.course_id;
+
+-- Add (p_sign = 1) or remove (p_sign = -1) one enrollment row's contribution.
+-- No-op when the course itself is gone (enrollments deleted by ON DELETE CASCADE).
+CREATE OR REPLACE FUNCTION fn_course_stats_apply(
+    p_course_id int, p_status text, p_score int, p_sign int
+) RETURNS void AS $$
+    INSERT INTO course_stats AS cs (
+        course_id, approved_count, pending_count, rejected_count, score_sum, score_count,
+        pass_count, bucket_0_20, bucket_21_40, bucket_41_60, bucket_61_80, bucket_81_100)
+    SELECT p_course_id,
+           CASE WHEN p_status = 'approved' THEN p_sign ELSE 0 END,
+           CASE WHEN p_status = 'pending'  THEN p_sign ELSE 0 END,
+           CASE WHEN p_status = 'rejected' THEN p_sign ELSE 0 END,
+           CASE WHEN p_status = 'approved' THEN p_sign * coalesce(p_score, 0) ELSE 0 END,
+           CASE WHEN p_status = 'approved' AND p_score IS NOT NULL THEN p_sign ELSE 0 END,
+           CASE WHEN p_status = 'approved' AND p_score >= 40 THEN p_sign ELSE 0 END,
+           CASE WHEN p_status = 'approved' AND p_score BETWEEN 0 AND 20   THEN p_sign ELSE 0 END,
+           CASE WHEN p_status = 'approved' AND p_score BETWEEN 21 AND 40  THEN p_sign ELSE 0 END,
+           CASE WHEN p_status = 'approved' AND p_score BETWEEN 41 AND 60  THEN p_sign ELSE 0 END,
+           CASE WHEN p_status = 'approved' AND p_score BETWEEN 61 AND 80  THEN p_sign ELSE 0 END,
+           CASE WHEN p_status = 'approved' AND p_score BETWEEN 81 AND 100 THEN p_sign ELSE 0 END
+     WHERE EXISTS (SELECT 1 FROM course WHERE course_id = p_course_id)
+    ON CONFLICT (course_id) DO UPDATE SET
+        approved_count = cs.approved_count + excluded.approved_count,
+        pending_count  = cs.pending_count  + excluded.pending_count,
+        rejected_count = cs.rejected_count + excluded.rejected_count,
+        score_sum      = cs.score_sum      + excluded.score_sum,
+        score_count    = cs.score_count    + excluded.score_count,
+        pass_count     = cs.pass_count     + excluded.pass_count,
+        bucket_0_20    = cs.bucket_0_20    + excluded.bucket_0_20,
+        bucket_21_40   = cs.bucket_21_40   + excluded.bucket_21_40,
+        bucket_41_60   = cs.bucket_41_60   + excluded.bucket_41_60,
+        bucket_61_80   = cs.bucket_61_80   + excluded.bucket_61_80,
+        bucket_81_100  = cs.bucket_81_100  + excluded.bucket_81_100,
+        updated_at     = now();
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION fn_course_stats_enrollment() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM fn_course_stats_apply(OLD.course_id, OLD.status, OLD.evaluation_score, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM fn_course_stats_apply(NEW.course_id, NEW.status, NEW.evaluation_score, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_course_stats_enrollment ON enrollment;
+CREATE TRIGGER trg_course_stats_enrollment
+AFTER INSERT OR DELETE OR UPDATE OF course_id, status, evaluation_score ON enrollment
+FOR EACH ROW EXECUTE FUNCTION fn_course_stats_enrollment();
+
+-- Every course has a row, so readers can inner join
+CREATE OR REPLACE FUNCTION fn_course_stats_course() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO course_stats (course_id) VALUES (NEW.course_id) ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_course_stats_course ON course;
+CREATE TRIGGER trg_course_stats_course
+AFTER INSERT ON course
+FOR EACH ROW EXECUTE FUNCTION fn_course_stats_course();
+
+-- Backfill; block enrollment writes so nothing slips between recompute and trigger
+LOCK TABLE enrollment IN SHARE MODE;
+INSERT INTO course_stats (
+    course_id, approved_count, pending_count, rejected_count, score_sum, score_count,
+    pass_count, bucket_0_20, bucket_21_40, bucket_41_60, bucket_61_80, bucket_81_100)
+SELECT course_id, approved_count, pending_count, rejected_count, score_sum, score_count,
+       pass_count, bucket_0_20, bucket_21_40, bucket_41_60, bucket_61_80, bucket_81_100
+  FROM v_course_stats_recomputed
+ON CONFLICT (course_id) DO UPDATE SET
+    approved_count = excluded.approved_count,
+    pending_count  = excluded.pending_count,
+    rejected_count = excluded.rejected_count,
+    score_sum      = excluded.score_sum,
+    score_count    = excluded.score_count,
+    pass_count     = excluded.pass_count,
+    bucket_0_20    = excluded.bucket_0_20,
+    bucket_21_40   = excluded.bucket_21_40,
+    bucket_41_60   = excluded.bucket_41_60,
+    bucket_61_80   = excluded.bucket_61_80,
+    bucket_81_100  = excluded.bucket_81_100,
+    updated_at     = now();
@@ -0,0 +1,4 @@
+-- Courses with auto_approve set admit new applications as approved while seats
+-- remain, instead of queueing them for the instructor (see applications.py).
+
+ALTER TABLE course ADD COLUMN IF NOT EXISTS auto_approve boolean NOT NULL DEFAULT false;
@@ -0,0 +1,33 @@
+-- Seat accounting for enrollment_engine.py. current_enrollment counts seat-holding
+-- rows (pending + approved). The engine reserves a seat with a conditional
+-- UPDATE ... WHERE current_enrollment < max_capacity in the same statement as the
+-- INSERT, so the old AFTER INSERT counter trigger (a second write to the course
+-- row, plus a FOR UPDATE lock taken earlier by callers) is dropped. Rejecting an
+-- application releases its seat in applications.py; deleting a seat-holding row
+-- releases it here.
+
+DROP TRIGGER IF EXISTS trg_auto_enrollment_count ON enrollment;
+DROP FUNCTION IF EXISTS fn_auto_update_enrollment_count();
+DROP FUNCTION IF EXISTS fn_update_enrollment_count();
+
+CREATE OR REPLACE FUNCTION fn_enrollment_seat_release() RETURNS TRIGGER AS $$
+BEGIN
+    IF OLD.status IN ('pending', 'approved') THEN
+        UPDATE course SET current_enrollment = current_enrollment - 1 WHERE course_id = OLD.course_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_enrollment_seat_release ON enrollment;
+CREATE TRIGGER trg_enrollment_seat_release
+AFTER DELETE ON enrollment
+FOR EACH ROW EXECUTE FUNCTION fn_enrollment_seat_release();
+
+-- Recount: deleting a rejected row used to release its seat a second time
+LOCK TABLE enrollment IN SHARE MODE;
+UPDATE course c
+   SET current_enrollment = (SELECT count(*) FROM enrollment e
+                              WHERE e.course_id = c.course_id AND e.status IN ('pending', 'approved'))
+ WHERE current_enrollment IS DISTINCT FROM (SELECT count(*) FROM enrollment e
+                              WHERE e.course_id = c.course_id AND e.status IN ('pending', 'approved'));
@@ -0,0 +1,13 @@
+-- Waitlists for full courses (waitlist.py). ticket orders the queue; a position
+-- lookup counts the entries ahead of a ticket on ux_waitlist_course_ticket.
+
+CREATE TABLE IF NOT EXISTS waitlist (
+    course_id  integer NOT NULL REFERENCES course (course_id) ON DELETE CASCADE,
+    student_id integer NOT NULL REFERENCES student (student_id) ON DELETE CASCADE,
+    ticket     bigint GENERATED BY DEFAULT AS IDENTITY,
+    joined_at  timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (course_id, student_id)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_waitlist_course_ticket ON waitlist (course_id, ticket);
+CREATE INDEX IF NOT EXISTS idx_waitlist_student ON waitlist (student_id);
@@ -0,0 +1,44 @@
+-- Instructor Performance Index (IPI) per instructor and topic, behind
+-- GET /reports/instructor-performance. IPI = instructor's average score on a
+-- topic / the topic's average across all courses. One pass over
+-- enrollment x course_topic: the topic average is a window over that set,
+-- carried through the per-instructor GROUP BY. Must match
+-- analytics_views._live_instructor_performance().
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_instructor_performance AS
+WITH scored AS (
+    SELECT ct.topic_id, e.course_id, e.evaluation_score,
+           avg(e.evaluation_score) OVER (PARTITION BY ct.topic_id) AS global_avg
+      FROM enrollment e
+      JOIN course_topic ct ON ct.course_id = e.course_id
+),
+per AS (
+    SELECT ta.instructor_id, s.topic_id,
+           avg(s.evaluation_score)   AS instructor_avg,
+           count(s.evaluation_score) AS graded,
+           min(s.global_avg)         AS global_avg
+      FROM scored s
+      JOIN teaching_assignment ta ON ta.course_id = s.course_id
+     GROUP BY ta.instructor_id, s.topic_id
+)
+SELECT per.instructor_id,
+       i.full_name  AS instructor,
+       per.topic_id,
+       t.topic_name AS topic,
+       CAST(round(coalesce(per.instructor_avg, 0), 2) AS double precision) AS instructor_avg,
+       CAST(round(coalesce(per.global_avg, 0), 2) AS double precision)     AS global_topic_avg,
+       CAST(round(CASE WHEN per.global_avg > 0
+                       THEN coalesce(per.instructor_avg, 0) / per.global_avg
+                       ELSE 0 END, 2) AS double precision)                  AS ipi,
+       per.graded
+  FROM per
+  JOIN instructor i ON i.instructor_id = per.instructor_id
+  JOIN topic t ON t.topic_id = per.topic_id;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_instructor_performance
+    ON mv_instructor_performance (instructor_id, topic_id);
+CREATE INDEX IF NOT EXISTS idx_mv_instructor_performance_ipi
+    ON mv_instructor_performance (ipi DESC, instructor_id, topic_id);
+
+INSERT INTO analytics_refresh (view_name)
+VALUES ('mv_instructor_performance')
+ON CONFLICT (view_name) DO UPDATE SET refreshed_at = now();
@@ -4,15 +4,15 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import pytest
 from httpx import AsyncClient, ASGITransport
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from main import app
-from database import get_db, Base, DATABASE_URL
+from database import get_db, Base, DATABASE_URL, build_engine, load_engine_settings
 import asyncio
 from typing import AsyncGenerator, Generator
-from sqlalchemy.pool import NullPool
+from uuid import uuid4
 
-test_engine = create_async_engine(DATABASE_URL, echo=False, poolclass=NullPool)
+test_engine = build_engine(DATABASE_URL, load_engine_settings("test"))
 TestingSessionLocal = sessionmaker(
     bind=test_engine,
     class_=AsyncSession,
@@ -53,3 +53,31 @@ async def client(db_session) -> AsyncGenerator[AsyncClient, None]:
     """
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
         yield ac
+
+@pytest.fixture(scope="function")
+def course_factory(client):
+    """
+    Fixture returning ``await make_course(**fields) -> course_id``, which creates a course
+    via POST /admin/courses from the first seeded university/program/textbook (the test is
+    skipped if any is missing). ``fields`` override the body, e.g. ``max_capacity=1``.
+    """
+    options = {}
+
+    async def make_course(**fields) -> int:
+        r = await client.post("/auth/login", json={"email": "admin@iitkgp.ac.in", "password": "admin123"})
+        admin = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        for kind in ("universities", "programs", "textbooks"):
+            if kind not in options:
+                items = (await client.get(f"/instructor/options/{kind}", headers=admin)).json()
+                if not items:
+                    pytest.skip(f"no {kind} seeded")
+                options[kind] = items[0]["id"]
+        r = await client.post("/admin/courses", headers=admin, json={
+            "course_name": f"Test Course {uuid4().hex[:8]}", "duration_weeks": 8,
+            "university_id": options["universities"], "program_id": options["programs"],
+            "textbook_id": options["textbooks"], **fields,
+        })
+        assert r.status_code == 200
+        return r.json()["course_id"]
+
+    return make_course
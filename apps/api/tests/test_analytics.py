@@ -0,0 +1,110 @@
+"""
+Tests for the materialized analytics layer (staleness headers, ?fresh=true).
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from uuid import uuid4
+
+
+async def _login(client: AsyncClient, email: str, password: str):
+    r = await client.post("/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def _analyst_headers(client: AsyncClient, admin: dict):
+    email = f"analyst_{uuid4().hex[:8]}@example.com"
+    r = await client.post("/admin/users", headers=admin, json={
+        "email": email, "password": "pass1234", "role": "analyst", "full_name": "Test Analyst",
+    })
+    assert r.status_code == 200
+    return await _login(client, email, "pass1234")
+
+
+@pytest.mark.asyncio
+async def test_stats_report_materialized_source_and_age(client: AsyncClient):
+    admin = await _login(client, "admin@iitkgp.ac.in", "admin123")
+    r = await client.get("/analytics/stats", headers=admin)
+    assert r.status_code == 200
+    assert r.headers["x-data-source"] == "materialized"
+    assert int(r.headers["x-data-age-seconds"]) >= 0
+
+
+@pytest.mark.asyncio
+async def test_fresh_is_live_for_admins_only(client: AsyncClient):
+    admin = await _login(client, "admin@iitkgp.ac.in", "admin123")
+    r = await client.get("/analytics/students-by-country", params={"fresh": "true"}, headers=admin)
+    assert r.status_code == 200
+    assert r.headers["x-data-source"] == "live"
+
+    analyst = await _analyst_headers(client, admin)
+    r = await client.get("/analytics/students-by-country", headers=analyst)
+    assert r.status_code == 200
+    r = await client.get("/analytics/students-by-country", params={"fresh": "true"}, headers=analyst)
+    assert r.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_instructor_performance_matches_two_query_ipi(client: AsyncClient, db_session):
+    admin = await _login(client, "admin@iitkgp.ac.in", "admin123")
+    rows, params = [], {"limit": 500}
+    while True:
+        r = await client.get("/reports/instructor-performance", params=params, headers=admin)
+        assert r.status_code == 200
+        assert r.headers["x-data-source"] == "live"
+        rows += r.json()
+        if "x-next-cursor" not in r.headers:
+            break
+        params["cursor"] = r.headers["x-next-cursor"]
+    # Unpaged by default, like the analyst dashboard calls it
+    r = await client.get("/reports/instructor-performance", headers=admin)
+    assert r.json() == rows
+    ipis = [row["ipi"] for row in rows]
+    assert ipis == sorted(ipis, reverse=True)
+
+    # The pre-window-function computation: topic averages, then a Python join
+    topic_avgs = dict((await db_session.execute(text(
+        "SELECT ct.topic_id, avg(e.evaluation_score) FROM enrollment e "
+        "JOIN course_topic ct ON ct.course_id = e.course_id GROUP BY ct.topic_id"
+    ))).all())
+    pairs = (await db_session.execute(text(
+        "SELECT ta.instructor_id, ct.topic_id, avg(e.evaluation_score) FROM teaching_assignment ta "
+        "JOIN enrollment e ON e.course_id = ta.course_id JOIN course_topic ct ON ct.course_id = ta.course_id "
+        "GROUP BY ta.instructor_id, ct.topic_id"
+    ))).all()
+    by_pair = {(row["instructor_id"], row["topic_id"]): row for row in rows}
+    assert len(by_pair) == len(pairs)
+    for instructor_id, topic_id, instructor_avg in pairs:
+        global_avg = topic_avgs.get(topic_id) or 0
+        expected = (instructor_avg or 0) / global_avg if global_avg else Decimal(0)
+        # numeric round() in Postgres rounds halves away from zero
+        assert by_pair[(instructor_id, topic_id)]["ipi"] == float(expected.quantize(Decimal("0.01"), ROUND_HALF_UP))
+
+
+@pytest.mark.asyncio
+async def test_instructor_performance_live_for_analysts_cached_on_request(client: AsyncClient):
+    admin = await _login(client, "admin@iitkgp.ac.in", "admin123")
+    analyst = await _analyst_headers(client, admin)
+    r = await client.get("/reports/instructor-performance", headers=analyst)
+    assert r.status_code == 200
+    assert r.headers["x-data-source"] == "live"
+    r = await client.get("/reports/instructor-performance", params={"cached": "true"}, headers=analyst)
+    assert r.status_code == 200
+    assert r.headers["x-data-source"] == "materialized"
+
+
+@pytest.mark.asyncio
+async def test_projected_page_keeps_staleness_and_paging_headers(client: AsyncClient, course_factory):
+    admin = await _login(client, "admin@iitkgp.ac.in", "admin123")
+    await course_factory()
+    await course_factory()
+    r = await client.get("/analytics/enrollments-per-course", headers=admin, params={
+        "fields": "course_id,count", "limit": 1, "count": "exact", "fresh": "true",
+    })
+    assert r.status_code == 200
+    assert [set(row) for row in r.json()] == [{"course_id", "count"}]
+    assert r.headers["x-data-source"] == "live"
+    assert int(r.headers["x-total-count"]) >= 2
+    assert r.headers["link"].endswith('rel="next"')
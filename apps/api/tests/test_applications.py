@@ -0,0 +1,64 @@
+"""
+Tests for batch approve/reject of pending applications.
+"""
+import pytest
+from httpx import AsyncClient
+from uuid import uuid4
+
+
+async def _login(client: AsyncClient, email: str, password: str):
+    r = await client.post("/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def _apply(client: AsyncClient, course_id: int) -> str:
+    email = f"apply_{uuid4().hex[:8]}@example.com"
+    await client.post("/auth/register/student", json={
+        "email": email, "password": "pass1234", "full_name": "Applying Student",
+        "age": 21, "country": "India", "skill_level": "beginner",
+    })
+    student = await _login(client, email, "pass1234")
+    r = await client.post("/student/enrollments", json={"course_id": course_id}, headers=student)
+    assert r.status_code == 200
+    return email
+
+
+@pytest.mark.asyncio
+async def test_batch_approve_and_reject(client: AsyncClient, course_factory):
+    admin = await _login(client, "admin@iitkgp.ac.in", "admin123")
+    course_id = await course_factory(max_capacity=2)
+    emails = [await _apply(client, course_id), await _apply(client, course_id)]
+    pending = (await client.get(f"/instructor/courses/{course_id}/applications", headers=admin)).json()
+    by_email = {a["email"]: a["student_id"] for a in pending}
+    first, second = by_email[emails[0]], by_email[emails[1]]
+
+    r = await client.post(f"/instructor/courses/{course_id}/applications/approve-batch", headers=admin,
+                          json={"all_pending": True, "limit": 1})
+    assert r.status_code == 200
+    assert r.json()["results"] == [
+        {"student_id": first, "status": "approved"},
+        {"student_id": second, "status": "waiting", "reason": "limit reached"},
+    ]
+
+    r = await client.post(f"/instructor/courses/{course_id}/applications/reject-batch", headers=admin,
+                          json={"student_ids": [first, second, -1]})
+    assert r.json()["rejected"] == 1
+    assert {o["student_id"]: o["status"] for o in r.json()["results"]} == {
+        first: "skipped", second: "rejected", -1: "skipped",
+    }
+
+    r = await client.post(f"/instructor/courses/{course_id}/applications/approve-batch", headers=admin,
+                          json={"student_ids": [first], "all_pending": True})
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_auto_approve_admits_within_capacity(client: AsyncClient, course_factory):
+    admin = await _login(client, "admin@iitkgp.ac.in", "admin123")
+    course_id = await course_factory(max_capacity=1)
+    r = await client.put(f"/instructor/courses/{course_id}/auto-approve", headers=admin, json={"enabled": True})
+    assert r.status_code == 200
+
+    email = await _apply(client, course_id)
+    students = (await client.get(f"/instructor/courses/{course_id}/students", headers=admin)).json()
+    assert [s["email"] for s in students] == [email]
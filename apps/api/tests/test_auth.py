@@ -86,3 +86,26 @@ async def test_instructor_pending_approval(client: AsyncClient):
     })
     assert response.status_code == 403
     assert response.json()["detail"] == "pending_approval"
+
+@pytest.mark.asyncio
+async def test_deleted_user_token_rejected_after_cache_warm(client: AsyncClient):
+    # Warm the principal cache for a fresh student, then delete the user as admin
+    email = random_email()
+    reg = await client.post("/auth/register/student", json={
+        "email": email,
+        "password": "password123",
+        "full_name": "Cache Test",
+        "age": 20,
+        "country": "Test Country",
+        "skill_level": "beginner"
+    })
+    token = (await client.post("/auth/login", json={"email": email, "password": "password123"})).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert (await client.get("/auth/me", headers=headers)).status_code == 200
+
+    admin = await client.post("/auth/login", json={"email": "admin@iitkgp.ac.in", "password": "admin123"})
+    admin_headers = {"Authorization": f"Bearer {admin.json()['access_token']}"}
+    r = await client.delete(f"/admin/users/{reg.json()['id']}", headers=admin_headers)
+    assert r.status_code == 200
+
+    assert (await client.get("/auth/me", headers=headers)).status_code == 401
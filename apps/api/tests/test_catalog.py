@@ -0,0 +1,59 @@
+"""
+Tests for the course catalog cache and its ETag / conditional GET handling.
+"""
+import pytest
+from httpx import AsyncClient
+from uuid import uuid4
+from starlette.requests import Request
+
+from catalog import CATALOG_CACHE, _etag_matches, bump_catalog_version, cache_page, catalog_key, \
+    catalog_version, get_cached_page
+
+
+def _request(query: bytes) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/student/courses", "query_string": query,
+                    "headers": [(b"host", b"testserver")], "scheme": "http", "server": ("testserver", 80)})
+
+
+def test_etag_matching():
+    assert _etag_matches('"abc"', '"abc"')
+    assert _etag_matches('"x", W/"abc"', '"abc"')
+    assert _etag_matches("*", '"abc"')
+    assert not _etag_matches('"abcd"', '"abc"')
+    assert not _etag_matches(None, '"abc"')
+
+
+def test_key_ignores_query_order_and_bump_invalidates():
+    version = catalog_version()
+    key = catalog_key(_request(b"topic=db&limit=10"), version)
+    assert key == catalog_key(_request(b"limit=10&topic=db"), version)
+
+    page = cache_page(key, b"[]", {})
+    assert get_cached_page(key) is page
+    bump_catalog_version()
+    assert catalog_version() == version + 1
+    assert get_cached_page(key) is None
+    assert len(CATALOG_CACHE) == 0
+
+
+@pytest.mark.asyncio
+async def test_conditional_get(client: AsyncClient, course_factory):
+    r = await client.post("/auth/login", json={"email": "admin@iitkgp.ac.in", "password": "admin123"})
+    admin = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    name = f"Catalog Course {uuid4().hex[:8]}"
+    url = f"/student/courses?query={name}"
+    r = await client.get(url, headers=admin)
+    assert r.json() == []
+    etag = r.headers["ETag"]
+    r = await client.get(url, headers={**admin, "If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+
+    await course_factory(course_name=name)
+
+    # Created in this worker, so the cached empty page is gone at once
+    r = await client.get(url, headers={**admin, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert [c["course_name"] for c in r.json()] == [name]
+    assert r.headers["ETag"] != etag
@@ -0,0 +1,80 @@
+"""
+Tests for the optional columnar analytics snapshot (skipped without numpy).
+"""
+import pytest
+from sqlalchemy import text
+
+np = pytest.importorskip("numpy")
+
+from columnar import ColumnarStore, Snapshot, StudentColumns
+
+STUDENTS = [(1, "India", "beginner"), (2, "India", None), (3, "Nepal", "advanced")]
+COURSES = [(10, "Databases", 1, 100, "IIT KGP"), (20, "AI", 2, 100, "IIT KGP"), (30, "Empty", 2, 200, "IIT B")]
+TOPICS = [(1, "SQL"), (2, "ML")]
+COURSE_TOPICS = [(10, 1), (20, 1), (20, 2)]
+# (student_id, course_id, evaluation_score)
+ENROLLMENTS = [(1, 10, 90), (1, 20, None), (2, 10, 30), (2, 20, 20), (3, 20, 70), (4, 10, 50)]
+
+
+def _snapshot() -> Snapshot:
+    student_ids, course_ids, scores = zip(*ENROLLMENTS)
+    return Snapshot(
+        (np.array(student_ids), np.array(course_ids), np.array(scores, dtype=np.float32)),
+        StudentColumns(STUDENTS), COURSES, TOPICS, COURSE_TOPICS,
+    )
+
+
+def test_snapshot_group_bys():
+    snap = _snapshot()
+    # Student 4 does not exist: its enrollment is dropped
+    assert snap.overview() == {"total_courses": 3, "total_students": 3, "total_enrollments": 5, "average_score": 52.5}
+    assert snap.top_courses(5) == [
+        {"course_id": 20, "course_name": "AI", "enrollments": 3, "avg_score": 45.0},
+        {"course_id": 10, "course_name": "Databases", "enrollments": 2, "avg_score": 60.0},
+    ]
+    assert snap.most_popular_course() == {"course": "AI", "enrollments": 3}
+    assert snap.avg_score_by_course() == [{"course": "Databases", "avg_score": 60.0}, {"course": "AI", "avg_score": 45.0}]
+    assert snap.students_by_country() == [{"country": "India", "count": 2}, {"country": "Nepal", "count": 1}]
+    assert snap.skill_level_distribution() == [{"skill_level": "advanced", "count": 1}, {"skill_level": "beginner", "count": 1}]
+    assert snap.courses_by_university() == [{"university": "IIT KGP", "count": 2}, {"university": "IIT B", "count": 1}]
+
+
+def test_snapshot_reports():
+    snap = _snapshot()
+    assert snap.topic_trends() == [{"topic": "SQL", "enrollments": 5}, {"topic": "ML", "enrollments": 3}]
+    assert snap.at_risk_students(40) == [(2, 25.0)]
+    assert snap.module_analytics() == [
+        {"program_id": 1, "avg_score": 60.0, "students": 2},
+        {"program_id": 2, "avg_score": 45.0, "students": 3},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_refresh_reads_only_changed_ranges(db_session):
+    conn = await db_session.connection()
+    store = ColumnarStore(range_width=1000)
+    first = await store.refresh(conn)
+    assert first["ranges_read"] == first["ranges"]
+    assert first["dimensions_read"] == ["students", "courses", "topics", "course_topics"]
+    total = (await conn.execute(text("SELECT count(*) FROM enrollment"))).scalar_one()
+    assert first["enrollments"] == total
+
+    unchanged = await store.refresh(conn)
+    assert (unchanged["ranges_read"], unchanged["dimensions_read"]) == (0, [])
+
+    changed = (await conn.execute(text(
+        "UPDATE enrollment SET evaluation_score = coalesce(evaluation_score, 0) % 100 + 1 "
+        "WHERE (student_id, course_id) = (SELECT student_id, course_id FROM enrollment LIMIT 1) "
+        "RETURNING student_id"
+    ))).scalar_one_or_none()
+    if changed is None:
+        pytest.skip("no enrollments seeded")
+    after = await store.refresh(conn)
+    assert (after["ranges_read"], after["dimensions_read"]) == (1, [])
+
+    await conn.execute(text("UPDATE student SET skill_level = skill_level WHERE student_id = :id"), {"id": changed})
+    assert (await store.refresh(conn))["dimensions_read"] == []
+    await conn.execute(text(
+        "UPDATE student SET country = coalesce(country, '') || '.' WHERE student_id = :id"
+    ), {"id": changed})
+    assert (await store.refresh(conn))["dimensions_read"] == ["students"]
@@ -0,0 +1,66 @@
+"""
+Tests for the single-statement course detail page and its per-course cache.
+"""
+import pytest
+from httpx import AsyncClient
+from uuid import uuid4
+
+from course_detail import COURSE_DETAIL_CACHE, invalidate_course_detail
+
+
+async def _login(client: AsyncClient, email: str, password: str):
+    r = await client.post("/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def test_invalidate_without_ids_clears_everything():
+    COURSE_DETAIL_CACHE.set(-1, {})
+    COURSE_DETAIL_CACHE.set(-2, {})
+    invalidate_course_detail(-1)
+    assert COURSE_DETAIL_CACHE.get(-1) is None and COURSE_DETAIL_CACHE.get(-2) == {}
+    invalidate_course_detail()
+    assert len(COURSE_DETAIL_CACHE) == 0
+
+
+@pytest.mark.asyncio
+async def test_detail_cached_and_invalidated_by_content(client: AsyncClient, course_factory):
+    admin = await _login(client, "admin@iitkgp.ac.in", "admin123")
+    course_id = await course_factory(max_capacity=5)
+    url = f"/student/courses/{course_id}"
+
+    r = await client.get(url, headers=admin)
+    assert r.status_code == 200
+    assert r.json()["content_items"] == [] and r.json()["current_enrollment"] == 0
+    # Principal and course both cached: only the live part is read
+    r = await client.get(url, headers=admin)
+    assert int(r.headers["x-db-query-count"]) == 1
+
+    r = await client.post(f"/instructor/courses/{course_id}/content-items", headers=admin, json={
+        "content_type": "video", "title": "Week 1", "url": "https://example.com/w1",
+    })
+    assert r.status_code == 200
+    items = (await client.get(url, headers=admin)).json()["content_items"]
+    assert [i["title"] for i in items] == ["Week 1"]
+
+    assert (await client.get("/student/courses/-999", headers=admin)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_detail_requires_enrollment(client: AsyncClient, course_factory):
+    course_id = await course_factory(max_capacity=5)
+    email = f"detail_{uuid4().hex[:8]}@example.com"
+    await client.post("/auth/register/student", json={
+        "email": email, "password": "pass1234", "full_name": "Detail Student",
+        "age": 21, "country": "India", "skill_level": "beginner",
+    })
+    student = await _login(client, email, "pass1234")
+    url = f"/student/courses/{course_id}"
+
+    assert (await client.get(url, headers=student)).status_code == 403
+    r = await client.post("/student/enrollments", headers=student, json={"course_id": course_id})
+    assert r.status_code == 200
+    r = await client.get(url, headers=student)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["course_id"] == course_id and body["evaluation_score"] is None
+    assert body["enroll_date"] is not None
@@ -0,0 +1,36 @@
+"""
+Tests for the trigger-maintained course_stats aggregates.
+"""
+import pytest
+from httpx import AsyncClient
+from uuid import uuid4
+
+
+async def _login(client: AsyncClient, email: str, password: str):
+    r = await client.post("/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_enrollment_keeps_course_stats_consistent(client: AsyncClient):
+    email = f"stats_{uuid4().hex[:8]}@example.com"
+    await client.post("/auth/register/student", json={
+        "email": email, "password": "pass1234", "full_name": "Stats Student",
+        "age": 22, "country": "India", "skill_level": "beginner",
+    })
+    student = await _login(client, email, "pass1234")
+    admin = await _login(client, "admin@iitkgp.ac.in", "admin123")
+
+    courses = (await client.get("/student/courses", params={"limit": 1}, headers=student)).json()
+    if not courses:
+        pytest.skip("no courses seeded")
+    r = await client.post("/student/enrollments", json={"course_id": courses[0]["course_id"]}, headers=student)
+    assert r.status_code == 200
+
+    r = await client.get("/admin/course-stats/check", headers=admin)
+    assert r.status_code == 200
+    assert r.json()["drifted_courses"] == 0
+
+    r = await client.post("/admin/course-stats/repair", headers=admin)
+    assert r.status_code == 200
+    assert r.json()["repaired"] is False
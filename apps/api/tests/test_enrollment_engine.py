@@ -0,0 +1,36 @@
+"""
+Tests for atomic seat reservation in enrollment_engine (via /student/enrollments).
+"""
+import pytest
+from httpx import AsyncClient
+from uuid import uuid4
+
+
+async def _login(client: AsyncClient, email: str, password: str):
+    r = await client.post("/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def _student(client: AsyncClient):
+    email = f"seat_{uuid4().hex[:8]}@example.com"
+    await client.post("/auth/register/student", json={
+        "email": email, "password": "pass1234", "full_name": "Seat Student",
+        "age": 21, "country": "India", "skill_level": "beginner",
+    })
+    return await _login(client, email, "pass1234")
+
+
+@pytest.mark.asyncio
+async def test_last_seat_then_full(client: AsyncClient, course_factory):
+    course_id = await course_factory(max_capacity=1)
+
+    first, second = await _student(client), await _student(client)
+    r = await client.post("/student/enrollments", json={"course_id": course_id}, headers=first)
+    assert r.status_code == 200
+
+    r = await client.post("/student/enrollments", json={"course_id": course_id}, headers=first)
+    assert (r.status_code, r.json()["detail"]) == (400, "Already enrolled in this course")
+    r = await client.post("/student/enrollments", json={"course_id": course_id}, headers=second)
+    assert (r.status_code, r.json()["detail"]) == (400, "Course is full")
+    r = await client.post("/student/enrollments", json={"course_id": -1}, headers=second)
+    assert r.status_code == 404
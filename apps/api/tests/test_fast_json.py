@@ -0,0 +1,27 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import fast_json
+from fast_json import FastJSONResponse, dumps
+
+
+ROW = {"student_id": 1, "average": Decimal("72.50"), "enroll_date": date(2024, 1, 2),
+       "joined_at": datetime(2024, 1, 2, 3, 4, 5), "topics": ["SQL"], "rank": None}
+EXPECTED = ('{"student_id":1,"average":72.5,"enroll_date":"2024-01-02",'
+            '"joined_at":"2024-01-02T03:04:05","topics":["SQL"],"rank":null}')
+
+
+def test_dumps_handles_sql_types():
+    assert dumps([ROW]) == f"[{EXPECTED}]".encode()
+
+
+def test_dumps_without_orjson(monkeypatch):
+    monkeypatch.setattr(fast_json, "orjson", None)
+    assert dumps([ROW]) == f"[{EXPECTED}]".encode()
+
+
+def test_fast_response_renders_body_and_headers():
+    response = FastJSONResponse([ROW], headers={"X-Next-Cursor": "abc"})
+    assert response.body == f"[{EXPECTED}]".encode()
+    assert response.headers["X-Next-Cursor"] == "abc"
+    assert response.media_type == "application/json"
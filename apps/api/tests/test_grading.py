@@ -0,0 +1,83 @@
+"""
+Tests for bulk grading (PUT /instructor/courses/{id}/grades).
+"""
+import pytest
+from httpx import AsyncClient
+
+from grading import parse_grades_csv, validate_grades
+
+
+# ── validation units ─────────────────────────────────────────────────
+
+def test_validate_grades_reports_each_bad_row():
+    valid, errors = validate_grades([
+        {"student_id": 1, "evaluation_score": 90},
+        {"student_id": "2", "score": "75"},
+        {"student_id": 1, "evaluation_score": 80},
+        {"student_id": "x", "evaluation_score": 50},
+        {"student_id": 3, "evaluation_score": 101},
+        {"student_id": 4},
+        {"student_id": 2**31, "evaluation_score": 50},
+        {"student_id": "-2147483649", "evaluation_score": 50},
+        {"student_id": 5, "evaluation_score": 2**31},
+    ])
+    assert valid == [(0, 1, 90), (1, 2, 75)]
+    assert [(e["row"], e["error"]) for e in errors] == [
+        (2, "duplicate student_id (also in row 0)"),
+        (3, "student_id must be an integer"),
+        (4, "evaluation_score must be between 0 and 100"),
+        (5, "evaluation_score must be an integer"),
+        (6, "student_id is out of range"),
+        (7, "student_id is out of range"),
+        (8, "evaluation_score must be between 0 and 100"),
+    ]
+
+
+def test_parse_grades_csv():
+    rows = parse_grades_csv(b"\xef\xbb\xbfstudent_id,evaluation_score\n7,88\n8,\n")
+    assert validate_grades(rows) == (
+        [(0, 7, 88)],
+        [{"row": 1, "student_id": "8", "status": "error", "error": "evaluation_score must be an integer"}],
+    )
+    with pytest.raises(ValueError):
+        parse_grades_csv(b"id,score\n1,2\n")
+
+
+# ── endpoint ─────────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_bulk_grade_applies_valid_rows(client: AsyncClient):
+    r = await client.post("/auth/login", json={"email": "admin@iitkgp.ac.in", "password": "admin123"})
+    admin = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    courses = (await client.get("/admin/courses", params={"limit": 50}, headers=admin)).json()
+    graded = None
+    for course in courses:
+        students = (await client.get(f"/instructor/courses/{course['course_id']}/students", headers=admin)).json()
+        if students:
+            graded = course["course_id"], students[0]
+            break
+    if graded is None:
+        pytest.skip("no approved enrollments seeded")
+    course_id, student = graded
+    new_score = ((student["evaluation_score"] or 0) + 1) % 101
+
+    r = await client.put(f"/instructor/courses/{course_id}/grades", headers=admin, json={"grades": [
+        {"student_id": student["student_id"], "evaluation_score": new_score},
+        {"student_id": -1, "evaluation_score": 50},
+        {"student_id": student["student_id"], "evaluation_score": 10},
+    ]})
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["updated"], body["failed"]) == (1, 2)
+    assert body["results"][0]["status"] == "updated"
+    assert body["results"][0]["old_score"] == student["evaluation_score"]
+    assert body["results"][1]["error"] == "Student is not enrolled in this course"
+
+    # all_or_nothing refuses the whole batch when any row fails
+    r = await client.put(f"/instructor/courses/{course_id}/grades", headers=admin, params={"all_or_nothing": True},
+                         json={"grades": [{"student_id": -1, "evaluation_score": 50}]})
+    assert r.status_code == 422
+
+    log = (await client.get(f"/instructor/courses/{course_id}/audit-log", headers=admin)).json()
+    assert any(e["student_id"] == student["student_id"] and e["new_score"] == new_score for e in log["entries"])
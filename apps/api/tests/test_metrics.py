@@ -0,0 +1,20 @@
+"""
+Tests for the Prometheus /metrics endpoint.
+"""
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.mark.asyncio
+async def test_metrics_count_requests_by_route_template(client: AsyncClient):
+    await client.get("/")
+    await client.post("/auth/login", json={"email": "admin@iitkgp.ac.in", "password": "admin123"})
+
+    r = await client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    assert 'api_http_requests_total{method="GET",route="/",status="200"}' in body
+    assert 'route="/auth/login"' in body
+    assert 'api_password_hash_seconds_count{operation="verify"}' in body
+    assert 'api_db_pool_connections{engine="primary",state="checked_out"}' in body
@@ -0,0 +1,121 @@
+"""
+Tests for keyset pagination, cursors and field projection on list endpoints.
+"""
+import pytest
+from fastapi import HTTPException, Response
+from httpx import AsyncClient
+from starlette.requests import Request
+from uuid import uuid4
+
+from models import Course, Student
+from pagination import Keyset, Page, PageParams, Projection, page_response
+
+
+# ── cursor / projection units ────────────────────────────────────────
+
+def test_cursor_round_trip():
+    key = Keyset("course_rank_fuzzy", ((Course.course_id, True), (Course.course_id, False)))
+    assert key.decode(key.encode([0.4375, 12])) == [0.4375, 12]
+
+
+def test_cursor_from_other_listing_rejected():
+    token = Keyset("student_id", ((Student.student_id, False),)).encode([5])
+    with pytest.raises(HTTPException) as exc:
+        Keyset("course_id", ((Course.course_id, False),)).decode(token)
+    assert exc.value.status_code == 400
+
+
+def test_garbage_cursor_rejected():
+    with pytest.raises(HTTPException) as exc:
+        Keyset("course_id", ((Course.course_id, False),)).decode("not-a-cursor!")
+    assert exc.value.status_code == 400
+
+
+def test_projection_unknown_field():
+    fields = Projection(student_id=Student.student_id, email=Student.email)
+    assert fields.resolve(None) == ["student_id", "email"]
+    assert fields.resolve("email, email") == ["email"]
+    with pytest.raises(HTTPException) as exc:
+        fields.resolve("email,password_hash")
+    assert exc.value.status_code == 400
+
+
+def test_raw_page_response_keeps_handler_headers():
+    request = Request({"type": "http", "method": "GET", "path": "/reports/instructor-performance",
+                       "query_string": b"limit=1&count=exact", "headers": [(b"host", b"testserver")],
+                       "scheme": "http", "server": ("testserver", 80)})
+    params = PageParams(request, limit=1, cursor=None, fields=None, count="exact")
+    response = Response()
+    response.headers["X-Data-Source"] = "materialized"
+
+    sent = page_response(Page([{"ipi": 1.5}], next_cursor="abc", total=2), params, response, raw=True)
+    assert sent.headers["x-data-source"] == "materialized"
+    assert sent.headers["x-total-count"] == "2"
+    assert sent.headers["link"] == '<http://testserver/reports/instructor-performance?limit=1&count=exact&cursor=abc>; rel="next"'
+    assert sent.headers.getlist("content-length") == [str(len(sent.body))]
+
+
+# ── endpoints ────────────────────────────────────────────────────────
+
+async def _admin_headers(client: AsyncClient):
+    r = await client.post("/auth/login", json={"email": "admin@iitkgp.ac.in", "password": "admin123"})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def _register_students(client: AsyncClient, n: int):
+    for _ in range(n):
+        await client.post("/auth/register/student", json={
+            "email": f"page_{uuid4().hex[:8]}@example.com",
+            "password": "pass1234",
+            "full_name": "Paging Student",
+            "age": 20,
+            "country": "India",
+            "skill_level": "beginner",
+        })
+
+
+@pytest.mark.asyncio
+async def test_students_keyset_pages_cover_everything_once(client: AsyncClient):
+    await _register_students(client, 3)
+    headers = await _admin_headers(client)
+
+    r = await client.get("/admin/students", params={"limit": 1000, "count": "exact"}, headers=headers)
+    assert r.status_code == 200
+    everything = [s["student_id"] for s in r.json()]
+    assert int(r.headers["x-total-count"]) == len(everything)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        r = await client.get("/admin/students", params=params, headers=headers)
+        assert r.status_code == 200
+        assert len(r.json()) <= 2
+        seen += [s["student_id"] for s in r.json()]
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert seen == everything
+
+
+@pytest.mark.asyncio
+async def test_unpaged_without_limit_or_cursor(client: AsyncClient):
+    await _register_students(client, 2)
+    headers = await _admin_headers(client)
+
+    r = await client.get("/admin/students", params={"count": "exact"}, headers=headers)
+    assert r.status_code == 200
+    assert len(r.json()) == int(r.headers["x-total-count"])
+    assert "x-next-cursor" not in r.headers
+
+
+@pytest.mark.asyncio
+async def test_fields_projection(client: AsyncClient):
+    await _register_students(client, 1)
+    headers = await _admin_headers(client)
+
+    r = await client.get("/admin/students", params={"fields": "student_id,email"}, headers=headers)
+    assert r.status_code == 200
+    assert all(set(s) == {"student_id", "email"} for s in r.json())
+
+    r = await client.get("/admin/students", params={"fields": "password_hash"}, headers=headers)
+    assert r.status_code == 400
@@ -0,0 +1,31 @@
+import pytest
+from fastapi import HTTPException
+
+import passwords
+
+
+def test_hash_and_verify_round_trip():
+    hashed = passwords.hash_password_sync("secret", rounds=4)
+    assert passwords.verify_password_sync("secret", hashed)
+    assert not passwords.verify_password_sync("wrong", hashed)
+
+
+def test_needs_rehash_when_cost_differs():
+    hashed = passwords.hash_password_sync("secret", rounds=4)
+    assert passwords.hash_cost(hashed) == 4
+    assert passwords.needs_rehash(hashed) == (passwords.BCRYPT_ROUNDS != 4)
+    assert passwords.needs_rehash("not-a-bcrypt-hash")
+
+
+@pytest.mark.asyncio
+async def test_async_helpers_run_off_loop():
+    hashed = passwords.hash_password_sync("secret", rounds=4)
+    assert await passwords.verify_password("secret", hashed)
+
+
+@pytest.mark.asyncio
+async def test_saturated_pool_returns_503(monkeypatch):
+    monkeypatch.setattr(passwords, "HASH_MAX_PENDING", 0)
+    with pytest.raises(HTTPException) as exc:
+        await passwords.hash_password("secret")
+    assert exc.value.status_code == 503
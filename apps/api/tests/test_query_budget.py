@@ -0,0 +1,102 @@
+"""
+Round-trip budgets for the dashboard stats endpoints and the instructor course
+page, read from the X-DB-Query-Count header set by
+instrumentation.SQLInstrumentationMiddleware.
+
+Each endpoint is called twice with the same token: the first call warms the
+principal (and profile) cache, the second must need exactly one statement.
+"""
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from uuid import uuid4
+
+from models import Instructor
+
+
+async def _login(client: AsyncClient, email: str, password: str):
+    r = await client.post("/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def _statements(client: AsyncClient, url: str, headers: dict) -> int:
+    await client.get(url, headers=headers)
+    r = await client.get(url, headers=headers)
+    assert r.status_code == 200
+    return int(r.headers["x-db-query-count"])
+
+
+async def _admin_created(client: AsyncClient, admin: dict, role: str, **extra):
+    email = f"budget_{role}_{uuid4().hex[:8]}@example.com"
+    r = await client.post("/admin/users", headers=admin, json={
+        "email": email, "password": "pass1234", "role": role, "full_name": f"Budget {role}", **extra,
+    })
+    assert r.status_code == 200
+    return await _login(client, email, "pass1234")
+
+
+@pytest.mark.asyncio
+async def test_admin_stats_single_statement(client: AsyncClient):
+    admin = await _login(client, "admin@iitkgp.ac.in", "admin123")
+    assert await _statements(client, "/admin/stats", admin) == 1
+    assert await _statements(client, "/admin/stats?estimate=true", admin) == 1
+
+
+@pytest.mark.asyncio
+async def test_analyst_stats_single_statement(client: AsyncClient):
+    admin = await _login(client, "admin@iitkgp.ac.in", "admin123")
+    analyst = await _admin_created(client, admin, "analyst")
+    assert await _statements(client, "/analytics/stats", analyst) == 1
+    assert await _statements(client, "/analytics/stats?fresh=true", admin) == 1
+
+
+@pytest.mark.asyncio
+async def test_student_stats_single_statement(client: AsyncClient):
+    admin = await _login(client, "admin@iitkgp.ac.in", "admin123")
+    student = await _admin_created(client, admin, "student", age=20, country="India")
+    assert await _statements(client, "/student/stats", student) == 1
+
+
+@pytest.mark.asyncio
+async def test_instructor_stats_single_statement(client: AsyncClient):
+    admin = await _login(client, "admin@iitkgp.ac.in", "admin123")
+    instructor = await _admin_created(client, admin, "instructor", teaching_years=3)
+    assert await _statements(client, "/instructor/stats", instructor) == 1
+
+
+def test_fingerprint_groups_statement_shapes():
+    from instrumentation import QueryStats, fingerprint
+
+    assert fingerprint("SELECT *\n  FROM course WHERE course_id = $1") == "SELECT * FROM course WHERE course_id = ?"
+    assert fingerprint("SELECT * FROM topic WHERE topic_id IN ($1, $2, $3)") == \
+        fingerprint("SELECT * FROM topic WHERE topic_id IN ($1)")
+
+    stats = QueryStats()
+    for i in range(6):
+        stats.record(f"SELECT * FROM topic WHERE topic_id = ${i + 1}", 1.0)
+    stats.record("SELECT 1", 5.0)
+    assert stats.count == 7
+    assert stats.slowest_sql == "SELECT 1"
+    assert stats.repeated(5) == [("SELECT * FROM topic WHERE topic_id = ?", 6)]
+
+
+@pytest.mark.asyncio
+async def test_instructor_course_page_profile_cached(client: AsyncClient, db_session, course_factory):
+    admin = await _login(client, "admin@iitkgp.ac.in", "admin123")
+    instructor = await _admin_created(client, admin, "instructor", teaching_years=3)
+    email = (await client.get("/auth/me", headers=instructor)).json()["email"]
+    instructor_id = (await db_session.execute(
+        select(Instructor.instructor_id).where(Instructor.email == email)
+    )).scalar_one()
+    course_id = await course_factory(max_capacity=5)
+    url = f"/instructor/courses/{course_id}/students"
+
+    assert (await client.get(url, headers=instructor)).status_code == 403
+    r = await client.post(f"/admin/courses/{course_id}/assign-instructor", headers=admin,
+                          json={"instructor_id": instructor_id, "role": "instructor"})
+    assert r.status_code == 200
+    # Principal and profile cached: ownership check costs nothing
+    assert await _statements(client, url, instructor) == 1
+
+    await client.delete(f"/admin/courses/{course_id}/instructors/{instructor_id}", headers=admin)
+    assert (await client.get(url, headers=instructor)).status_code == 403
@@ -0,0 +1,62 @@
+"""
+Tests for streaming CSV / NDJSON report exports.
+"""
+import csv
+import io
+import json
+from decimal import Decimal
+
+import pytest
+from httpx import AsyncClient
+
+from reports.export import _csv, _ndjson
+
+
+async def _fake_batches():
+    yield [{"topic": "SQL", "avg": Decimal("71.25")}, {"topic": "Graphs, trees", "avg": None}]
+    yield [{"topic": "Indexes", "avg": Decimal("60")}]
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+@pytest.mark.asyncio
+async def test_csv_streams_header_first():
+    chunks = await _collect(_csv(_fake_batches(), ("topic", "avg")))
+    assert chunks[0] == "topic,avg\r\n"
+    assert len(chunks) == 3
+    assert list(csv.reader(io.StringIO("".join(chunks)))) == [
+        ["topic", "avg"], ["SQL", "71.25"], ["Graphs, trees", ""], ["Indexes", "60"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_one_object_per_line():
+    body = b"".join(await _collect(_ndjson(_fake_batches())))
+    assert [json.loads(line) for line in body.splitlines()] == [
+        {"topic": "SQL", "avg": 71.25}, {"topic": "Graphs, trees", "avg": None}, {"topic": "Indexes", "avg": 60.0},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_export_matches_json_report(client: AsyncClient):
+    r = await client.post("/auth/login", json={"email": "admin@iitkgp.ac.in", "password": "admin123"})
+    admin = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    expected = (await client.get("/reports/topic-trends", headers=admin)).json()
+
+    r = await client.get("/reports/topic-trends?format=csv", headers=admin)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    assert 'filename="topic-trends.csv"' in r.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    # Ties in enrollments have no fixed order
+    assert sorted((row["topic"], int(row["enrollments"])) for row in rows) == \
+        sorted((t["topic"], t["enrollments"]) for t in expected)
+
+    r = await client.get("/reports/topic-trends?format=ndjson", headers=admin)
+    key = lambda t: t["topic"]
+    assert sorted((json.loads(line) for line in r.text.splitlines()), key=key) == sorted(expected, key=key)
+
+    r = await client.get("/reports/topic-trends?format=xlsx", headers=admin)
+    assert r.status_code == 422
@@ -0,0 +1,53 @@
+"""
+Tests for course waitlists: join/leave, positions and promotion into freed seats.
+"""
+import pytest
+from httpx import AsyncClient
+from uuid import uuid4
+
+from waitlist import promote_waitlists
+
+
+async def _login(client: AsyncClient, email: str, password: str):
+    r = await client.post("/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def _student(client: AsyncClient):
+    email = f"wait_{uuid4().hex[:8]}@example.com"
+    await client.post("/auth/register/student", json={
+        "email": email, "password": "pass1234", "full_name": "Waiting Student",
+        "age": 21, "country": "India", "skill_level": "beginner",
+    })
+    return email, await _login(client, email, "pass1234")
+
+
+@pytest.mark.asyncio
+async def test_waitlist_promotion(client: AsyncClient, db_session, course_factory):
+    admin = await _login(client, "admin@iitkgp.ac.in", "admin123")
+    course_id = await course_factory(max_capacity=1)
+    url = f"/student/courses/{course_id}/waitlist"
+
+    (a_email, a), (_, b), (_, c) = await _student(client), await _student(client), await _student(client)
+    r = await client.post(url, headers=a)
+    assert r.status_code == 409  # free seat: enroll instead
+    assert (await client.post("/student/enrollments", json={"course_id": course_id}, headers=a)).status_code == 200
+    assert (await client.post("/student/enrollments", json={"course_id": course_id}, headers=b)).status_code == 400
+
+    assert (await client.post(url, headers=b)).json()["position"] == 1
+    r = await client.post(url, headers=c)
+    assert (r.json()["position"], r.json()["waiting"]) == (2, 2)
+
+    pending = (await client.get(f"/instructor/courses/{course_id}/applications", headers=admin)).json()
+    a_id = next(p["student_id"] for p in pending if p["email"] == a_email)
+    assert (await client.delete(f"/admin/enrollments/{a_id}/{course_id}", headers=admin)).status_code == 200
+
+    promoted = await promote_waitlists(db_session)
+    assert [p["promoted"] for p in promoted] == [True]
+    assert (await client.get(url, headers=b)).status_code == 404
+    assert (await client.get(url, headers=c)).json()["position"] == 1
+    applications = (await client.get("/student/applications/me", headers=b)).json()
+    assert [x["course_id"] for x in applications] == [course_id]
+
+    assert (await client.delete(url, headers=c)).status_code == 200
+    assert (await client.delete(url, headers=c)).status_code == 404
@@ -0,0 +1,159 @@
+"""Course waitlists and their promotion worker.
+
+Students join a full course's waitlist instead of retrying enrollment. Entries
+are ordered by an identity ``ticket``; a student's position is the number of
+entries ahead of them, an index-only range count on (course_id, ticket).
+
+Freed seats are filled by promote_waitlists(), run in batches by
+waitlist_promotion_loop() (started from the app lifespan). Endpoints that free
+seats call wake_promoter() after committing so promotion happens right away in
+this worker; other workers pick it up on their next poll. Courses being
+promoted by another worker, or with an enrollment in flight, are skipped
+(SKIP LOCKED) and retried on the next pass.
+"""
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+WAITLIST_PROMOTE_SECONDS = int(os.getenv("WAITLIST_PROMOTE_SECONDS", 10))
+WAITLIST_PROMOTE_BATCH = int(os.getenv("WAITLIST_PROMOTE_BATCH", 200))
+_COURSES_PER_PASS = 50
+
+_POSITION_SQL = text("""
+    SELECT w.ticket, w.joined_at,
+           (SELECT count(*) FROM waitlist a WHERE a.course_id = w.course_id AND a.ticket < w.ticket) + 1
+               AS position,
+           (SELECT count(*) FROM waitlist a WHERE a.course_id = w.course_id) AS waiting
+      FROM waitlist w
+     WHERE w.course_id = :course_id AND w.student_id = :student_id
+""")
+
+_MY_POSITIONS_SQL = text("""
+    SELECT w.course_id, c.course_name, w.joined_at,
+           (SELECT count(*) FROM waitlist a WHERE a.course_id = w.course_id AND a.ticket < w.ticket) + 1
+               AS position
+      FROM waitlist w
+      JOIN course c ON c.course_id = w.course_id
+     WHERE w.student_id = :student_id
+     ORDER BY w.joined_at
+""")
+
+_JOIN_SQL = text("""
+    INSERT INTO waitlist (course_id, student_id)
+    SELECT :course_id, :student_id
+     WHERE NOT EXISTS (SELECT 1 FROM enrollment WHERE course_id = :course_id AND student_id = :student_id)
+    ON CONFLICT DO NOTHING
+""")
+
+# Seats are reserved the same way as in enrollment_engine: the course rows are
+# locked, and current_enrollment is raised by the number of rows inserted.
+_PROMOTE_SQL = text("""
+    WITH free AS (
+        SELECT c.course_id, c.max_capacity - c.current_enrollment AS seats
+          FROM course c
+         WHERE c.current_enrollment < c.max_capacity
+           AND EXISTS (SELECT 1 FROM waitlist w WHERE w.course_id = c.course_id)
+         ORDER BY c.course_id
+         LIMIT :courses
+           FOR UPDATE OF c SKIP LOCKED
+    ),
+    picked AS (
+        SELECT w.course_id, w.student_id
+          FROM free f
+          CROSS JOIN LATERAL (
+              SELECT course_id, student_id FROM waitlist
+               WHERE course_id = f.course_id
+               ORDER BY ticket
+               LIMIT LEAST(f.seats, :batch)
+                 FOR UPDATE SKIP LOCKED
+          ) w
+    ),
+    removed AS (
+        DELETE FROM waitlist w
+         USING picked p
+         WHERE w.course_id = p.course_id AND w.student_id = p.student_id
+        RETURNING w.course_id, w.student_id
+    ),
+    ins AS (
+        INSERT INTO enrollment (student_id, course_id, enroll_date, status)
+        SELECT r.student_id, r.course_id, CURRENT_DATE,
+               CASE WHEN c.auto_approve THEN 'approved' ELSE 'pending' END
+          FROM removed r
+          JOIN course c ON c.course_id = r.course_id
+        ON CONFLICT DO NOTHING
+        RETURNING course_id, student_id
+    ),
+    seats AS (
+        UPDATE course c
+           SET current_enrollment = c.current_enrollment + n.taken
+          FROM (SELECT course_id, count(*) AS taken FROM ins GROUP BY course_id) n
+         WHERE c.course_id = n.course_id
+    )
+    SELECT r.course_id, r.student_id, ins.student_id IS NOT NULL AS promoted
+      FROM removed r
+      LEFT JOIN ins ON ins.course_id = r.course_id AND ins.student_id = r.student_id
+""")
+
+_wakeup = asyncio.Event()
+
+
+def wake_promoter():
+    """Run a promotion pass in this worker now (call after committing a freed seat)."""
+    _wakeup.set()
+
+
+async def waitlist_position(db: AsyncSession, course_id: int, student_id: int) -> Optional[dict]:
+    row = (await db.execute(_POSITION_SQL, {"course_id": course_id, "student_id": student_id})).one_or_none()
+    if row is None:
+        return None
+    return {"course_id": course_id, "position": row.position, "waiting": row.waiting, "joined_at": row.joined_at}
+
+
+async def my_waitlists(db: AsyncSession, student_id: int) -> list[dict]:
+    rows = await db.execute(_MY_POSITIONS_SQL, {"student_id": student_id})
+    return [dict(r._mapping) for r in rows]
+
+
+async def join_waitlist(db: AsyncSession, course_id: int, student_id: int) -> bool:
+    """Add the student to the waitlist; False if already enrolled. Idempotent. The caller commits."""
+    await db.execute(_JOIN_SQL, {"course_id": course_id, "student_id": student_id})
+    return await waitlist_position(db, course_id, student_id) is not None
+
+
+async def promote_waitlists(db, batch: int = WAITLIST_PROMOTE_BATCH) -> list[dict]:
+    """One promotion pass: move waitlisted students into free seats, oldest ticket first.
+
+    Returns the entries taken off the waitlist; ``promoted`` is False for a
+    student who had meanwhile enrolled directly. The caller commits.
+    """
+    rows = await db.execute(_PROMOTE_SQL, {"batch": batch, "courses": _COURSES_PER_PASS})
+    return [dict(r._mapping) for r in rows]
+
+
+async def _promotion_pass(db_engine) -> list[dict]:
+    async with db_engine.begin() as conn:
+        return await promote_waitlists(conn)
+
+
+async def waitlist_promotion_loop(db_engine, interval: int = WAITLIST_PROMOTE_SECONDS):
+    """Background task started from the app lifespan."""
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+        try:
+            # Drain: each pass re-reads the free seats left by the previous one
+            while promoted := await _promotion_pass(db_engine):
+                logger.info("Promoted %d waitlist entries", len(promoted))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Waitlist promotion failed")